@@ -1,13 +1,13 @@
 import streamlit as st
 import pandas as pd
-from src.data_handler import importar_sensores, importar_consumo
+import numpy as np
+from src.data_handler import importar_sensores, importar_sensores_horario, obter_tabela_consumo, memoria_mb
 from src.forecaster import SiloForecaster
 import os
-from datetime import date
-import traceback
-import matplotlib.pyplot as plt
-import re
-from src.report_generator import PDFReportGenerator
+import contextlib
+from src.metricas import MetricasDesempenho, coletar
+from src.armazenamento import ArmazemSensores
+from src.cache import CacheLRU, CacheResultados
 
 # --- Page Config ---
 st.set_page_config(
@@ -18,40 +18,56 @@ st.set_page_config(
 
 # --- Cached Data Loading ---
 @st.cache_data
-def load_sensor_data(uploaded_file):
-    df = importar_sensores(uploaded_file)
+def load_sensor_data(uploaded_file, _armazem=None):
+    # Fast columnar reader; re-uploading the same file is served from the Parquet cache
+    # New readings are also appended (deduplicated) to the local sensor history
+    # Compact schema (categoricals, float32, small-int aviario_num) keeps the cached copy small
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    cache_dir = os.path.join(script_dir, '.cache', 'sensores')
+    df = importar_sensores(uploaded_file, rapido=True, cache_dir=cache_dir, armazem=_armazem, compacto=True)
     return df
 
-# --- Cached Consumption Data Loading ---
 @st.cache_data
-def load_consumption_data(linhagem_folder):
-    # Assuming 'cobb.xlsx' and 'ross.xlsx' are always in 'static/linhagem'
-    # and are part of the deployed app or pre-loaded.
-    # If they were to be uploaded by the user, this function would need adaptation.
-    cobb_path = os.path.join(linhagem_folder, 'cobb.xlsx')
-    ross_path = os.path.join(linhagem_folder, 'ross.xlsx')
-    
-    # For Streamlit deployment, these paths might need to be relative to the app.py
-    # or handled differently if they are not bundled with the app.
-    # For now, assuming they are accessible via the relative path.
-    
-    # This part needs to be robust for deployment. 
-    # For local testing, it works if static/linhagem is in the project root.
-    
-    # A more robust solution for Streamlit Cloud would be to use st.secrets or 
-    # allow user to upload these files too, but that's a later enhancement.
-    
-    # For now, let's assume the static folder is accessible relative to the app.py
-    # or the script's execution directory.
-    
-    # Let's define the absolute path for the static folder
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.abspath(script_dir)
-    linhagem_folder_abs = os.path.join(project_root, 'static', 'linhagem')
+def load_sensor_data_hourly(uploaded_file):
+    # Large exports: read in bounded chunks and keep only the hourly means per silo, so memory
+    # follows the hourly output instead of the raw row count (readings don't go into the local history)
+    uploaded_file.seek(0)
+    return importar_sensores_horario(uploaded_file)
+
+# Uploads above this size are read as hourly means by default
+LIMITE_LEITURA_COMPLETA_MB = 100
+
+# --- Local Sensor History ---
+@st.cache_resource
+def open_sensor_store(caminho):
+    # One SQLite-backed store per process; every call opens its own connection
+    return ArmazemSensores(caminho)
 
-    df_cobb = importar_consumo('cobb', linhagem_folder_abs)
-    df_ross = importar_consumo('ross', linhagem_folder_abs)
-    return {'cobb': df_cobb, 'ross': df_ross}
+# --- Forecast Result Cache ---
+@st.cache_resource
+def open_result_cache(pasta):
+    # Shared by every session and rerun; unchanged data + parameters are restored instead of recomputed,
+    # and the on-disk tier keeps results across app restarts
+    return CacheResultados(max_itens=256, pasta=pasta)
+
+# --- Performance Panel ---
+def show_performance_panel(metricas):
+    # Collapsible table of per-stage timings collected during this run
+    with st.expander("Desempenho", expanded=False):
+        resumo = metricas.resumo()
+        if resumo.empty:
+            st.write("Nenhuma etapa medida nesta execução.")
+            return
+        st.dataframe(resumo, hide_index=True)
+        st.download_button(
+            label="Baixar métricas (JSON)",
+            data=metricas.para_dataframe().to_json(orient='records', force_ascii=False, indent=2),
+            file_name="metricas_desempenho.json",
+            mime="application/json"
+        )
+        texto_perfil = metricas.texto_perfil()
+        if texto_perfil:
+            st.text(texto_perfil)
 
 # --- Title ---
 st.title("🐔 Forecast Peso Silo")
@@ -70,22 +86,272 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.abspath(script_dir)
 reports_folder = os.path.join(project_root, 'reports')
 linhagem_folder = os.path.join(project_root, 'static', 'linhagem')
+armazem = open_sensor_store(os.path.join(project_root, 'data', 'historico_sensores.sqlite'))
+cache_resultados = open_result_cache(os.path.join(project_root, '.cache', 'previsoes'))
+aviarios_historico = armazem.aviarios()
+
+# --- Performance instrumentation (also enabled by the FORECAST_METRICAS env var) ---
+metricas_ambiente = MetricasDesempenho.do_ambiente()
+with st.sidebar.expander("Desempenho"):
+    medir_desempenho = st.checkbox("Medir etapas", value=metricas_ambiente is not None)
+    medir_memoria = st.checkbox("Incluir memória (tracemalloc)", value=bool(metricas_ambiente and metricas_ambiente.memoria))
+    medir_perfil = st.checkbox("Incluir perfil (cProfile)", value=bool(metricas_ambiente and metricas_ambiente.perfil))
+    estatisticas_cache = cache_resultados.estatisticas()
+    st.caption(
+        f"Cache de previsões: {estatisticas_cache['acertos_memoria'] + estatisticas_cache['acertos_disco']} acertos "
+        f"({estatisticas_cache['acertos_disco']} do disco), {estatisticas_cache['faltas']} faltas, "
+        f"{estatisticas_cache['itens_memoria']} em memória"
+    )
+    if st.button("Limpar cache de previsões"):
+        cache_resultados.limpar(disco=True)
+metricas = MetricasDesempenho(memoria=medir_memoria, perfil=medir_perfil) if medir_desempenho else None
+
+def medicao():
+    # Collects into this run's metrics; a no-op context when instrumentation is off
+    return coletar(metricas) if metricas is not None else contextlib.nullcontext()
+
+def session_cache(nome, max_itens):
+    # Derived data kept across reruns of this session only; bounded so long sessions don't grow forever
+    if nome not in st.session_state:
+        st.session_state[nome] = CacheLRU(max_itens=max_itens)
+    return st.session_state[nome]
+
+def new_forecaster(df_sensores):
+    return SiloForecaster(
+        df_sensores=df_sensores,
+        linhagem_folder=linhagem_folder,
+        reports_folder=reports_folder,
+        armazem=armazem,
+        cache_resultados=cache_resultados
+    )
+
+def forecast_for(fonte, df_sensores, aviario, lote, n_cenarios):
+    # One forecast per (data source, aviary, lot parameters); the aviary's hourly frame is computed once
+    # per data source and reused when only the lot parameters change
+    # The lineage table comes from the process registry on every rerun, so an edited Excel file yields a new
+    # table object and a new key here
+    previsoes = session_cache('previsoes', max_itens=32)
+    tabela_consumo = obter_tabela_consumo(lote[1], linhagem_folder)
+    chave = (fonte, aviario, *lote, tabela_consumo, n_cenarios)
+    forecaster = previsoes.obter(chave)
+    if forecaster is not None:
+        return forecaster
+
+    medias_horarias = session_cache('medias_horarias', max_itens=64)
+    forecaster = new_forecaster(df_sensores)
+    with medicao():
+        medias_canais = medias_horarias.obter((fonte, aviario))
+        if medias_canais is None:
+            medias_canais = forecaster.medias_horarias(aviario)
+            medias_horarias.guardar((fonte, aviario), medias_canais)
+        forecaster.calcular_previsao(aviario, *lote, medias_canais=medias_canais)
+        if n_cenarios:
+            forecaster.simular_cenarios(n_cenarios)
+    previsoes.guardar(chave, forecaster)
+    return forecaster
+
+@st.fragment
+def show_forecast(forecaster):
+    # Runs as a fragment: the resolution switch below reruns only this block, not the whole app
+    resultado = forecaster.resultado
+    st.success("Projeção concluída com sucesso!")
+
+    dias, horas = resultado.autonomia_dias_horas
+    esgotamento = resultado.data_esgotamento.strftime('%d/%m/%Y %H:%M') if resultado.data_esgotamento else 'N/A'
+
+    # Row 1: Peso Atual, Idade Atual, Autonomia
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Peso Atual no Silo", f"{resultado.peso_atual_kg:.2f} kg")
+    with col2:
+        st.metric("Idade Atual do Lote", f"{resultado.idade_atual} dias")
+    with col3:
+        st.metric("Autonomia Estimada", f"{dias} dias e {horas} horas")
+
+    # Row 2: Data de Esgotamento, Idade de Esgotamento
+    col4, col5 = st.columns(2)
+    with col4:
+        st.metric("Data de Esgotamento", esgotamento)
+    with col5:
+        if resultado.idade_esgotamento is not None: st.metric("Idade de Esgotamento", f"{resultado.idade_esgotamento} dias")
+
+    # Row 3: Somatório de Ração Entregue
+    col6, = st.columns(1) # Single column for this metric
+    with col6:
+        if not resultado.df_entregas.empty:
+            st.metric("Total Ração Entregue", f"{resultado.total_entregue_kg:,.0f} kg".replace(",", "."))
+
+    # Row 4: Depletion window across the simulated scenarios
+    if resultado.cenarios is not None:
+        colunas_cenarios = st.columns(len(resultado.cenarios.datas_esgotamento))
+        for coluna, (quantil, data) in zip(colunas_cenarios, resultado.cenarios.datas_esgotamento.items()):
+            with coluna:
+                st.metric(f"Esgotamento P{quantil * 100:.0f}",
+                          data.strftime('%d/%m/%Y %H:%M') if data is not None else 'Além de 30 dias')
+
+    st.markdown("## Resultados Detalhados")
+    tab1, tab2, tab3, tab4 = st.tabs(["Gráfico de Projeção", "Relatório Completo", "Dados Processados", "Sensibilidade"])
+
+    with tab1:
+        # The PNG is rendered once per forecast and kept on it, so later reruns just resend the bytes
+        with medicao():
+            plot_png = forecaster.grafico_png()
+        st.image(plot_png)
+
+    with tab2:
+        with medicao():
+            report_string = forecaster.relatorio()
+        st.markdown(report_string)
+        # If you want to display the deliveries table separately, you'd need to return it from forecaster
+        # For now, it's part of the markdown string.
+
+    with tab3:
+        st.subheader("Dados Processados")
+        # Daily/6-hour rollups keep the table small for long lots; the hourly view is opt-in
+        resolucao = st.radio(
+            "Resolução",
+            options=["diaria", "6 horas", "horaria"],
+            format_func={"diaria": "Diária", "6 horas": "6 horas", "horaria": "Horária"}.get,
+            horizontal=True
+        )
+        st.dataframe(forecaster.agregados(resolucao))
+
+    with tab4:
+        show_sensitivity(forecaster)
+
+def show_sensitivity(forecaster):
+    # What-if sliders over the lot parameters; every combination comes from one varrer_parametros call
+    # on the forecast already computed, so moving a slider never re-runs the projection
+    st.caption("Autonomia com outros parâmetros do lote, mantendo o consumo recente observado.")
+    # Slider bounds always contain the sidebar values (which allow 0 birds and any dilution age)
+    aves_min, aves_max = max(int(forecaster.n_aves * 0.5), 1), max(int(forecaster.n_aves * 1.5), 2)
+    idade_diluicao = int(forecaster.idade_diluicao_start)
+    col1, col2 = st.columns(2)
+    with col1:
+        n_aves_sim = st.slider("Aves na projeção", min_value=aves_min, max_value=aves_max,
+                               value=min(max(int(forecaster.n_aves), aves_min), aves_max))
+        sobra_sim = st.slider("Sobra inicial (kg)", min_value=0, max_value=max(10000, int(forecaster.sobra_inicial_kg)),
+                              value=int(forecaster.sobra_inicial_kg), step=100)
+    with col2:
+        idade_sim = st.slider("Idade de diluição da sobra (dias)", min_value=min(1, idade_diluicao),
+                              max_value=max(60, idade_diluicao), value=idade_diluicao)
+        linhagem_sim = st.radio("Linhagem da projeção", options=["cobb", "ross"],
+                                index=["cobb", "ross"].index(forecaster.linhagem), horizontal=True)
+
+    faixa_aves = np.unique(np.linspace(n_aves_sim * 0.5, n_aves_sim * 1.5, 41).astype(int))
+    faixa_sobra = np.linspace(0, max(2 * sobra_sim, 5000), 41)
+    with medicao():
+        atual = forecaster.varrer_parametros(n_aves_sim, sobra_sim, idade_sim, linhagem_sim).iloc[0]
+        por_aves = forecaster.varrer_parametros(faixa_aves, sobra_sim, idade_sim, linhagem_sim)
+        por_sobra = forecaster.varrer_parametros(n_aves_sim, faixa_sobra, idade_sim, linhagem_sim)
+
+    if pd.notna(atual['data_esgotamento']):
+        st.metric("Autonomia simulada", f"{int(atual['horas_autonomia']) // 24} dias e {int(atual['horas_autonomia']) % 24} horas",
+                  delta=f"{atual['horas_autonomia'] - forecaster.resultado.autonomia / pd.Timedelta(hours=1):+.0f} h vs. projeção")
+        st.caption(f"Esgotamento simulado: {atual['data_esgotamento'].strftime('%d/%m/%Y %H:%M')}")
+    else:
+        st.metric("Autonomia simulada", "Além de 30 dias")
+
+    col3, col4 = st.columns(2)
+    with col3:
+        st.markdown("**Autonomia (h) x aves**")
+        st.line_chart(por_aves.set_index('n_aves')['horas_autonomia'])
+    with col4:
+        st.markdown("**Autonomia (h) x sobra inicial (kg)**")
+        st.line_chart(por_sobra.set_index('sobra_inicial_kg')['horas_autonomia'])
+
+@st.fragment
+def pdf_section(fonte, df_sensores, aviarios, lote):
+    # Runs as a fragment: the workers input and the button rerun only this block; the last PDF stays downloadable
+    st.markdown("---")
+    st.subheader("Gerar Relatório PDF Completo")
+    pdf_workers = st.number_input(
+        "Processos em paralelo",
+        min_value=1,
+        max_value=os.cpu_count() or 1,
+        value=1,
+        help="Número de processos usados para desenhar os gráficos do PDF. 1 = execução sequencial."
+    )
+    data_alojamento, linhagem, n_aves, idade_diluicao_start, sobra_inicial_kg = lote
+    if st.button("Gerar Relatório PDF Completo"):
+        if data_alojamento is None:
+            st.error("Por favor, selecione a Data de Alojamento para gerar o relatório completo.")
+        else:
+            with st.spinner("Gerando relatório PDF para todos os aviários..."), medicao():
+                # Same lot parameters for every aviary, processed in a single pass over the data
+                lotes = {
+                    av_num: dict(
+                        data_alojamento=data_alojamento,
+                        linhagem=linhagem,
+                        n_aves=n_aves,
+                        idade_diluicao_start=idade_diluicao_start,
+                        sobra_inicial_kg=sobra_inicial_kg
+                    )
+                    for av_num in aviarios
+                }
+                df_resultados, forecaster_instances_for_pdf = new_forecaster(df_sensores).run_batch(lotes, gerar_relatorios=False)
+                for av_num, erro in df_resultados['erro'].dropna().items():
+                    st.warning(f"Não foi possível gerar o relatório para o aviário {av_num}: {erro}")
+
+                if forecaster_instances_for_pdf:
+                    # fpdf is only loaded when a PDF is actually requested
+                    from src.report_generator import PDFReportGenerator
+                    pdf_generator = PDFReportGenerator(workers=pdf_workers)
+                    # Pass the dictionary of forecaster instances; the PDF is built in memory
+                    st.session_state['relatorio_pdf'] = ((fonte, lote), pdf_generator.generate_full_report(forecaster_instances_for_pdf))
+                    st.success("Relatório PDF gerado com sucesso!")
+                else:
+                    st.error("Nenhum relatório pôde ser gerado para os aviários selecionados.")
+
+    relatorio_pdf = st.session_state.get('relatorio_pdf')
+    if relatorio_pdf is not None and relatorio_pdf[0] == (fonte, lote):
+        st.download_button(
+            label="Baixar Relatório PDF",
+            data=relatorio_pdf[1],
+            file_name="relatorio_completo_granja.pdf",
+            mime="application/pdf"
+        )
+
+if uploaded_file is not None or aviarios_historico:
+    if uploaded_file is not None:
+        st.sidebar.success("Arquivo carregado!")
+        somente_horario = st.sidebar.checkbox(
+            "Ler apenas as médias horárias",
+            value=uploaded_file.size > LIMITE_LEITURA_COMPLETA_MB * 1024 ** 2,
+            help="Lê o arquivo em blocos e guarda só a média de cada hora por silo: usa muito menos memória em "
+                 "exportações grandes, mas as leituras não são acrescentadas ao histórico local."
+        )
+
+        # The loaded frame and its aviary index are kept per session, keyed by the upload,
+        # so widget interactions don't reload or re-scan the data
+        fonte = ('arquivo', uploaded_file.file_id, somente_horario)
+        sensores_sessao = session_cache('sensores', max_itens=2)
+        dados_sensores = sensores_sessao.obter(fonte)
+        if dados_sensores is None:
+            with medicao():
+                if somente_horario:
+                    df_sensores_completo = load_sensor_data_hourly(uploaded_file)
+                else:
+                    df_sensores_completo = load_sensor_data(uploaded_file, armazem)
+
+            # Ensure 'Collector' column exists before proceeding
+            if 'collector' not in df_sensores_completo.columns:
+                st.error("O arquivo CSV carregado não contém a coluna 'Collector' ou 'Coletor'. Verifique o formato do arquivo.")
+                st.stop()
+
+            dados_sensores = (df_sensores_completo, sorted(int(aviario) for aviario in df_sensores_completo['aviario_num'].unique()))
+            sensores_sessao.guardar(fonte, dados_sensores)
+        df_sensores_completo, aviarios_disponiveis = dados_sensores
 
-if uploaded_file is not None:
-    st.sidebar.success("Arquivo carregado!")
-    
-    df_sensores_completo = load_sensor_data(uploaded_file)
-    
-    # Ensure 'Collector' column exists before proceeding
-    if 'collector' not in df_sensores_completo.columns:
-        st.error("O arquivo CSV carregado não contém a coluna 'Collector' ou 'Coletor'. Verifique o formato do arquivo.")
-        st.stop()
-
-    df_sensores_completo['aviario_num'] = pd.to_numeric(df_sensores_completo['collector'].str.extract('(\d+)', expand=False), errors='coerce')
-    df_sensores_completo.dropna(subset=['aviario_num'], inplace=True)
-    df_sensores_completo['aviario_num'] = df_sensores_completo['aviario_num'].astype(int)
-    
-    aviarios_disponiveis = sorted(df_sensores_completo['aviario_num'].unique())
+        unidade = "médias horárias" if somente_horario else "leituras"
+        st.sidebar.caption(f"{len(df_sensores_completo):,} {unidade} em memória ({memoria_mb(df_sensores_completo):.1f} MB)".replace(",", "."))
+    else:
+        # No upload: forecasts read each aviary's recent readings straight from the local history
+        ultima_leitura = armazem.ultima_leitura()
+        st.sidebar.info(f"Usando o histórico salvo (última leitura: {ultima_leitura.strftime('%d/%m/%Y %H:%M')}).")
+        fonte = ('historico', ultima_leitura)
+        df_sensores_completo = None
+        aviarios_disponiveis = aviarios_historico
 
     # --- Get other inputs ---
     st.sidebar.subheader("Informações do Lote")
@@ -125,128 +391,38 @@ if uploaded_file is not None:
         help="Valor de ração remanescente do lote anterior. Será preenchido automaticamente se detectado."
     )
 
+    st.sidebar.subheader("Incerteza da Projeção")
+    n_cenarios = st.sidebar.number_input(
+        "Cenários de Consumo (0 = desligado)",
+        min_value=0,
+        max_value=20000,
+        value=0,
+        step=500,
+        help="Simula variações do consumo recente e mostra a janela de esgotamento P10-P90 no gráfico."
+    )
+
+    # After the first run, results follow the inputs: only the selected aviary is (re)computed,
+    # and forecasts already made in this session are shown as they are
     if st.sidebar.button("Executar Projeção"):
+        st.session_state['projecao_ativa'] = True
+
+    lote = (data_alojamento, linhagem, n_aves, idade_diluicao_start, sobra_inicial_kg)
+    if st.session_state.get('projecao_ativa'):
         if data_alojamento is None:
             st.error("Por favor, selecione a Data de Alojamento.")
         else:
             try:
-                # Instantiate and run the forecaster
-                forecaster = SiloForecaster(
-                    df_sensores=df_sensores_completo, 
-                    linhagem_folder=linhagem_folder, 
-                    reports_folder=reports_folder
-                )
-                
-                report_string, plot_fig, df_entregas = forecaster.run_forecast(
-                    aviario_selecionado=aviario_selecionado,
-                    data_alojamento=data_alojamento,
-                    linhagem=linhagem,
-                    n_aves=n_aves,
-                    idade_diluicao_start=idade_diluicao_start,
-                    sobra_inicial_kg=sobra_inicial_kg
-                )
-
-                st.success("Projeção concluída com sucesso!")
-
-                # Display Metrics (extracted from report_string or calculated here)
-                # For now, let's parse from report_string as it's already formatted
-                
-                # Example parsing (this can be made more robust)
-                peso_atual_match = re.search(r"- Peso Atual no Silo: (\d+\.\d{2}) kg", report_string)
-                idade_atual_match = re.search(r"- Idade Atual do Lote: (\d+) dias", report_string)
-                autonomia_match = re.search(r"- Autonomia Estimada: (\d+) dias e (\d+) horas", report_string)
-                esgotamento_match = re.search(r"- Data Estimada de Esgotamento: (.*)", report_string)
-                idade_esgotamento_match = re.search(r"- Idade Estimada de Esgotamento: (\d+) dias", report_string)
-
-                # Row 1: Peso Atual, Idade Atual, Autonomia
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    if peso_atual_match: st.metric("Peso Atual no Silo", f"{peso_atual_match.group(1)} kg")
-                with col2:
-                    if idade_atual_match: st.metric("Idade Atual do Lote", f"{idade_atual_match.group(1)} dias")
-                with col3:
-                    if autonomia_match: st.metric("Autonomia Estimada", f"{autonomia_match.group(1)} dias e {autonomia_match.group(2)} horas")
-
-                # Row 2: Data de Esgotamento, Idade de Esgotamento
-                col4, col5 = st.columns(2)
-                with col4:
-                    if esgotamento_match: st.metric("Data de Esgotamento", esgotamento_match.group(1))
-                with col5:
-                    if idade_esgotamento_match: st.metric("Idade de Esgotamento", f"{idade_esgotamento_match.group(1)} dias")
-
-                # Row 3: Somatório de Ração Entregue
-                col6, = st.columns(1) # Single column for this metric
-                with col6:
-                    if not df_entregas.empty:
-                        total_delivered_feed = df_entregas['quantidade_kg'].sum()
-                        st.metric("Total Ração Entregue", f"{total_delivered_feed:,.0f} kg".replace(",", "."))
-
-                st.markdown("## Resultados Detalhados")
-                tab1, tab2, tab3 = st.tabs(["Gráfico de Projeção", "Relatório Completo", "Dados Processados"]) # Added tab3
-
-                with tab1:
-                    st.pyplot(plot_fig)
-                    plt.close(plot_fig) # Close the figure to free memory
-
-                with tab2:
-                    st.markdown(report_string)
-                    # If you want to display the deliveries table separately, you'd need to return it from forecaster
-                    # For now, it's part of the markdown string.
-
-                with tab3:
-                    st.subheader("Dados Horários Processados")
-                    st.dataframe(forecaster.df_hourly) # Access the processed dataframe from the forecaster instance
-
+                forecaster = forecast_for(fonte, df_sensores_completo, aviario_selecionado, lote, int(n_cenarios))
             except Exception as e:
                 st.error(f"Ocorreu um erro durante a projeção: {e}")
                 st.exception(e) # Display full traceback for debugging
+            else:
+                show_forecast(forecaster)
 
-    st.markdown("---")
-    st.subheader("Gerar Relatório PDF Completo")
-    if st.button("Gerar Relatório PDF Completo"):
-        if data_alojamento is None:
-            st.error("Por favor, selecione a Data de Alojamento para gerar o relatório completo.")
-        else:
-            with st.spinner("Gerando relatório PDF para todos os aviários..."):
-                forecaster_instances_for_pdf = {}
-                for av_num in aviarios_disponiveis:
-                    try:
-                        # Create a new forecaster instance for each aviary
-                        # This ensures each aviary's data is processed independently
-                        temp_forecaster = SiloForecaster(
-                            df_sensores=df_sensores_completo, 
-                            linhagem_folder=linhagem_folder, 
-                            reports_folder=reports_folder
-                        )
-                        # Run forecast for the current aviary using the selected parameters
-                        temp_forecaster.run_forecast(
-                            aviario_selecionado=av_num,
-                            data_alojamento=data_alojamento, # Using the selected date for all
-                            linhagem=linhagem,               # Using the selected lineage for all
-                            n_aves=n_aves,                   # Using the selected n_aves for all
-                            idade_diluicao_start=idade_diluicao_start,
-                            sobra_inicial_kg=sobra_inicial_kg
-                        )
-                        forecaster_instances_for_pdf[av_num] = temp_forecaster
-                    except Exception as e:
-                        st.warning(f"Não foi possível gerar o relatório para o aviário {av_num}: {e}")
-                        # Continue to next aviary even if one fails
+    pdf_section(fonte, df_sensores_completo, aviarios_disponiveis, lote)
 
-                if forecaster_instances_for_pdf:
-                    pdf_generator = PDFReportGenerator()
-                    # Pass the dictionary of forecaster instances
-                    pdf_generator.generate_full_report(forecaster_instances_for_pdf, "relatorio_completo_granja.pdf")
-                    
-                    with open("relatorio_completo_granja.pdf", "rb") as pdf_file:
-                        st.download_button(
-                            label="Baixar Relatório PDF",
-                            data=pdf_file,
-                            file_name="relatorio_completo_granja.pdf",
-                            mime="application/pdf"
-                        )
-                    st.success("Relatório PDF gerado com sucesso!")
-                else:
-                    st.error("Nenhum relatório pôde ser gerado para os aviários selecionados.")
+    if metricas is not None:
+        show_performance_panel(metricas)
 
 else:
     st.info("Por favor, carregue o arquivo `Sensores.csv` na barra lateral para começar.")
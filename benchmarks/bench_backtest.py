@@ -0,0 +1,91 @@
+"""Mede o backtest de uma granja inteira e o compara com recalcular a projeção em cada corte.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_backtest --aviarios 60 --dias 45 --amostra 50
+
+O recálculo por corte (como chamar a previsão uma vez por hora do histórico)
+é medido em `--amostra` cortes por aviário e extrapolado para todos; nesses
+cortes, a data de esgotamento e o fator de consumo do backtest são
+conferidos com os da projeção recalculada.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.data_handler import importar_sensores
+from src.forecaster import SiloForecaster
+from src.backtest import resumir_backtest
+from benchmarks.gerador_sensores import gerar_sensores, salvar_sensores
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_LINHAGEM = os.path.join(PASTA_PROJETO, 'static', 'linhagem')
+
+
+def projetar_no_corte(previsao, df_hourly, corte):
+    """Data de esgotamento (NaT se não esgota em 30 dias) e fator da projeção com o histórico até `corte`."""
+    previsao.df_hourly = df_hourly.loc[:corte].copy()
+    previsao._project_autonomy()
+    serie = previsao.forecast_series
+    return (serie.index[-1] if serie.iloc[-1] <= 0 else pd.NaT), previsao.fator_consumo
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--aviarios', type=int, default=60)
+    parser.add_argument('--dias', type=int, default=45)
+    parser.add_argument('--ruido', type=float, default=10.0)
+    parser.add_argument('--reabastecimento', type=float, default=0.1,
+                        help='Fração da capacidade em que o silo é reabastecido.')
+    parser.add_argument('--amostra', type=int, default=50, help='Cortes por aviário no recálculo de referência.')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'Sensores.csv')
+        salvar_sensores(gerar_sensores(args.aviarios, dias=args.dias, intervalo_min=10, ruido_kg=args.ruido,
+                                       nivel_reabastecimento=args.reabastecimento), caminho)
+        df_sensores = importar_sensores(caminho, rapido=True, compacto=True)
+
+    data_alojamento = (df_sensores.index.max() - timedelta(days=args.dias - 2)).date()
+    lotes = {
+        aviario: dict(data_alojamento=data_alojamento, linhagem='cobb' if aviario % 2 else 'ross', n_aves=25000)
+        for aviario in sorted(df_sensores['aviario_num'].unique())
+    }
+    forecaster = SiloForecaster(df_sensores, PASTA_LINHAGEM, tempfile.gettempdir())
+    _, previsoes = forecaster.run_batch(lotes, gerar_relatorios=False)
+
+    tempos = []
+    for _ in range(args.repeticoes):
+        inicio = time.perf_counter()
+        df_backtest, resumo = forecaster.backtest(lotes, previsoes=previsoes)
+        tempos.append(time.perf_counter() - inicio)
+    tempo = min(tempos)
+
+    # Referência: projeção recalculada em uma amostra de cortes de cada aviário
+    rng = np.random.default_rng(0)
+    conferidos = divergentes = 0
+    inicio = time.perf_counter()
+    for aviario, previsao in previsoes.items():
+        df_hourly = previsao.df_hourly
+        cortes = df_backtest.loc[aviario]
+        for corte in rng.choice(cortes.index, min(args.amostra, len(cortes)), replace=False):
+            esgotamento, fator = projetar_no_corte(previsao, df_hourly, corte)
+            esperado = cortes.loc[corte, 'data_esgotamento']
+            conferidos += 1
+            divergentes += not ((pd.isna(esgotamento) and pd.isna(esperado)) or esgotamento == esperado) \
+                or not np.isclose(fator, cortes.loc[corte, 'fator_consumo'], rtol=1e-6)
+        previsao.df_hourly = df_hourly
+    tempo_por_corte = (time.perf_counter() - inicio) / conferidos
+
+    print(f"{len(previsoes)} aviários, {len(df_backtest):,} cortes")
+    print(f"backtest:              {tempo:8.3f} s ({tempo / len(df_backtest) * 1e6:.1f} µs/corte)")
+    print(f"recálculo por corte:   {tempo_por_corte * len(df_backtest):8.3f} s estimados "
+          f"({tempo_por_corte * 1e6:.0f} µs/corte, {tempo_por_corte * len(df_backtest) / tempo:.0f}x)")
+    print(f"conferência:           {conferidos} cortes, {divergentes} divergentes")
+    print()
+    print(resumir_backtest(df_backtest, por=('linhagem',)).round(1).to_string())
@@ -0,0 +1,62 @@
+"""Mede o custo da projeção por cenários (Monte Carlo) em uma granja inteira.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_cenarios --aviarios 60 --cenarios 500 2000 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+import matplotlib
+matplotlib.use('Agg')
+
+from src.data_handler import importar_sensores, numero_aviario
+from src.forecaster import SiloForecaster
+from benchmarks.gerador_sensores import gerar_sensores, salvar_sensores
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_LINHAGEM = os.path.join(PASTA_PROJETO, 'static', 'linhagem')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--aviarios', type=int, default=60)
+    parser.add_argument('--dias', type=int, default=30)
+    parser.add_argument('--ruido', type=float, default=10.0)
+    parser.add_argument('--cenarios', type=int, nargs='+', default=[500, 2000, 5000])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'Sensores.csv')
+        salvar_sensores(gerar_sensores(args.aviarios, dias=args.dias, ruido_kg=args.ruido), caminho)
+        df_sensores = importar_sensores(caminho, rapido=True)
+    df_sensores['aviario_num'] = numero_aviario(df_sensores['collector']).astype(int)
+
+    data_alojamento = (df_sensores.index.max() - timedelta(days=args.dias - 5)).date()
+    lotes = {
+        aviario: dict(data_alojamento=data_alojamento, linhagem='cobb', n_aves=25000)
+        for aviario in sorted(df_sensores['aviario_num'].unique())
+    }
+    _, previsoes = SiloForecaster(df_sensores, PASTA_LINHAGEM, tempfile.gettempdir()).run_batch(lotes, gerar_relatorios=False)
+
+    print(f"{len(previsoes)} aviários")
+    print(f"{'cenários':>9}{'tempo (s)':>11}{'ms/aviário':>12}{'trajetórias/s':>16}{'largura P10-P90 (h)':>21}")
+    for n_cenarios in args.cenarios:
+        tempos = []
+        for repeticao in range(args.repeticoes):
+            inicio = time.perf_counter()
+            for aviario, previsao in previsoes.items():
+                previsao.simular_cenarios(n_cenarios, seed=[repeticao, aviario])
+            tempos.append(time.perf_counter() - inicio)
+        tempo = min(tempos)
+        larguras = [
+            (fim - inicio).total_seconds() / 3600
+            for inicio, fim in (previsao.cenarios.janela_esgotamento for previsao in previsoes.values())
+            if inicio is not None and fim is not None
+        ]
+        largura = sum(larguras) / len(larguras) if larguras else float('nan')
+        print(f"{n_cenarios:>9}{tempo:>11.3f}{tempo / len(previsoes) * 1000:>12.1f}"
+              f"{n_cenarios * len(previsoes) / tempo:>16,.0f}{largura:>21.1f}")
@@ -0,0 +1,94 @@
+"""Compara a detecção de entregas por aviário (implementação original) com a passada única da granja.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_entregas --aviarios 100 --dias 60 --reabastecimento 0.2
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+import matplotlib
+matplotlib.use('Agg')
+import pandas as pd
+
+from src.data_handler import importar_sensores, numero_aviario
+from src.entregas import detectar_entregas, entregas_do_aviario
+from src.forecaster import SiloForecaster
+from benchmarks.gerador_sensores import gerar_sensores, salvar_sensores
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_LINHAGEM = os.path.join(PASTA_PROJETO, 'static', 'linhagem')
+
+
+def detectar_entregas_original(df_hourly, threshold_kg=500):
+    """Implementação anterior de SiloForecaster._detectar_entregas (altera df_hourly)."""
+    df_hourly['mudanca_peso'] = df_hourly['peso_silo'].diff()
+    entregas_raw = df_hourly[df_hourly['mudanca_peso'] > threshold_kg].copy()
+
+    if entregas_raw.empty:
+        return pd.DataFrame(columns=['Quantidade (kg)'], index=pd.Index([], name='Data da Entrega'))
+
+    group_id = (entregas_raw.index.to_series().diff() > pd.Timedelta('1 hour')).cumsum()
+
+    entregas_agrupadas = entregas_raw.groupby(group_id).agg(
+        data_entrega=('mudanca_peso', 'idxmin'),
+        quantidade_kg=('mudanca_peso', 'sum')
+    )
+    entregas_agrupadas.set_index('data_entrega', inplace=True)
+    entregas_agrupadas.index.name = 'Data da Entrega'
+    return entregas_agrupadas
+
+
+def cronometrar(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return resultado, min(tempos)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--aviarios', type=int, default=100)
+    parser.add_argument('--dias', type=int, default=60)
+    parser.add_argument('--intervalo', type=int, default=10, help='Intervalo entre leituras, em minutos.')
+    parser.add_argument('--ruido', type=float, default=10.0)
+    parser.add_argument('--reabastecimento', type=float, default=0.2)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'Sensores.csv')
+        salvar_sensores(gerar_sensores(args.aviarios, dias=args.dias, intervalo_min=args.intervalo,
+                                       ruido_kg=args.ruido, nivel_reabastecimento=args.reabastecimento), caminho)
+        df_sensores = importar_sensores(caminho, rapido=True)
+    df_sensores['aviario_num'] = numero_aviario(df_sensores['collector']).astype(int)
+
+    data_alojamento = (df_sensores.index.max() - timedelta(days=args.dias - 5)).date()
+    lotes = {
+        aviario: dict(data_alojamento=data_alojamento, linhagem='cobb', n_aves=25000)
+        for aviario in sorted(df_sensores['aviario_num'].unique())
+    }
+    _, previsoes = SiloForecaster(df_sensores, PASTA_LINHAGEM, tempfile.gettempdir()).run_batch(lotes, gerar_relatorios=False)
+    horarios = {aviario: previsao.df_hourly[['peso_silo']] for aviario, previsao in previsoes.items()}
+    horas = sum(len(df) for df in horarios.values())
+
+    original, t_original = cronometrar(
+        lambda: {aviario: detectar_entregas_original(df.copy()) for aviario, df in horarios.items()}, args.repeticoes
+    )
+
+    def passada_unica():
+        peso = pd.concat({aviario: df['peso_silo'] for aviario, df in horarios.items()}, names=['aviario_num', 'timedate'])
+        return detectar_entregas(peso)
+    granja, t_granja = cronometrar(passada_unica, args.repeticoes)
+
+    for aviario, esperado in original.items():
+        pd.testing.assert_frame_equal(entregas_do_aviario(granja, aviario), esperado, check_dtype=False)
+
+    print(f"{len(horarios)} aviários, {horas:,} horas, {len(granja):,} entregas (resultados idênticos)")
+    print(f"{'implementação':<26}{'tempo (s)':>10}{'aviários/s':>14}")
+    for nome, tempo in [('por aviário (original)', t_original), ('passada única', t_granja)]:
+        print(f"{nome:<26}{tempo:>10.4f}{len(horarios) / tempo:>14,.0f}")
@@ -0,0 +1,52 @@
+"""Compara a leitura original e a leitura rápida de importar_sensores.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_importacao --aviarios 40 --dias 30 --intervalo 1
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from src.data_handler import importar_sensores
+from benchmarks.gerador_sensores import gerar_sensores, salvar_sensores
+
+
+def cronometrar(funcao, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--aviarios', type=int, default=40)
+    parser.add_argument('--canais', type=int, default=2)
+    parser.add_argument('--dias', type=int, default=30)
+    parser.add_argument('--intervalo', type=int, default=1, help='Intervalo entre leituras, em minutos.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'Sensores.csv')
+        salvar_sensores(gerar_sensores(args.aviarios, args.canais, args.dias, args.intervalo), caminho)
+        tamanho_mb = os.path.getsize(caminho) / 1e6
+
+        df, t_original = cronometrar(importar_sensores, caminho)
+        linhas = len(df)
+        memoria_original = df.memory_usage(deep=True).sum() / 1e6
+        del df
+
+        df, t_rapido = cronometrar(importar_sensores, caminho, rapido=True)
+        memoria_rapido = df.memory_usage(deep=True).sum() / 1e6
+        del df
+
+        cache_dir = os.path.join(pasta, 'cache')
+        _, t_cache_frio = cronometrar(importar_sensores, caminho, rapido=True, cache_dir=cache_dir)
+        _, t_cache_quente = cronometrar(importar_sensores, caminho, rapido=True, cache_dir=cache_dir)
+
+    print(f"Arquivo: {linhas:,} linhas, {tamanho_mb:.1f} MB")
+    print(f"{'modo':<26}{'tempo (s)':>10}{'linhas/s':>14}")
+    for modo, tempo in [('original', t_original), ('rapido', t_rapido),
+                        ('rapido + cache (frio)', t_cache_frio), ('rapido + cache (quente)', t_cache_quente)]:
+        print(f"{modo:<26}{tempo:>10.2f}{linhas / tempo:>14,.0f}")
+    print(f"Memória do DataFrame: original {memoria_original:.0f} MB, rápido {memoria_rapido:.0f} MB")
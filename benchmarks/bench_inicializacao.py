@@ -0,0 +1,74 @@
+"""Mede o tempo de importação (partida a frio) dos pontos de entrada só de cálculo, com `python -X importtime`.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_inicializacao --repeticoes 5
+    python -m benchmarks.bench_inicializacao --verificar   # falha se um módulo pesado for importado
+
+Cada módulo é importado em um processo novo; o tempo é o melhor entre as
+repetições (soma dos tempos próprios relatados pelo -X importtime). Os
+módulos pesados (gráficos, PDF, diálogos e tabelas em texto) só devem ser
+carregados quando esses recursos são usados, então não podem aparecer aqui.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PONTOS_DE_ENTRADA = ['src.data_handler', 'src.forecaster', 'src.cache', 'src.vigia', 'src.report_generator', 'main',
+                     'servico']
+MODULOS_PESADOS = ('matplotlib', 'fpdf', 'tkinter', 'tabulate', 'PIL')
+
+
+def tempos_importacao(modulo):
+    """Tempo próprio e acumulado (s) de cada módulo carregado por `import modulo`, na ordem do -X importtime."""
+    processo = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'], cwd=PASTA_PROJETO,
+                              capture_output=True, text=True, check=True)
+    tempos = []
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, acumulado, nome = linha[len('import time:'):].split('|')
+        # Módulos importados por outros vêm indentados sob o nome (após o espaço do separador)
+        tempos.append((nome[1:].rstrip(), int(proprio) / 1e6, int(acumulado) / 1e6))
+    return tempos
+
+
+def medir_importacao(modulo, repeticoes=5):
+    """Melhor tempo total de importação (s), maiores dependências diretas e módulos pesados carregados."""
+    melhor = None
+    for _ in range(repeticoes):
+        tempos = tempos_importacao(modulo)
+        total = sum(proprio for _, proprio, _ in tempos)
+        if melhor is None or total < melhor[0]:
+            melhor = (total, tempos)
+
+    total, tempos = melhor
+    # Importações diretas do módulo (um nível de indentação no -X importtime), pelo tempo acumulado
+    principais = sorted(((nome.strip(), acumulado) for nome, _, acumulado in tempos
+                         if len(nome) - len(nome.lstrip()) <= 2 and nome.strip() != modulo),
+                        key=lambda item: -item[1])[:5]
+    pesados = sorted({nome.strip().split('.')[0] for nome, _, _ in tempos} & set(MODULOS_PESADOS))
+    return {'tempo_s': round(total, 4), 'principais': principais, 'pesados': pesados}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--modulos', nargs='+', default=PONTOS_DE_ENTRADA)
+    parser.add_argument('--verificar', action='store_true',
+                        help='Sai com código 1 se algum ponto de entrada importar um módulo pesado.')
+    args = parser.parse_args()
+
+    falhas = []
+    for modulo in args.modulos:
+        resultado = medir_importacao(modulo, args.repeticoes)
+        principais = ', '.join(f"{nome} {tempo * 1000:.0f}" for nome, tempo in resultado['principais'])
+        print(f"{modulo:<20}{resultado['tempo_s'] * 1000:>8.0f} ms  ({principais} ms)")
+        if resultado['pesados']:
+            falhas.append(modulo)
+            print(f"{'':<20}módulos pesados importados: {', '.join(resultado['pesados'])}")
+
+    if args.verificar and falhas:
+        sys.exit(1)
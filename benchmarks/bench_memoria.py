@@ -0,0 +1,79 @@
+"""Compara a memória do DataFrame de sensores no esquema original e no compacto.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_memoria --aviarios 50 --dias 60
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+import matplotlib
+matplotlib.use('Agg')
+import pandas as pd
+
+from src.data_handler import importar_sensores, memoria_mb
+from src.forecaster import SiloForecaster
+from benchmarks.gerador_sensores import gerar_sensores, salvar_sensores
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_LINHAGEM = os.path.join(PASTA_PROJETO, 'static', 'linhagem')
+
+
+def esquema_original(caminho):
+    """Leitura padrão seguida do número do aviário por expressão regular em cada linha (como fazia o app)."""
+    df = importar_sensores(caminho)
+    df['aviario_num'] = pd.to_numeric(df['collector'].str.extract(r'(\d+)', expand=False), errors='coerce')
+    df.dropna(subset=['aviario_num'], inplace=True)
+    df['aviario_num'] = df['aviario_num'].astype(int)
+    return df
+
+
+def por_coluna(df):
+    uso = df.memory_usage(index=True, deep=True) / 1024 ** 2
+    return ', '.join(f"{coluna} {mb:.1f}" for coluna, mb in uso.items())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--aviarios', type=int, default=50)
+    parser.add_argument('--dias', type=int, default=60)
+    parser.add_argument('--intervalo', type=int, default=10, help='Intervalo entre leituras, em minutos.')
+    parser.add_argument('--sem-previsao', action='store_true', help='Não compara as previsões dos dois esquemas.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'Sensores.csv')
+        salvar_sensores(gerar_sensores(args.aviarios, dias=args.dias, intervalo_min=args.intervalo), caminho)
+        esquemas = {}
+        for nome, carregar in [
+            ('original', lambda: esquema_original(caminho)),
+            ('rápido', lambda: importar_sensores(caminho, rapido=True)),
+            ('compacto', lambda: importar_sensores(caminho, rapido=True, compacto=True)),
+        ]:
+            inicio = time.perf_counter()
+            esquemas[nome] = carregar()
+            esquemas[nome + '_tempo'] = time.perf_counter() - inicio
+
+    original = esquemas['original']
+    print(f"{len(original):,} leituras de {args.aviarios} aviários")
+    print(f"{'esquema':<10}{'memória (MB)':>14}{'redução':>9}{'leitura (s)':>13}  por coluna (MB)")
+    for nome in ('original', 'rápido', 'compacto'):
+        df = esquemas[nome]
+        print(f"{nome:<10}{memoria_mb(df):>14.1f}{memoria_mb(original) / memoria_mb(df):>8.1f}x"
+              f"{esquemas[nome + '_tempo']:>13.2f}  {por_coluna(df)}")
+
+    if not args.sem_previsao:
+        compacto = esquemas['compacto']
+        data_alojamento = (compacto.index.max() - timedelta(days=args.dias - 5)).date()
+        lotes = {
+            int(aviario): dict(data_alojamento=data_alojamento, linhagem='cobb', n_aves=25000)
+            for aviario in sorted(compacto['aviario_num'].unique())
+        }
+        resultados = {
+            nome: SiloForecaster(df, PASTA_LINHAGEM, tempfile.gettempdir()).run_batch(lotes, gerar_relatorios=False)[0]
+            for nome, df in [('original', original), ('compacto', compacto)]
+        }
+        diferenca = (resultados['original']['autonomia_horas'] - resultados['compacto']['autonomia_horas']).abs().max()
+        print(f"Maior diferença de autonomia entre os esquemas: {diferenca:.0f} h")
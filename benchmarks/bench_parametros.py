@@ -0,0 +1,54 @@
+"""Mede a latência de SiloForecaster.varrer_parametros para grades de parâmetros de tamanhos diferentes.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_parametros --dias 30 --repeticoes 20
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from src.data_handler import importar_sensores, obter_tabela_consumo
+from src.forecaster import SiloForecaster
+from benchmarks.gerador_sensores import gerar_sensores, salvar_sensores
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_LINHAGEM = os.path.join(PASTA_PROJETO, 'static', 'linhagem')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dias', type=int, default=30)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'Sensores.csv')
+        salvar_sensores(gerar_sensores(1, dias=args.dias, intervalo_min=10, ruido_kg=10.0), caminho)
+        df_sensores = importar_sensores(caminho, rapido=True, compacto=True)
+
+    tabelas = {linhagem: obter_tabela_consumo(linhagem, PASTA_LINHAGEM) for linhagem in ('cobb', 'ross')}
+    previsao = SiloForecaster(df_sensores, PASTA_LINHAGEM, tempfile.gettempdir(), tabelas_consumo=tabelas)
+    data_alojamento = (df_sensores.index.max() - timedelta(days=args.dias - 5)).date()
+    previsao.calcular_previsao(int(df_sensores['aviario_num'].iloc[0]), data_alojamento, 'cobb', 25000, 19, 2000.0)
+
+    # Uma interação de slider (1 combinação), as curvas da aba de sensibilidade (41) e grades maiores
+    grades = {
+        '1 combinação': {},
+        'curva de aves': dict(n_aves=np.linspace(12500, 37500, 41).astype(int)),
+        'aves x sobra': dict(n_aves=np.linspace(12500, 37500, 41).astype(int), sobra_inicial_kg=np.linspace(0, 8000, 41)),
+        'grade completa': dict(n_aves=np.linspace(12500, 37500, 41).astype(int), sobra_inicial_kg=np.linspace(0, 8000, 41),
+                               idade_diluicao_start=np.arange(10, 40), linhagem=['cobb', 'ross']),
+    }
+    print(f"{'grade':<16}{'combinações':>13}{'ms':>9}{'µs/combinação':>16}")
+    for nome, parametros in grades.items():
+        tempos = []
+        for _ in range(args.repeticoes):
+            inicio = time.perf_counter()
+            resultado = previsao.varrer_parametros(**parametros)
+            tempos.append(time.perf_counter() - inicio)
+        tempo = min(tempos)
+        print(f"{nome:<16}{len(resultado):>13,}{tempo * 1000:>9.2f}{tempo / len(resultado) * 1e6:>16.2f}")
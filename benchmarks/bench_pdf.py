@@ -0,0 +1,61 @@
+"""Mede a geração do relatório PDF completo (páginas por segundo).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_pdf --aviarios 40 --workers 1 4 --dpi 72 100
+"""
+import argparse
+import os
+import time
+from datetime import timedelta
+
+import matplotlib
+matplotlib.use('Agg')
+
+from src.data_handler import importar_sensores, numero_aviario
+from src.forecaster import SiloForecaster
+from src.report_generator import PDFReportGenerator
+from benchmarks.gerador_sensores import gerar_sensores, salvar_sensores
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_LINHAGEM = os.path.join(PASTA_PROJETO, 'static', 'linhagem')
+
+
+def preparar_previsoes(n_aviarios, dias, pasta):
+    """Gera uma exportação sintética e executa o run_batch (só cálculo) para todos os aviários."""
+    caminho = os.path.join(pasta, 'Sensores.csv')
+    df = gerar_sensores(n_aviarios, dias=dias)
+    salvar_sensores(df, caminho)
+    df_sensores = importar_sensores(caminho, rapido=True)
+    df_sensores['aviario_num'] = numero_aviario(df_sensores['collector']).astype(int)
+
+    data_alojamento = (df_sensores.index.max() - timedelta(days=20)).date()
+    lotes = {
+        aviario: dict(data_alojamento=data_alojamento, linhagem='cobb', n_aves=25000)
+        for aviario in sorted(df_sensores['aviario_num'].unique())
+    }
+    _, previsoes = SiloForecaster(df_sensores, PASTA_LINHAGEM, pasta).run_batch(lotes, gerar_relatorios=False)
+    return previsoes
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--aviarios', type=int, default=40)
+    parser.add_argument('--dias', type=int, default=15)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--dpi', type=int, nargs='+', default=[100])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        previsoes = preparar_previsoes(args.aviarios, args.dias, pasta)
+
+    print(f"{'workers':>8}{'dpi':>6}{'tempo (s)':>11}{'páginas/s':>11}{'tamanho (KB)':>14}")
+    for dpi in args.dpi:
+        for workers in args.workers:
+            # Cópias sem PNG em cache, para que cada rodada rasterize todos os gráficos
+            instancias = {aviario: previsao.copia_resultados() for aviario, previsao in previsoes.items()}
+            inicio = time.perf_counter()
+            pdf = PDFReportGenerator(dpi=dpi, workers=workers).generate_full_report(instancias)
+            tempo = time.perf_counter() - inicio
+            print(f"{workers:>8}{dpi:>6}{tempo:>11.2f}{len(instancias) / tempo:>11.1f}{len(pdf) / 1024:>14.0f}")
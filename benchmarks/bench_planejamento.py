@@ -0,0 +1,90 @@
+"""Mede o planejamento de entregas (planejamento.planejar_entregas) para milhares de silos de várias granjas.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_planejamento --granjas 200 --aviarios 20 --caminhoes 300
+
+As projeções são sintéticas (peso inicial e consumo crescente sorteados por
+silo, no formato de SiloForecaster.projecao_horizonte). Depois do
+planejamento, o peso de cada silo com as entregas programadas é reconstruído
+hora a hora para conferir que nenhum fica abaixo da margem até o fim do
+horizonte, a não ser por entregas atrasadas ou sem caminhão, nem passa da capacidade.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.backtest import HORAS_PROJECAO
+from src.planejamento import MARGEM_PADRAO, planejar_entregas
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def projecoes_sinteticas(granjas, aviarios, capacidade_kg, seed=0):
+    """Peso projetado sem entregas de cada silo (granja, aviário), com o consumo subindo com a idade do lote."""
+    rng = np.random.default_rng(seed)
+    n = granjas * aviarios
+    inicio = pd.Timestamp('2025-03-01') + pd.to_timedelta(rng.integers(0, 6, n), unit='h')
+    horas = np.arange(1, HORAS_PROJECAO + 1)
+    consumo_inicial = rng.uniform(60, 160, n)[:, None]
+    consumo = consumo_inicial * (1 + horas / (24 * 30))
+    pesos = rng.uniform(0.15, 0.95, n)[:, None] * capacidade_kg - np.cumsum(consumo, axis=1)
+    chaves = [(granja, aviario) for granja in range(1, granjas + 1) for aviario in range(1, aviarios + 1)]
+    return {chave: pd.Series(pesos[i], index=pd.date_range(inicio[i], periods=len(horas), freq='h'))
+            for i, chave in enumerate(chaves)}
+
+
+def conferir(projecoes, programacao, capacidade_kg, horizonte_h):
+    """Silos abaixo da margem sem entrega atrasada (ou sem caminhão) que explique e silos acima da capacidade."""
+    inicio = min(serie.index[0] for serie in projecoes.values())
+    fim = inicio + pd.Timedelta(hours=horizonte_h)
+    margem = capacidade_kg * MARGEM_PADRAO
+    abaixo = acima = 0
+    for chave, entregas in programacao.groupby('aviario_num', sort=False):
+        serie = projecoes[chave]
+        peso = serie.to_numpy().copy()
+        for data, quantidade in zip(entregas['data_entrega'], entregas['quantidade_kg']):
+            peso[serie.index >= data] += quantidade
+        atrasada = (entregas['folga_horas'] < 0).any() or entregas['data_entrega'].isna().any()
+        abaixo += not atrasada and (peso[serie.index <= fim] <= margem).any()
+        acima += (peso > capacidade_kg + 1e-6).any()
+    sem_entrega = set(projecoes) - set(programacao['aviario_num'])
+    abaixo += sum((projecoes[chave][:fim] <= margem).any() for chave in sem_entrega)
+    return abaixo, acima
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--granjas', type=int, default=200)
+    parser.add_argument('--aviarios', type=int, default=20, help='Silos (aviários) por granja.')
+    parser.add_argument('--caminhoes', type=int, default=300)
+    parser.add_argument('--capacidade', type=float, default=16000)
+    parser.add_argument('--carga', type=float, default=8000)
+    parser.add_argument('--horizonte', type=int, default=7 * 24, help='Horas planejadas.')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    projecoes = projecoes_sinteticas(args.granjas, args.aviarios, args.capacidade)
+    tempos = []
+    for _ in range(args.repeticoes):
+        inicio = time.perf_counter()
+        programacao = planejar_entregas(projecoes, args.capacidade, args.carga, caminhoes=args.caminhoes,
+                                        horizonte_h=args.horizonte)
+        tempos.append(time.perf_counter() - inicio)
+    tempo = min(tempos)
+
+    abaixo, acima = conferir(projecoes, programacao, args.capacidade, args.horizonte)
+    atrasadas = programacao['folga_horas'] < 0
+    sem_caminhao = programacao['data_entrega'].isna().sum()
+    entregas = len(programacao) - sem_caminhao
+    print(f"{len(projecoes):,} silos, {args.caminhoes} caminhões, {args.horizonte} h")
+    print(f"planejamento:   {tempo * 1000:8.1f} ms ({entregas:,} entregas, "
+          f"{tempo / max(entregas, 1) * 1e6:.1f} µs/entrega)")
+    print(f"atrasadas:      {atrasadas.sum():,} (pior {-programacao['folga_horas'].min():.0f} h)" if atrasadas.any()
+          else "atrasadas:      0")
+    print(f"sem caminhão:   {sem_caminhao:,} silos")
+    print(f"conferência:    {abaixo} silos abaixo da margem sem atraso, {acima} acima da capacidade")
+    por_caminhao = programacao.groupby('caminhao').size()
+    print(f"entregas por caminhão: mín {por_caminhao.min()}, máx {por_caminhao.max()}")
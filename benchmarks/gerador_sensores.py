@@ -0,0 +1,74 @@
+"""Gerador de exportações sintéticas do eProdutor (Sensores.csv) para benchmarks.
+
+Uso:
+    python -m benchmarks.gerador_sensores saida.csv --aviarios 40 --dias 30 --intervalo 1 --ruido 15 --zeros 0.01
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+def gerar_sensores(n_aviarios=10, canais_por_silo=2, dias=15, intervalo_min=5, fim=None, seed=0,
+                   ruido_kg=0.0, taxa_zeros=0.0, nivel_reabastecimento=0.0):
+    """Gera um DataFrame no formato do Sensores.csv (Date, Hour, Collector, Channel, Value).
+
+    `ruido_kg` é o desvio padrão do ruído gaussiano das células de carga,
+    `taxa_zeros` a fração de leituras que caem para zero (falhas do sensor) e
+    `nivel_reabastecimento` a fração da capacidade abaixo da qual o silo é
+    reabastecido (0 = só quando esvazia).
+    """
+    rng = np.random.default_rng(seed)
+    fim = pd.Timestamp(fim) if fim is not None else pd.Timestamp.now().floor('min')
+    instantes = pd.date_range(fim - pd.Timedelta(days=dias), fim, freq=f'{intervalo_min}min')
+    datas = instantes.strftime('%d/%m/%Y')
+    horas = instantes.strftime('%H:%M:%S')
+
+    partes = []
+    for aviario in range(1, n_aviarios + 1):
+        for canal in range(1, canais_por_silo + 1):
+            capacidade = rng.uniform(8000, 12000)
+            # Consumo em kg por leitura; o silo é reabastecido sempre que esvazia (curva "dente de serra")
+            consumo = rng.uniform(2, 6, len(instantes)) * intervalo_min / 60 * 10
+            # Cada reabastecimento devolve o silo à capacidade ao atingir o nível mínimo
+            faixa = capacidade * (1 - nivel_reabastecimento)
+            peso = capacidade - np.mod(np.cumsum(consumo) + rng.uniform(0, faixa), faixa)
+            if ruido_kg > 0:
+                peso = np.maximum(peso + rng.normal(0, ruido_kg, len(peso)), 0)
+            if taxa_zeros > 0:
+                peso[rng.random(len(peso)) < taxa_zeros] = 0
+            partes.append(pd.DataFrame({
+                'Date': datas,
+                'Hour': horas,
+                'Collector': f'Aviário {aviario}',
+                'Channel': f'Silo {canal}',
+                'Value': np.round(peso, 2),
+            }))
+    return pd.concat(partes, ignore_index=True)
+
+
+def salvar_sensores(df, caminho):
+    """Grava o DataFrame como o eProdutor exporta: linha de título, ';' e vírgula decimal."""
+    with open(caminho, 'w', encoding='utf-8', newline='') as f:
+        f.write('Monitoramento de Sensores - PESO DO SILO\n')
+        df.to_csv(f, sep=';', index=False, decimal=',')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('saida')
+    parser.add_argument('--aviarios', type=int, default=10)
+    parser.add_argument('--canais', type=int, default=2)
+    parser.add_argument('--dias', type=int, default=15)
+    parser.add_argument('--intervalo', type=int, default=5, help='Intervalo entre leituras, em minutos.')
+    parser.add_argument('--ruido', type=float, default=0.0, help='Desvio padrão do ruído das leituras, em kg.')
+    parser.add_argument('--zeros', type=float, default=0.0, help='Fração de leituras zeradas (falhas do sensor).')
+    parser.add_argument('--reabastecimento', type=float, default=0.0,
+                        help='Fração da capacidade em que o silo é reabastecido.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = gerar_sensores(args.aviarios, args.canais, args.dias, args.intervalo, seed=args.seed,
+                        ruido_kg=args.ruido, taxa_zeros=args.zeros, nivel_reabastecimento=args.reabastecimento)
+    salvar_sensores(df, args.saida)
+    print(f"{len(df):,} leituras gravadas em {args.saida}")
@@ -0,0 +1,235 @@
+"""Suíte de benchmarks por etapa do pipeline (importação, médias horárias, projeção, entregas, gráfico e PDF).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.suite --aviarios 40 --dias 30 --intervalo 1 --ruido 15 --zeros 0.01
+    python -m benchmarks.suite --comparar benchmarks/resultados/anterior.json
+
+Cada etapa é medida pelo melhor tempo entre as repetições e por uma rodada
+extra sob o tracemalloc, que fornece o pico de memória (alocações do Python e
+do NumPy; buffers internos do pyarrow não aparecem). O resultado é gravado
+em JSON (benchmarks/resultados/ por padrão) para comparação entre execuções,
+junto com o tempo de importação dos pontos de entrada (ver bench_inicializacao).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+
+from src.data_handler import importar_sensores, numero_aviario
+from src.forecaster import SiloForecaster
+from src.report_generator import PDFReportGenerator
+from benchmarks.gerador_sensores import gerar_sensores, salvar_sensores
+from benchmarks.bench_inicializacao import PONTOS_DE_ENTRADA, medir_importacao
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_LINHAGEM = os.path.join(PASTA_PROJETO, 'static', 'linhagem')
+PASTA_RESULTADOS = os.path.join(PASTA_PROJETO, 'benchmarks', 'resultados')
+
+
+def medir(funcao, repeticoes=3, preparar=None):
+    """Melhor tempo (s) entre as repetições e pico de memória (MB) de uma rodada sob o tracemalloc.
+
+    `preparar`, se informado, é chamado antes de cada rodada, fora da medição.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    if preparar is not None:
+        preparar()
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(tempos), pico / 1e6
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PASTA_PROJETO,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar_suite(n_aviarios=40, canais=2, dias=30, intervalo_min=1, ruido_kg=15.0, taxa_zeros=0.01,
+                   nivel_reabastecimento=0.1, repeticoes=3, dpi=100, workers=None, seed=0):
+    """Executa todas as etapas sobre uma exportação sintética e retorna o resultado como dicionário."""
+    etapas = {}
+
+    def registrar(nome, tempo, pico_mb, unidades, unidade):
+        etapas[nome] = {
+            'tempo_s': round(tempo, 6),
+            'pico_memoria_mb': round(pico_mb, 3),
+            unidade: unidades,
+            f'{unidade}_por_s': round(unidades / tempo, 2) if tempo > 0 else None,
+        }
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'Sensores.csv')
+        df_gerado = gerar_sensores(n_aviarios, canais, dias, intervalo_min, seed=seed, ruido_kg=ruido_kg,
+                                   taxa_zeros=taxa_zeros, nivel_reabastecimento=nivel_reabastecimento)
+        salvar_sensores(df_gerado, caminho)
+        linhas = len(df_gerado)
+        tamanho_mb = os.path.getsize(caminho) / 1e6
+        del df_gerado
+
+        # Importação do CSV (leitura original e leitura rápida)
+        tempo, pico = medir(lambda: importar_sensores(caminho), repeticoes)
+        registrar('importar_sensores', tempo, pico, linhas, 'linhas')
+        tempo, pico = medir(lambda: importar_sensores(caminho, rapido=True), repeticoes)
+        registrar('importar_sensores_rapido', tempo, pico, linhas, 'linhas')
+
+        df_sensores = importar_sensores(caminho, rapido=True)
+        df_sensores['aviario_num'] = numero_aviario(df_sensores['collector']).astype(int)
+
+        # Médias horárias por canal, de todos os aviários de uma vez (como no run_batch)
+        tempo, pico = medir(lambda: SiloForecaster._agregar_medias_horarias(df_sensores, por_aviario=True), repeticoes)
+        registrar('medias_horarias', tempo, pico, linhas, 'linhas')
+
+        data_alojamento = (df_sensores.index.max() - timedelta(days=20)).date()
+        lotes = {
+            aviario: dict(data_alojamento=data_alojamento, linhagem='cobb', n_aves=25000)
+            for aviario in sorted(df_sensores['aviario_num'].unique())
+        }
+        forecaster = SiloForecaster(df_sensores, PASTA_LINHAGEM, pasta)
+
+        # Previsão completa, só cálculo (médias horárias + projeção + entregas)
+        tempo, pico = medir(lambda: forecaster.run_batch(lotes, gerar_relatorios=False), repeticoes)
+        registrar('run_batch', tempo, pico, len(lotes), 'aviarios')
+        _, previsoes = forecaster.run_batch(lotes, gerar_relatorios=False)
+        previsoes = list(previsoes.values())
+
+        def projetar_todos():
+            for previsao in previsoes:
+                previsao._project_autonomy()
+        tempo, pico = medir(projetar_todos, repeticoes)
+        registrar('project_autonomy', tempo, pico, len(previsoes), 'aviarios')
+
+        def detectar_todos():
+            for previsao in previsoes:
+                previsao._detectar_entregas(previsao.df_hourly)
+        tempo, pico = medir(detectar_todos, repeticoes)
+        registrar('detectar_entregas', tempo, pico, len(previsoes), 'aviarios')
+
+        # Gráficos e PDF partem sempre de cópias sem PNG em cache
+        copias = {}
+
+        def limpar_graficos():
+            copias.clear()
+            copias.update({previsao.aviario_selecionado: previsao.copia_resultados() for previsao in previsoes})
+            for copia in copias.values():
+                copia.plot_png = None
+
+        def desenhar_todos():
+            for copia in copias.values():
+                copia.grafico_png(dpi)
+        tempo, pico = medir(desenhar_todos, repeticoes, preparar=limpar_graficos)
+        registrar('graficos', tempo, pico, len(previsoes), 'aviarios')
+
+        tempo, pico = medir(
+            lambda: PDFReportGenerator(dpi=dpi, workers=workers).generate_full_report(copias),
+            repeticoes, preparar=limpar_graficos,
+        )
+        registrar('pdf', tempo, pico, len(previsoes), 'aviarios')
+
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit_atual(),
+        'ambiente': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'parametros': {
+            'aviarios': n_aviarios, 'canais': canais, 'dias': dias, 'intervalo_min': intervalo_min,
+            'ruido_kg': ruido_kg, 'taxa_zeros': taxa_zeros, 'nivel_reabastecimento': nivel_reabastecimento,
+            'repeticoes': repeticoes, 'dpi': dpi, 'workers': workers, 'seed': seed,
+            'linhas': linhas, 'tamanho_csv_mb': round(tamanho_mb, 2),
+        },
+        'etapas': etapas,
+        # Partida a frio dos pontos de entrada só de cálculo (python -X importtime, processo novo)
+        'inicializacao': {modulo: medir_importacao(modulo, repeticoes) for modulo in PONTOS_DE_ENTRADA},
+    }
+
+
+def imprimir(resultado, anterior=None):
+    """Tabela das etapas; com `anterior`, mostra também a variação do tempo em relação a ele."""
+    cabecalho = f"{'etapa':<26}{'tempo (s)':>11}{'pico (MB)':>11}{'vazão':>24}"
+    if anterior is not None:
+        cabecalho += f"{'vs anterior':>13}"
+    print(cabecalho)
+    for nome, etapa in resultado['etapas'].items():
+        unidade = 'linhas' if 'linhas' in etapa else 'aviarios'
+        vazao = f"{etapa[f'{unidade}_por_s']:,.1f} {unidade}/s"
+        linha = f"{nome:<26}{etapa['tempo_s']:>11.3f}{etapa['pico_memoria_mb']:>11.1f}{vazao:>24}"
+        if anterior is not None:
+            etapa_anterior = anterior['etapas'].get(nome)
+            if etapa_anterior:
+                linha += f"{etapa['tempo_s'] / etapa_anterior['tempo_s'] - 1:>+13.1%}"
+        print(linha)
+
+    for modulo, importacao in resultado.get('inicializacao', {}).items():
+        linha = f"{'importar ' + modulo:<26}{importacao['tempo_s']:>11.3f}"
+        if importacao['pesados']:
+            linha += f"  (importa {', '.join(importacao['pesados'])})"
+        if anterior is not None and modulo in anterior.get('inicializacao', {}):
+            linha += f"{'':>35}{importacao['tempo_s'] / anterior['inicializacao'][modulo]['tempo_s'] - 1:>+13.1%}"
+        print(linha)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--aviarios', type=int, default=40)
+    parser.add_argument('--canais', type=int, default=2)
+    parser.add_argument('--dias', type=int, default=30)
+    parser.add_argument('--intervalo', type=int, default=1, help='Intervalo entre leituras, em minutos.')
+    parser.add_argument('--ruido', type=float, default=15.0, help='Desvio padrão do ruído das leituras, em kg.')
+    parser.add_argument('--zeros', type=float, default=0.01, help='Fração de leituras zeradas (falhas do sensor).')
+    parser.add_argument('--reabastecimento', type=float, default=0.1,
+                        help='Fração da capacidade em que o silo é reabastecido.')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None, help='Processos usados na rasterização do PDF.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--saida', help='Arquivo JSON de saída (padrão: benchmarks/resultados/<data>.json).')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparação.')
+    args = parser.parse_args()
+
+    resultado = executar_suite(args.aviarios, args.canais, args.dias, args.intervalo, args.ruido, args.zeros,
+                               args.reabastecimento, args.repeticoes, args.dpi, args.workers, args.seed)
+
+    saida = args.saida
+    if saida is None:
+        os.makedirs(PASTA_RESULTADOS, exist_ok=True)
+        saida = os.path.join(PASTA_RESULTADOS, f"{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anterior = json.load(f)
+
+    parametros = resultado['parametros']
+    print(f"{parametros['linhas']:,} leituras ({parametros['tamanho_csv_mb']} MB), {parametros['aviarios']} aviários")
+    imprimir(resultado, anterior)
+    print(f"Resultado gravado em {saida}")
@@ -1,104 +1,390 @@
+"""Execução em lote (sem interface) da previsão de autonomia de todos os aviários.
+
+Uso:
+    python main.py --sensores assets/Sensores.csv --lotes lotes.csv
+    python main.py --sensores assets/ --lotes lotes.json --workers 4 --saida reports
+    python main.py --historico data/historico_sensores.sqlite --lotes lotes.csv
+    python main.py --vigiar --sensores entrada/ --lotes lotes.csv
+
+A configuração de lotes (CSV ou JSON) tem uma linha por aviário com aviario,
+data_alojamento, linhagem, n_aves e, opcionalmente, sobra_inicial_kg e
+idade_diluicao_start. Com --historico, as leituras importadas são acrescentadas
+ao histórico local (SQLite) e as previsões consultam nele os últimos dias de
+cada aviário; sem --sensores, usa apenas o histórico. Na pasta de saída são
+gravados a tabela de resultados (CSV e JSON), a de entregas da granja (CSV),
+o gráfico de cada aviário (PNG) e o relatório completo (PDF). Com --backtest,
+a previsão também é refeita em cada hora do histórico e comparada com o que
+aconteceu depois (backtest_[data].csv e resumo dos erros por aviário e linhagem).
+Com --planejar, as projeções de todos os aviários alimentam a programação de
+entregas dos próximos dias, que mantém cada silo acima da margem de segurança
+com os caminhões disponíveis (programacao_[data].csv).
+
+Com --vigiar, a pasta de --sensores é observada continuamente: cada arquivo
+novo ou alterado é lido uma vez, mesclado (sem duplicatas) às leituras já
+acumuladas, e só os aviários que receberam leituras novas (ou cujo lote mudou
+no arquivo de --lotes) são recalculados. Os arquivos de saída usam o sufixo
+"atual" e são regravados a cada ciclo; Ctrl+C encerra. O código de saída
+reflete o último resultado de cada aviário e os arquivos rejeitados na sessão.
+
+Códigos de saída: 0 = todos os aviários processados; 1 = parte dos aviários
+falhou; 2 = erro de entrada (arquivos ou configuração); 3 = nenhum aviário
+pôde ser processado.
+"""
+import argparse
+import glob
+import json
 import os
+import sqlite3
+import sys
+from datetime import datetime
+
 import pandas as pd
-from datetime import date
+
+from src.data_handler import importar_sensores, importar_lotes, compactar_sensores, mesclar_sensores, memoria_mb
 from src.forecaster import SiloForecaster
-from src.data_handler import importar_sensores
+from src.armazenamento import ArmazemSensores
+from src.metricas import coletar
+from src.cache import CacheResultados
+from src.vigia import VigiaPasta
+from src.backtest import resumir_backtest
 
-if __name__ == "__main__":
-    # --- Configuração de Caminhos ---
+# Sem display: o servidor roda sem interface gráfica. O matplotlib (e o fpdf) só são importados
+# se houver gráficos ou PDF a gerar, então execuções só de cálculo partem mais rápido
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+SAIDA_OK = 0
+SAIDA_PARCIAL = 1
+SAIDA_ERRO_ENTRADA = 2
+SAIDA_FALHA = 3
+
+def carregar_sensores(caminho, cache_dir=None, armazem=None):
+    """Lê um Sensores.csv ou todos os .csv de uma pasta, sem leituras repetidas entre arquivos."""
+    if os.path.isdir(caminho):
+        arquivos = sorted(glob.glob(os.path.join(caminho, '*.csv')))
+        if not arquivos:
+            raise FileNotFoundError(f"Nenhum arquivo .csv encontrado em '{caminho}'.")
+    else:
+        arquivos = [caminho]
+
+    partes = [importar_sensores(arquivo, rapido=True, cache_dir=cache_dir, armazem=armazem) for arquivo in arquivos]
+    df = partes[0] if len(partes) == 1 else pd.concat(partes)
+    if len(partes) > 1:
+        # Exportações de períodos sobrepostos repetem leituras
+        chave = df.reset_index()[['timedate', 'collector', 'channel']]
+        df = df[~chave.duplicated().to_numpy()].sort_index(kind='stable')
+
+    return compactar_sensores(df), arquivos
+
+def salvar_resultados(df_resultados, previsoes, pasta, sufixo):
+    """Grava a tabela de resultados em CSV e JSON (com as entregas detectadas de cada aviário)."""
+    caminho_csv = os.path.join(pasta, f'resultados_{sufixo}.csv')
+    df_resultados.to_csv(caminho_csv, sep=';', decimal=',')
+
+    registros = []
+    for aviario, linha in df_resultados.iterrows():
+        registro = {'aviario_num': int(aviario)}
+        registro.update({coluna: (None if pd.isna(valor) else valor) for coluna, valor in linha.items()})
+        if aviario in previsoes:
+            df_entregas = previsoes[aviario].resultado.df_entregas
+            registro['entregas'] = [
+                {'data': data.isoformat(), 'quantidade_kg': float(quantidade)}
+                for data, quantidade in df_entregas.iloc[:, 0].items()
+            ]
+        registros.append(registro)
+
+    caminho_json = os.path.join(pasta, f'resultados_{sufixo}.json')
+    with open(caminho_json, 'w', encoding='utf-8') as f:
+        json.dump(registros, f, indent=2, ensure_ascii=False, default=str)
+    return caminho_csv, caminho_json
+
+def gravar_graficos(previsoes, args, sufixo, aviarios=None):
+    """Rasteriza os gráficos, grava os PNGs (só dos `aviarios`, se informados) e o PDF completo."""
+    if not previsoes or (args.sem_graficos and args.sem_pdf):
+        return
+    from src.report_generator import PDFReportGenerator
+    pdf_generator = PDFReportGenerator(dpi=args.dpi, workers=args.workers)
+    # Os PNGs rasterizados uma vez servem tanto para os arquivos individuais quanto para o PDF
+    for aviario, png in pdf_generator.rasterize_plots(previsoes).items():
+        previsoes[aviario].plot_png, previsoes[aviario].plot_png_dpi = png, args.dpi
+        if not args.sem_graficos and (aviarios is None or aviario in aviarios):
+            with open(os.path.join(args.saida, f'projecao_aviario_{aviario}_{sufixo}.png'), 'wb') as f:
+                f.write(png)
+
+    if not args.sem_pdf:
+        caminho_pdf = os.path.join(args.saida, f'relatorio_completo_{sufixo}.pdf')
+        pdf_generator.generate_full_report(previsoes, caminho_pdf)
+        print(f"Relatório PDF salvo em: {caminho_pdf}")
+
+def imprimir_resumo(df_resultados, alerta_horas):
+    """Resumo para o log do agendador: falhas e aviários com autonomia abaixo do alerta."""
+    falhas = df_resultados['erro'].dropna()
+    processados = df_resultados[df_resultados['erro'].isna()]
+    print(f"\n--- Resumo: {len(processados)} de {len(df_resultados)} aviários processados ---")
+
+    for aviario, linha in processados.sort_values('autonomia_horas').iterrows():
+        esgotamento = linha['data_esgotamento'].strftime('%d/%m/%Y %H:%M') if pd.notna(linha['data_esgotamento']) else 'N/A'
+        if 'esgotamento_p10' in linha and pd.notna(linha['esgotamento_p10']):
+            # Com cenários, o alerta considera o esgotamento mais cedo (P10)
+            horas_p10 = (linha['esgotamento_p10'] - linha['data_esgotamento']) / pd.Timedelta(hours=1)
+            esgotamento += f" (P10 {linha['esgotamento_p10'].strftime('%d/%m %H:%M')})"
+            autonomia = linha['autonomia_horas'] + horas_p10
+        else:
+            autonomia = linha['autonomia_horas']
+        alerta = '  <-- ALERTA' if autonomia < alerta_horas else ''
+        print(f"Aviário {aviario:>3}: {linha['peso_atual_kg']:>10,.0f} kg | autonomia {linha['autonomia_horas']:>6.0f} h"
+              f" | esgotamento {esgotamento}{alerta}")
+
+    for aviario, erro in falhas.items():
+        print(f"Aviário {aviario:>3}: FALHA - {erro}")
+
+def imprimir_programacao(programacao):
+    """Imprime a programação de entregas, destacando as atrasadas e os aviários sem caminhão."""
+    sem_caminhao = programacao['data_entrega'].isna()
+    atrasadas = programacao['folga_horas'] < 0
+    print(f"\n--- Programação de entregas: {(~sem_caminhao).sum()} entrega(s), {atrasadas.sum()} atrasada(s) ---")
+    if programacao.empty:
+        print("Nenhum aviário chega à margem de segurança no período.")
+        return
+    print(programacao.round({'quantidade_kg': 0, 'peso_antes_kg': 0, 'peso_depois_kg': 0}).to_string(index=False))
+    if sem_caminhao.any():
+        aviarios = ', '.join(map(str, programacao.loc[sem_caminhao, 'aviario_num']))
+        print(f"ATENÇÃO: sem caminhão livre a tempo para os aviários {aviarios}; aumente --caminhoes.")
+
+def codigo_saida(df_resultados, previsoes):
+    """Código de saída conforme as previsões: 3 se nenhum aviário foi processado, 1 se parte falhou."""
+    if not previsoes:
+        return SAIDA_FALHA
+    return SAIDA_PARCIAL if df_resultados['erro'].notna().any() else SAIDA_OK
+
+def vigiar(args, armazem=None):
+    """Modo contínuo: recalcula só os aviários afetados por cada arquivo novo na pasta de sensores.
+
+    Ao encerrar, retorna o código do último resultado de cada aviário (como no
+    modo em lote) ou, se todos tiveram sucesso, 2 quando algum arquivo de
+    sensores ou de lotes foi rejeitado durante a sessão.
+    """
+    vigia = VigiaPasta(args.sensores, intervalo_s=args.intervalo, max_fila=args.max_fila).iniciar()
+    print(f"Vigiando '{args.sensores}' a cada {args.intervalo:g} s (Ctrl+C para encerrar).")
+
+    # Previsões de entradas já vistas (ex.: um arquivo regravado sem mudanças) saem do cache
+    cache_resultados = CacheResultados(pasta=os.path.join(args.cache, 'previsoes') if args.cache else None)
+    historico, lotes, mtime_lotes = None, {}, None
+    df_resultados, previsoes, entregas = None, {}, None
+    erros_entrada = 0
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-    except NameError:
-        script_dir = os.getcwd()
+        while True:
+            arquivos = vigia.proximos(timeout=args.intervalo)
 
-    project_root = os.path.abspath(script_dir)
-    sensores_path = os.path.join(project_root, 'assets', 'Sensores.csv')
-    linhagem_folder = os.path.join(project_root, 'static', 'linhagem')
-    reports_folder = os.path.join(project_root, 'reports')
-    os.makedirs(reports_folder, exist_ok=True) # Garante que a pasta de relatórios exista
-    # --- Fim da Configuração de Caminhos ---
+            # Lotes: relidos quando o arquivo muda; aviários com parâmetros alterados são recalculados
+            lotes_alterados = set()
+            try:
+                mtime = os.stat(args.lotes).st_mtime_ns
+                if mtime != mtime_lotes:
+                    novos_lotes = importar_lotes(args.lotes)
+                    lotes_alterados = {aviario for aviario in set(lotes) | set(novos_lotes)
+                                       if lotes.get(aviario) != novos_lotes.get(aviario)}
+                    lotes, mtime_lotes = novos_lotes, mtime
+            except (OSError, KeyError, ValueError) as e:
+                erros_entrada += 1
+                print(f"Erro ao ler os lotes '{args.lotes}' (mantida a configuração anterior): {e}", file=sys.stderr)
+
+            com_leituras_novas = set()
+            for arquivo in arquivos:
+                try:
+                    df = importar_sensores(arquivo, rapido=True, cache_dir=args.cache, armazem=armazem, compacto=True)
+                except (OSError, KeyError, ValueError, sqlite3.Error) as e:
+                    erros_entrada += 1
+                    print(f"Erro ao importar '{arquivo}' (ignorado): {e}", file=sys.stderr)
+                    continue
+                historico, novas = mesclar_sensores(historico, df)
+                com_leituras_novas |= set(novas['aviario_num'].unique())
+                print(f"{os.path.basename(arquivo)}: {len(novas):,} leituras novas de {len(df):,}")
+
+            alterados = sorted(((com_leituras_novas | lotes_alterados) & set(lotes)))
+            removidos = [aviario for aviario in previsoes if aviario not in lotes]
+            if historico is None or not (alterados or removidos):
+                continue
+
+            # Só os últimos dias entram nas previsões; o restante é descartado da memória
+            historico = historico[historico.index >= historico.index.max() - pd.Timedelta(days=args.dias_historico)]
+
+            with coletar() as metricas:
+                forecaster = SiloForecaster(historico, args.linhagem_folder, args.saida,
+                                            cache_resultados=cache_resultados)
+                df_alterados, previsoes_alteradas = forecaster.run_batch(
+                    {aviario: lotes[aviario] for aviario in alterados}, gerar_relatorios=False,
+                    workers=args.workers, n_cenarios=args.cenarios, seed=args.semente)
+
+                substituidos = set(alterados) | set(removidos)
+                for aviario in substituidos:
+                    previsoes.pop(aviario, None)
+                previsoes = dict(sorted({**previsoes, **previsoes_alteradas}.items()))
+                df_resultados = df_alterados if df_resultados is None else pd.concat(
+                    [df_resultados.drop(index=list(substituidos), errors='ignore'), df_alterados]).sort_index()
+                entregas = forecaster.entregas_granja if entregas is None else pd.concat(
+                    [entregas[~entregas['aviario_num'].isin(substituidos)], forecaster.entregas_granja]
+                ).sort_values(['aviario_num', 'data_entrega'], kind='stable', ignore_index=True)
+
+                salvar_resultados(df_resultados, previsoes, args.saida, 'atual')
+                entregas.to_csv(os.path.join(args.saida, 'entregas_atual.csv'), sep=';', decimal=',', index=False)
+                gravar_graficos(previsoes, args, 'atual', aviarios=set(previsoes_alteradas))
+
+            print(f"\n[{datetime.now():%d/%m/%Y %H:%M:%S}] Recalculados: {', '.join(map(str, alterados)) or 'nenhum'}"
+                  f"{'; removidos: ' + ', '.join(map(str, removidos)) if removidos else ''} "
+                  f"({len(historico):,} leituras em memória, {memoria_mb(historico):.1f} MB)")
+            imprimir_resumo(df_alterados, args.alerta_horas)
+            if metricas is not None:
+                print(metricas.resumo().to_string(index=False))
+    except KeyboardInterrupt:
+        print("\nEncerrando.")
+    finally:
+        vigia.parar()
+
+    if df_resultados is not None and not df_resultados.empty:
+        codigo = codigo_saida(df_resultados, previsoes)
+        if codigo != SAIDA_OK:
+            return codigo
+    return SAIDA_ERRO_ENTRADA if erros_entrada else SAIDA_OK
+
+def main(argv=None):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sensores', help='Arquivo Sensores.csv ou pasta com exportações .csv '
+                                           '(padrão: assets/Sensores.csv, ou só o histórico com --historico).')
+    parser.add_argument('--historico', help='Arquivo SQLite do histórico local de leituras.')
+    parser.add_argument('--dias-historico', type=int, default=15, help='Dias de histórico usados em cada previsão.')
+    parser.add_argument('--lotes', required=True, help='Configuração dos lotes por aviário (CSV ou JSON).')
+    parser.add_argument('--saida', default=os.path.join(script_dir, 'reports'), help='Pasta de saída.')
+    parser.add_argument('--linhagem-folder', default=os.path.join(script_dir, 'static', 'linhagem'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos em paralelo.')
+    parser.add_argument('--dpi', type=int, default=100, help='Resolução dos gráficos.')
+    parser.add_argument('--sem-graficos', action='store_true', help='Não grava os PNGs individuais.')
+    parser.add_argument('--sem-pdf', action='store_true', help='Não gera o relatório PDF completo.')
+    parser.add_argument('--alerta-horas', type=float, default=48, help='Destaca aviários com autonomia menor que isto.')
+    parser.add_argument('--cache', help='Pasta de cache (Parquet dos arquivos de sensores e previsões já calculadas).')
+    parser.add_argument('--cenarios', type=int, default=0,
+                        help='Cenários de consumo simulados por aviário (acrescenta esgotamento P10/P50/P90).')
+    parser.add_argument('--semente', type=int, help='Semente dos cenários, para resultados reproduzíveis.')
+    parser.add_argument('--backtest', action='store_true',
+                        help='Refaz a previsão em cada hora do histórico e mede o erro em relação ao observado.')
+    parser.add_argument('--planejar', action='store_true',
+                        help='Gera a programação de entregas de ração a partir das projeções.')
+    parser.add_argument('--caminhoes', type=int, default=1, help='Caminhões disponíveis (--planejar).')
+    parser.add_argument('--duracao-viagem', type=float, default=4, help='Horas de cada viagem de entrega (--planejar).')
+    parser.add_argument('--capacidade-kg', type=float,
+                        help='Capacidade dos silos de cada aviário (padrão: maior peso observado) (--planejar).')
+    parser.add_argument('--carga-kg', type=float,
+                        help='Carga de cada entrega (padrão: mediana das entregas detectadas) (--planejar).')
+    parser.add_argument('--margem-kg', type=float,
+                        help='Peso mínimo mantido em cada silo (padrão: 10%% da capacidade) (--planejar).')
+    parser.add_argument('--dias-planejamento', type=int, default=7, help='Dias programados (--planejar).')
+    parser.add_argument('--vigiar', action='store_true',
+                        help='Observa a pasta de --sensores e recalcula só os aviários com leituras novas.')
+    parser.add_argument('--intervalo', type=float, default=30, help='Segundos entre varreduras da pasta (--vigiar).')
+    parser.add_argument('--max-fila', type=int, default=16,
+                        help='Arquivos aguardando processamento antes de a varredura esperar (--vigiar).')
+    args = parser.parse_args(argv)
+
+    if args.vigiar:
+        args.sensores = args.sensores or os.path.join(script_dir, 'assets')
+        if not os.path.isdir(args.sensores):
+            print(f"Erro de entrada: '{args.sensores}' não é uma pasta.", file=sys.stderr)
+            return SAIDA_ERRO_ENTRADA
+        os.makedirs(args.saida, exist_ok=True)
+        try:
+            armazem = ArmazemSensores(args.historico) if args.historico else None
+        except (OSError, sqlite3.Error) as e:
+            print(f"Erro de entrada: {e}", file=sys.stderr)
+            return SAIDA_ERRO_ENTRADA
+        return vigiar(args, armazem)
 
     # --- Carregar Dados ---
-    print(f"Carregando dados de sensores de '{sensores_path}'...")
     try:
-        df_sensores_completo = importar_sensores(sensores_path)
-        print("Dados carregados com sucesso.")
-    except FileNotFoundError:
-        print(f"Erro: Arquivo '{sensores_path}' não encontrado.")
-        exit()
-    except Exception as e:
-        print(f"Ocorreu um erro ao carregar os dados: {e}")
-        exit()
-
-    # --- Processar Dados Iniciais ---
-    if 'collector' not in df_sensores_completo.columns:
-        print("Erro: O arquivo CSV carregado não contém a coluna 'collector'. Verifique o formato do arquivo.")
-        exit()
-
-    df_sensores_completo['aviario_num'] = pd.to_numeric(df_sensores_completo['collector'].str.extract('(\d+)', expand=False), errors='coerce')
-    df_sensores_completo.dropna(subset=['aviario_num'], inplace=True)
-    df_sensores_completo['aviario_num'] = df_sensores_completo['aviario_num'].astype(int)
-    aviarios_disponiveis = sorted(df_sensores_completo['aviario_num'].unique())
-
-    # --- Coletar Inputs do Usuário ---
-    print("\n--- Parâmetros de Entrada ---")
-    print(f"Aviários disponíveis: {aviarios_disponiveis}")
-    
-    aviario_selecionado = None
-    while aviario_selecionado not in aviarios_disponiveis:
-        try:
-            aviario_selecionado = int(input("Selecione o Aviário: "))
-            if aviario_selecionado not in aviarios_disponiveis:
-                print("Aviário inválido. Por favor, escolha um da lista.")
-        except ValueError:
-            print("Entrada inválida. Por favor, insira um número.")
-
-    data_alojamento = None
-    while data_alojamento is None:
-        try:
-            data_alojamento_str = input("Data de Alojamento (AAAA-MM-DD): ")
-            data_alojamento = date.fromisoformat(data_alojamento_str)
-        except ValueError:
-            print("Formato de data inválido. Use AAAA-MM-DD.")
-
-    linhagem = None
-    while linhagem not in ["cobb", "ross"]:
-        linhagem = input("Selecione a Linhagem (cobb/ross): ").lower()
-        if linhagem not in ["cobb", "ross"]:
-            print("Linhagem inválida. Escolha 'cobb' ou 'ross'.")
-
-    n_aves = None
-    while n_aves is None:
-        try:
-            n_aves = int(input("Número de Aves: "))
-        except ValueError:
-            print("Entrada inválida. Por favor, insira um número inteiro.")
+        lotes = importar_lotes(args.lotes)
+        armazem = ArmazemSensores(args.historico) if args.historico else None
+        sensores = args.sensores
+        if sensores is None and armazem is None:
+            sensores = os.path.join(script_dir, 'assets', 'Sensores.csv')
 
-    print("\nExecutando projeção...")
+        if sensores is not None:
+            df_sensores, arquivos = carregar_sensores(sensores, args.cache, armazem)
+            print(f"{len(df_sensores):,} leituras de {len(arquivos)} arquivo(s) ({memoria_mb(df_sensores):.1f} MB); "
+                  f"{len(lotes)} lote(s) configurado(s).")
+            aviarios_com_dados = set(df_sensores['aviario_num'].unique())
+        else:
+            aviarios_com_dados = set(armazem.aviarios())
+            if not aviarios_com_dados:
+                raise ValueError(f"O histórico '{args.historico}' não tem leituras.")
+            print(f"Usando o histórico '{args.historico}'; {len(lotes)} lote(s) configurado(s).")
+    except (OSError, KeyError, ValueError, sqlite3.Error) as e:
+        print(f"Erro de entrada: {e}", file=sys.stderr)
+        return SAIDA_ERRO_ENTRADA
 
-    # --- Executar Projeção ---
-    try:
-        forecaster = SiloForecaster(
-            df_sensores=df_sensores_completo,
-            linhagem_folder=linhagem_folder,
-            reports_folder=reports_folder
-        )
-        
-        report_string, plot_fig = forecaster.run_forecast(
-            aviario_selecionado=aviario_selecionado,
-            data_alojamento=data_alojamento,
-            linhagem=linhagem,
-            n_aves=n_aves
-        )
-
-        print("\n--- Projeção Concluída ---")
-        print(report_string)
+    sem_lote = sorted(aviarios_com_dados - set(lotes))
+    if sem_lote:
+        print(f"Aviários sem lote configurado (ignorados): {', '.join(map(str, sem_lote))}")
+
+    os.makedirs(args.saida, exist_ok=True)
+    sufixo = datetime.now().strftime('%Y%m%d_%H%M')
+
+    # --- Executar Projeções ---
+    with coletar() as metricas:
+        # Com histórico, cada aviário é consultado no SQLite pelo índice em vez de filtrado da exportação
+        # Aviários sem leituras novas nem mudança de lote são restaurados do cache em disco da execução anterior
+        cache_resultados = CacheResultados(pasta=os.path.join(args.cache, 'previsoes')) if args.cache else None
+        forecaster = SiloForecaster(None if armazem is not None else df_sensores, args.linhagem_folder, args.saida,
+                                    armazem=armazem, dias_historico=args.dias_historico,
+                                    cache_resultados=cache_resultados)
+        df_resultados, previsoes = forecaster.run_batch(lotes, gerar_relatorios=False, workers=args.workers,
+                                                        n_cenarios=args.cenarios, seed=args.semente)
 
         # --- Salvar Resultados ---
-        plot_filename = f"forecast_aviario_{aviario_selecionado}_{date.today()}.png"
-        plot_path = os.path.join(reports_folder, plot_filename)
-        plot_fig.savefig(plot_path)
-        print(f"\nGráfico salvo em: {plot_path}")
+        caminho_csv, caminho_json = salvar_resultados(df_resultados, previsoes, args.saida, sufixo)
+        caminho_entregas = os.path.join(args.saida, f'entregas_{sufixo}.csv')
+        forecaster.entregas_granja.to_csv(caminho_entregas, sep=';', decimal=',', index=False)
+        print(f"Resultados salvos em: {caminho_csv}, {caminho_json} e {caminho_entregas}")
+
+        gravar_graficos(previsoes, args, sufixo)
 
-    except Exception as e:
-        print(f"\nOcorreu um erro durante a projeção: {e}")
\ No newline at end of file
+        df_backtest = None
+        if args.backtest and previsoes:
+            df_backtest, resumo_backtest = forecaster.backtest(lotes, previsoes=previsoes)
+            caminho_backtest = os.path.join(args.saida, f'backtest_{sufixo}.csv')
+            df_backtest.to_csv(caminho_backtest, sep=';', decimal=',')
+            print(f"Backtest salvo em: {caminho_backtest}")
+
+        programacao = None
+        if args.planejar and previsoes:
+            try:
+                programacao = forecaster.planejar_entregas(
+                    previsoes, capacidade_kg=args.capacidade_kg, carga_kg=args.carga_kg, margem_kg=args.margem_kg,
+                    caminhoes=args.caminhoes, duracao_viagem_h=args.duracao_viagem,
+                    horizonte_h=args.dias_planejamento * 24,
+                )
+            except ValueError as e:
+                print(f"Programação de entregas não gerada: {e}", file=sys.stderr)
+            else:
+                caminho_programacao = os.path.join(args.saida, f'programacao_{sufixo}.csv')
+                programacao.to_csv(caminho_programacao, sep=';', decimal=',', index=False)
+                print(f"Programação de entregas salva em: {caminho_programacao}")
+
+    imprimir_resumo(df_resultados, args.alerta_horas)
+    if df_backtest is not None:
+        # erro_horas > 0: a previsão esperava o nível observado mais tarde do que ele foi atingido
+        print(f"\n--- Backtest: {len(df_backtest):,} cortes horários ---")
+        print(resumo_backtest.round(1).to_string())
+        print(resumir_backtest(df_backtest, por=('linhagem',)).round(1).to_string())
+    if programacao is not None:
+        imprimir_programacao(programacao)
+    if cache_resultados is not None:
+        estatisticas = cache_resultados.estatisticas()
+        print(f"\nCache de previsões: {estatisticas['acertos_disco']} de "
+              f"{estatisticas['acertos_disco'] + estatisticas['faltas']} resultados reaproveitados (previsões, cenários e gráficos)")
+    if metricas is not None:
+        print("\n--- Desempenho ---")
+        print(metricas.resumo().to_string(index=False))
+
+    return codigo_saida(df_resultados, previsoes)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""Serviço HTTP local com as previsões de autonomia de todos os aviários, para consulta por outros sistemas.
+
+Uso:
+    python servico.py --lotes lotes.csv --sensores assets/Sensores.csv --porta 8080
+
+Endpoints:
+    POST /sensores                          corpo: Sensores.csv (bruto ou multipart, campo 'arquivo')
+    PUT  /lotes                             corpo: configuração de lotes (JSON, ou CSV com Content-Type text/csv)
+    GET  /previsoes                         tabela de resultados da granja
+    GET  /previsoes/{aviario}               previsão de um aviário, com as entregas detectadas
+    GET  /previsoes/{aviario}/grafico.png   gráfico da projeção (parâmetro opcional dpi)
+    GET  /entregas                          entregas detectadas em todos os aviários
+    GET  /estado                            dados carregados e estatísticas do cache
+
+Ao receber sensores ou lotes, a granja inteira é calculada em segundo plano e
+cada aviário fica no cache, indexado pelo hash do arquivo de sensores e pelos
+parâmetros do lote; as consultas seguintes são respondidas direto do cache.
+Em /previsoes/{aviario}, parâmetros do lote na query (data_alojamento,
+linhagem, n_aves, sobra_inicial_kg, idade_diluicao_start) substituem os
+configurados. Os cálculos rodam fora do laço de eventos, em uma thread
+dedicada (com --workers > 1, a granja é distribuída entre processos), e
+requisições simultâneas pelo mesmo resultado aguardam um único cálculo.
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+# Sem display: gráficos são gerados apenas como PNG (o matplotlib só é importado no primeiro gráfico)
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+from src.cache import CacheLRU
+from src.data_handler import importar_sensores, importar_lotes, memoria_mb
+from src.forecaster import SiloForecaster
+
+def _json_padrao(valor):
+    """Conversão para JSON dos tipos do pandas/numpy presentes nos resultados."""
+    if isinstance(valor, (pd.Timestamp, date)):
+        return valor.isoformat()
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return str(valor)
+
+_dumps = partial(json.dumps, default=_json_padrao, ensure_ascii=False)
+
+def _sem_nulos(registro):
+    return {chave: (None if not isinstance(valor, list) and pd.isna(valor) else valor) for chave, valor in registro.items()}
+
+def _chave_lote(parametros):
+    """Parâmetros de um lote como tupla ordenada (parte da chave do cache)."""
+    return tuple(sorted(parametros.items()))
+
+def registro_previsao(previsao):
+    """Previsão de um aviário como dicionário serializável: resumo, cenários e entregas."""
+    resultado = previsao.resultado
+    registro = {'aviario_num': int(resultado.aviario), 'ultima_leitura': resultado.ultima_leitura}
+    registro.update(resultado.resumo())
+    if resultado.cenarios is not None:
+        registro.update(resultado.cenarios.resumo())
+    registro = _sem_nulos(registro)
+    registro['entregas'] = [
+        {'data': data, 'quantidade_kg': float(quantidade)}
+        for data, quantidade in resultado.df_entregas.iloc[:, 0].items()
+    ]
+    return registro
+
+class ServicoPrevisao:
+    """Estado do serviço: arquivos de sensores carregados, lotes configurados e cache de resultados.
+
+    Os resultados ficam em um CacheLRU indexado por (hash dos sensores,
+    aviário, parâmetros do lote); a tabela da granja, por (hash dos sensores,
+    lotes). Todo cálculo passa por `_obter`, que reaproveita o cache e junta
+    requisições simultâneas pela mesma chave.
+    """
+
+    def __init__(self, linhagem_folder, workers=1, max_itens=512, ttl_s=900, n_cenarios=0, cache_dir=None):
+        self.linhagem_folder = linhagem_folder
+        self.workers = workers
+        self.n_cenarios = n_cenarios
+        self.cache_dir = cache_dir
+        self.resultados = CacheLRU(max_itens, ttl_s)
+        self.sensores = CacheLRU(max_itens=4) # hash -> DataFrame de sensores
+        self.sensores_atual = None
+        self.lotes = {}
+        self.tabelas_consumo = {}
+        # Pandas/matplotlib em uma única thread; o paralelismo fica nos processos do run_batch
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='previsao')
+        self._em_andamento = {}
+        self._tarefas = set()
+
+    async def _obter(self, chave, funcao, *args):
+        """Resultado em cache para `chave`, ou calculado por `funcao(*args)` no executor (uma vez por chave)."""
+        valor = self.resultados.obter(chave)
+        if valor is not None:
+            return valor
+
+        futuro = self._em_andamento.get(chave)
+        if futuro is None:
+            futuro = asyncio.get_running_loop().run_in_executor(self.executor, funcao, *args)
+            self._em_andamento[chave] = futuro
+            futuro.add_done_callback(partial(self._concluir, chave))
+        return await asyncio.shield(futuro)
+
+    def _concluir(self, chave, futuro):
+        del self._em_andamento[chave]
+        if not futuro.cancelled() and futuro.exception() is None:
+            self.resultados.guardar(chave, futuro.result())
+
+    # --- Cálculos (executados no executor) ---
+
+    def _carregar_sensores(self, dados):
+        return importar_sensores(io.BytesIO(dados), rapido=True, cache_dir=self.cache_dir, compacto=True)
+
+    def _prever(self, chave_sensores, lotes):
+        """Executa o run_batch e guarda cada aviário no cache; retorna (tabela, entregas)."""
+        df_sensores = self.sensores.obter(chave_sensores)
+        if df_sensores is None:
+            raise KeyError(f"Arquivo de sensores {chave_sensores} não está mais carregado; reenvie-o.")
+
+        forecaster = SiloForecaster(df_sensores, self.linhagem_folder, tempfile.gettempdir(),
+                                    tabelas_consumo=self.tabelas_consumo)
+        df_resultados, previsoes = forecaster.run_batch(lotes, gerar_relatorios=False, workers=self.workers,
+                                                        n_cenarios=self.n_cenarios)
+        for aviario, parametros in lotes.items():
+            previsao = previsoes.get(aviario)
+            valor = (previsao.copia_resultados() if previsao is not None
+                     else ValueError(df_resultados.loc[aviario, 'erro']))
+            self.resultados.guardar((chave_sensores, aviario, _chave_lote(parametros)), valor)
+        return df_resultados, forecaster.entregas_granja
+
+    def _prever_aviario(self, chave_sensores, aviario, parametros):
+        self._prever(chave_sensores, {aviario: parametros})
+        return self.resultados.obter((chave_sensores, aviario, _chave_lote(parametros)))
+
+    # --- Operações do serviço ---
+
+    async def adicionar_sensores(self, dados):
+        chave = hashlib.sha256(dados).hexdigest()
+        if chave not in self.sensores:
+            df = await asyncio.get_running_loop().run_in_executor(self.executor, self._carregar_sensores, dados)
+            self.sensores.guardar(chave, df)
+        self.sensores_atual = chave
+        self.precalcular()
+        return chave
+
+    def configurar_lotes(self, lotes):
+        self.lotes = lotes
+        self.precalcular()
+
+    def precalcular(self):
+        """Agenda, sem esperar, o cálculo da granja para os sensores e lotes atuais."""
+        if self.sensores_atual is None or not self.lotes:
+            return
+        tarefa = asyncio.ensure_future(self.granja())
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+        tarefa.add_done_callback(lambda t: t.cancelled() or t.exception()) # Erros aparecem nas consultas
+
+    def _exigir_sensores(self):
+        if self.sensores_atual is None:
+            raise web.HTTPConflict(text="Nenhum arquivo de sensores carregado (POST /sensores).")
+        return self.sensores_atual
+
+    async def granja(self):
+        chave_sensores = self._exigir_sensores()
+        if not self.lotes:
+            raise web.HTTPConflict(text="Nenhum lote configurado (PUT /lotes).")
+        chave = (chave_sensores, 'granja', tuple(sorted((a, _chave_lote(p)) for a, p in self.lotes.items())))
+        try:
+            return await self._obter(chave, self._prever, chave_sensores, dict(self.lotes))
+        except (OSError, KeyError, ValueError) as e:
+            raise web.HTTPUnprocessableEntity(text=str(e))
+
+    def _parametros_lote(self, aviario, query):
+        """Lote configurado do aviário com os parâmetros da query aplicados por cima (validados como em importar_lotes)."""
+        if not query:
+            parametros = self.lotes.get(aviario)
+        else:
+            registro = {**self.lotes.get(aviario, {}), **query, 'aviario': aviario}
+            try:
+                parametros = importar_lotes(io.BytesIO(_dumps([registro]).encode()), formato='json')[aviario]
+            except KeyError:
+                parametros = None
+            except ValueError as e:
+                raise web.HTTPBadRequest(text=str(e))
+        if parametros is None:
+            raise web.HTTPNotFound(text=f"Aviário {aviario} sem lote configurado; informe data_alojamento, "
+                                        "linhagem e n_aves na query.")
+        return parametros
+
+    async def previsao(self, aviario, query):
+        chave_sensores = self._exigir_sensores()
+        parametros = self._parametros_lote(aviario, query)
+        if self.lotes.get(aviario) == parametros:
+            # Lote configurado: o resultado vem do cálculo da granja (já feito ou em andamento)
+            await self.granja()
+        try:
+            previsao = await self._obter((chave_sensores, aviario, _chave_lote(parametros)),
+                                         self._prever_aviario, chave_sensores, aviario, parametros)
+        except (OSError, KeyError, ValueError) as e:
+            previsao = e
+        if isinstance(previsao, Exception):
+            raise web.HTTPUnprocessableEntity(text=str(previsao))
+        return previsao
+
+    async def grafico_png(self, previsao, dpi):
+        if previsao.plot_png is not None and previsao.plot_png_dpi == dpi:
+            return previsao.plot_png
+        return await asyncio.get_running_loop().run_in_executor(self.executor, previsao.grafico_png, dpi)
+
+    def estado(self):
+        df = self.sensores.obter(self.sensores_atual) if self.sensores_atual else None
+        return {
+            'sensores': self.sensores_atual,
+            'leituras': None if df is None else len(df),
+            'memoria_sensores_mb': None if df is None else round(memoria_mb(df), 1),
+            'aviarios_com_dados': [] if df is None else sorted(int(a) for a in df['aviario_num'].unique()),
+            'lotes': sorted(self.lotes),
+            'calculos_em_andamento': len(self._em_andamento),
+            'cache': self.resultados.estatisticas(),
+        }
+
+# --- Rotas HTTP ---
+
+CHAVE_SERVICO = web.AppKey('servico', ServicoPrevisao)
+
+def _json(dados, status=200):
+    return web.json_response(dados, status=status, dumps=_dumps)
+
+async def receber_sensores(request):
+    if request.content_type.startswith('multipart/'):
+        formulario = await request.post()
+        arquivo = formulario.get('arquivo')
+        if arquivo is None or not hasattr(arquivo, 'file'):
+            raise web.HTTPBadRequest(text="Envie o arquivo no campo 'arquivo'.")
+        dados = arquivo.file.read()
+    else:
+        dados = await request.read()
+    if not dados:
+        raise web.HTTPBadRequest(text="Arquivo de sensores vazio.")
+
+    servico = request.app[CHAVE_SERVICO]
+    try:
+        chave = await servico.adicionar_sensores(dados)
+    except (KeyError, ValueError) as e:
+        raise web.HTTPUnprocessableEntity(text=str(e))
+    return _json({'sensores': chave, **servico.estado()}, status=201)
+
+async def receber_lotes(request):
+    formato = 'csv' if request.content_type in ('text/csv', 'text/plain') else 'json'
+    try:
+        lotes = importar_lotes(io.BytesIO(await request.read()), formato=formato)
+    except (KeyError, ValueError) as e:
+        raise web.HTTPUnprocessableEntity(text=str(e))
+    servico = request.app[CHAVE_SERVICO]
+    servico.configurar_lotes(lotes)
+    return _json({'lotes': sorted(lotes)})
+
+async def listar_previsoes(request):
+    df_resultados, _ = await request.app[CHAVE_SERVICO].granja()
+    registros = [_sem_nulos({'aviario_num': aviario, **linha}) for aviario, linha in df_resultados.iterrows()]
+    return _json(registros)
+
+async def listar_entregas(request):
+    _, entregas = await request.app[CHAVE_SERVICO].granja()
+    return _json(entregas.to_dict('records'))
+
+def _aviario(request):
+    try:
+        return int(request.match_info['aviario'])
+    except ValueError:
+        raise web.HTTPBadRequest(text="Número de aviário inválido.")
+
+async def obter_previsao(request):
+    previsao = await request.app[CHAVE_SERVICO].previsao(_aviario(request), dict(request.query))
+    return _json(registro_previsao(previsao))
+
+async def obter_grafico(request):
+    query = dict(request.query)
+    try:
+        dpi = int(query.pop('dpi', 100))
+    except ValueError:
+        raise web.HTTPBadRequest(text="dpi inválido.")
+    servico = request.app[CHAVE_SERVICO]
+    previsao = await servico.previsao(_aviario(request), query)
+    return web.Response(body=await servico.grafico_png(previsao, dpi), content_type='image/png')
+
+async def obter_estado(request):
+    return _json(request.app[CHAVE_SERVICO].estado())
+
+def criar_app(servico):
+    """Aplicação aiohttp do serviço (também usada por tests/test_servico.py com o cliente de teste do aiohttp)."""
+    app = web.Application(client_max_size=512 * 1024 ** 2) # Exportações de vários meses passam de 100 MB
+    app[CHAVE_SERVICO] = servico
+    app.add_routes([
+        web.post('/sensores', receber_sensores),
+        web.put('/lotes', receber_lotes),
+        web.get('/previsoes', listar_previsoes),
+        web.get('/previsoes/{aviario}', obter_previsao),
+        web.get('/previsoes/{aviario}/grafico.png', obter_grafico),
+        web.get('/entregas', listar_entregas),
+        web.get('/estado', obter_estado),
+    ])
+
+    async def encerrar(app):
+        app[CHAVE_SERVICO].executor.shutdown(wait=False, cancel_futures=True)
+    app.on_cleanup.append(encerrar)
+    return app
+
+def main(argv=None):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8080)
+    parser.add_argument('--sensores', help='Sensores.csv carregado na inicialização.')
+    parser.add_argument('--lotes', help='Configuração dos lotes (CSV ou JSON) carregada na inicialização.')
+    parser.add_argument('--linhagem-folder', default=os.path.join(script_dir, 'static', 'linhagem'))
+    parser.add_argument('--workers', type=int, default=1, help='Processos usados no cálculo da granja.')
+    parser.add_argument('--ttl', type=float, default=900, help='Validade dos resultados em cache, em segundos.')
+    parser.add_argument('--max-itens', type=int, default=512, help='Máximo de previsões mantidas em cache.')
+    parser.add_argument('--cenarios', type=int, default=0, help='Cenários de consumo simulados por aviário.')
+    parser.add_argument('--cache', help='Pasta de cache Parquet dos arquivos de sensores.')
+    args = parser.parse_args(argv)
+
+    servico = ServicoPrevisao(args.linhagem_folder, workers=args.workers, max_itens=args.max_itens,
+                              ttl_s=args.ttl, n_cenarios=args.cenarios, cache_dir=args.cache)
+    app = criar_app(servico)
+
+    async def carregar_inicial(app):
+        try:
+            if args.lotes:
+                servico.configurar_lotes(importar_lotes(args.lotes))
+            if args.sensores:
+                with open(args.sensores, 'rb') as f:
+                    await servico.adicionar_sensores(f.read())
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Erro de entrada: {e}", file=sys.stderr)
+            raise SystemExit(2)
+    app.on_startup.append(carregar_inicial)
+
+    web.run_app(app, host=args.host, port=args.porta)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import pandas as pd
+import numpy as np
+
+# Resoluções mantidas para tabelas e consultas de histórico longo (rótulo -> frequência do pandas)
+RESOLUCOES = {'horaria': 'h', '6 horas': '6h', 'diaria': 'D'}
+
+def lttb(x, y, n_pontos):
+    """Posições dos pontos escolhidos pelo Largest-Triangle-Three-Buckets.
+
+    Divide a série em `n_pontos` - 2 faixas e escolhe, em cada uma, o ponto que
+    forma o maior triângulo com o ponto escolhido na faixa anterior e a média da
+    faixa seguinte. Picos e vales (reabastecimentos, esvaziamentos) tendem a ser
+    preservados. O primeiro e o último ponto sempre entram.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    total = len(y)
+    if n_pontos >= total or n_pontos < 3:
+        return np.arange(total)
+
+    limites = np.linspace(1, total - 1, n_pontos - 1).astype(int)
+    escolhidos = np.empty(n_pontos, dtype=int)
+    escolhidos[0], escolhidos[-1] = 0, total - 1
+    anterior = 0
+    for faixa in range(n_pontos - 2):
+        inicio, fim = limites[faixa], limites[faixa + 1]
+        # Faixa seguinte (na última faixa, o próprio último ponto)
+        fim_seguinte = limites[faixa + 2] if faixa + 2 < len(limites) else total
+        media_x = x[fim:fim_seguinte].mean()
+        media_y = y[fim:fim_seguinte].mean()
+
+        areas = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                       - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+        anterior = inicio + int(np.argmax(areas))
+        escolhidos[faixa + 1] = anterior
+    return escolhidos
+
+def reduzir_serie(serie, max_pontos, manter=None):
+    """Série temporal reduzida a no máximo `max_pontos` (mais os instantes em `manter`) com LTTB.
+
+    `manter` lista instantes que devem continuar visíveis (ex.: entregas); cada
+    um entra junto com o ponto anterior, para que o degrau do reabastecimento
+    apareça inteiro.
+    """
+    if len(serie) <= max_pontos:
+        return serie
+
+    posicoes = lttb(serie.index.asi8, serie.to_numpy(), max_pontos)
+    if manter is not None and len(manter):
+        extras = serie.index.get_indexer(pd.DatetimeIndex(manter))
+        extras = extras[extras >= 0]
+        posicoes = np.union1d(posicoes, np.concatenate([extras, np.maximum(extras - 1, 0)]))
+    return serie.iloc[posicoes]
+
+def agregar_resolucoes(df_hourly):
+    """Agregados do histórico horário em cada resolução de RESOLUCOES.
+
+    A horária é o próprio df_hourly; as demais têm o peso mínimo, médio e máximo
+    do silo, o consumo (só as quedas de peso, sem as entregas) e a idade do lote.
+    """
+    agregados = {'horaria': df_hourly}
+    consumo = df_hourly['consumo_real_kg'].clip(lower=0) if 'consumo_real_kg' in df_hourly.columns else None
+    for rotulo, frequencia in RESOLUCOES.items():
+        if rotulo == 'horaria':
+            continue
+        grupos = df_hourly['peso_silo'].resample(frequencia)
+        df = pd.DataFrame({
+            'peso_min': grupos.min(),
+            'peso_medio': grupos.mean(),
+            'peso_max': grupos.max(),
+        })
+        if consumo is not None:
+            df['consumo_kg'] = consumo.resample(frequencia).sum(min_count=1)
+        df['idade'] = df_hourly['idade'].resample(frequencia).max()
+        agregados[rotulo] = df.dropna(subset=['peso_medio'])
+    return agregados
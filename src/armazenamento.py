@@ -0,0 +1,154 @@
+import pandas as pd
+import numpy as np
+import contextlib
+import os
+import sqlite3
+
+from .data_handler import numero_aviario
+from .metricas import etapa
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    collector TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    aviario_num INTEGER,
+    UNIQUE (collector, channel)
+);
+CREATE INDEX IF NOT EXISTS series_aviario ON series (aviario_num);
+-- Uma linha por leitura; a chave primária (série, instante) elimina leituras repetidas
+-- e mantém os dados de cada série ordenados no tempo, o que torna as consultas por janela diretas
+CREATE TABLE IF NOT EXISTS leituras (
+    serie_id INTEGER NOT NULL REFERENCES series (id),
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (serie_id, ts)
+) WITHOUT ROWID;
+"""
+
+# Resolução dos instantes lidos do CSV nesta versão do pandas, para que as consultas devolvam o mesmo dtype
+_UNIDADE_TEMPO = pd.to_datetime(['2000-01-01 00:00:00']).unit
+
+def _segundos(instantes):
+    """Instantes (DatetimeIndex/array) em segundos desde a época, como int64."""
+    return np.asarray(instantes, dtype='datetime64[s]').astype('int64')
+
+class ArmazemSensores:
+    """Histórico persistente das leituras de sensores em um arquivo SQLite.
+
+    Cada par (coletor, canal) é uma série, associada ao número do aviário; as
+    leituras ficam indexadas por (série, instante), de modo que a consulta de um
+    aviário em uma janela de tempo lê apenas as linhas desse aviário. Cada
+    operação abre a sua própria conexão, então a instância pode ser
+    compartilhada entre threads (ex.: sessões do Streamlit).
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        pasta = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(pasta, exist_ok=True)
+        with self._conectar() as conexao:
+            conexao.execute('PRAGMA journal_mode=WAL') # Leituras não bloqueiam durante uma importação
+            conexao.executescript(_ESQUEMA)
+
+    @contextlib.contextmanager
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho)
+        try:
+            with conexao: # commit ao final do bloco, rollback em caso de erro
+                yield conexao
+        finally:
+            conexao.close()
+
+    def adicionar(self, df_sensores):
+        """Acrescenta as leituras de um DataFrame de importar_sensores e retorna quantas eram novas.
+
+        Leituras já armazenadas (mesmo instante, coletor e canal) são ignoradas.
+        """
+        df = df_sensores[['collector', 'channel', 'value']].dropna()
+        if df.empty:
+            return 0
+
+        with etapa('armazem_adicionar', linhas=len(df)), self._conectar() as conexao:
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            chaves = pd.MultiIndex.from_arrays([df['collector'].astype(str), df['channel'].astype(str)])
+            pares = chaves.unique()
+            aviarios = numero_aviario(pd.Series(pares.get_level_values(0)))
+            conexao.executemany(
+                'INSERT OR IGNORE INTO series (collector, channel, aviario_num) VALUES (?, ?, ?)',
+                [(collector, channel, None if pd.isna(aviario) else int(aviario))
+                 for (collector, channel), aviario in zip(pares, aviarios)]
+            )
+            ids = dict(((collector, channel), serie_id) for serie_id, collector, channel
+                       in conexao.execute('SELECT id, collector, channel FROM series'))
+
+            serie_ids = np.array([ids[par] for par in pares], dtype='int64')[pares.get_indexer(chaves)]
+            antes = conexao.total_changes
+            conexao.executemany(
+                'INSERT OR IGNORE INTO leituras (serie_id, ts, value) VALUES (?, ?, ?)',
+                zip(serie_ids.tolist(), _segundos(df.index).tolist(), df['value'].astype('float64').tolist())
+            )
+            return conexao.total_changes - antes
+
+    def aviarios(self):
+        """Números dos aviários com leituras armazenadas."""
+        with self._conectar() as conexao:
+            linhas = conexao.execute(
+                'SELECT DISTINCT aviario_num FROM series WHERE aviario_num IS NOT NULL ORDER BY aviario_num'
+            ).fetchall()
+        return [aviario for aviario, in linhas]
+
+    def ultima_leitura(self, aviarios=None):
+        """Instante da leitura mais recente (de todos os aviários ou só dos informados), ou None."""
+        filtro, parametros = self._filtro_aviarios(aviarios)
+        with self._conectar() as conexao:
+            ts, = conexao.execute(
+                f'SELECT MAX(ts) FROM leituras WHERE serie_id IN (SELECT id FROM series {filtro})', parametros
+            ).fetchone()
+        return None if ts is None else pd.Timestamp(ts, unit='s')
+
+    def consultar(self, aviarios=None, inicio=None, fim=None):
+        """Leituras de um aviário (ou lista de aviários) entre `inicio` e `fim`, inclusive.
+
+        Retorna um DataFrame no formato de importar_sensores (índice 'timedate',
+        colunas collector, channel e value) com a coluna aviario_num preenchida.
+        """
+        filtro, parametros_aviarios = self._filtro_aviarios(aviarios)
+        condicoes, parametros = [f'l.serie_id IN (SELECT id FROM series {filtro})'], list(parametros_aviarios)
+        if inicio is not None:
+            condicoes.append('l.ts >= ?')
+            parametros.append(int(_segundos([pd.Timestamp(inicio)])[0]))
+        if fim is not None:
+            condicoes.append('l.ts <= ?')
+            parametros.append(int(_segundos([pd.Timestamp(fim)])[0]))
+
+        with etapa('armazem_consultar') as medida, self._conectar() as conexao:
+            series = pd.read_sql_query(f'SELECT id, collector, channel, aviario_num FROM series {filtro}', conexao,
+                                       params=parametros_aviarios, index_col='id')
+            leituras = pd.read_sql_query(
+                f"SELECT l.serie_id, l.ts, l.value FROM leituras l WHERE {' AND '.join(condicoes)}", conexao,
+                params=parametros
+            )
+            medida.linhas = len(leituras)
+
+        serie = leituras['serie_id'].to_numpy()
+        aviario_num = series['aviario_num'].reindex(serie)
+        if aviario_num.notna().all():
+            aviario_num = aviario_num.astype('int64')
+        df = pd.DataFrame({
+            'collector': pd.Categorical(series['collector'].reindex(serie).to_numpy()),
+            'channel': pd.Categorical(series['channel'].reindex(serie).to_numpy()),
+            'value': leituras['value'].to_numpy(dtype='float32'),
+            'aviario_num': aviario_num.to_numpy(),
+        }, index=pd.DatetimeIndex(pd.to_datetime(leituras['ts'].to_numpy(), unit='s').as_unit(_UNIDADE_TEMPO), name='timedate'))
+        return df.sort_index(kind='stable')
+
+    @staticmethod
+    def _filtro_aviarios(aviarios):
+        """Cláusula WHERE (e parâmetros) que restringe a tabela series aos aviários informados."""
+        if aviarios is None:
+            return '', []
+        if np.isscalar(aviarios):
+            aviarios = [aviarios]
+        aviarios = [int(aviario) for aviario in aviarios]
+        return f"WHERE aviario_num IN ({', '.join('?' * len(aviarios))})", aviarios
@@ -0,0 +1,156 @@
+import pandas as pd
+import numpy as np
+
+from .entregas import LIMIAR_PADRAO_KG, detectar_entregas
+from .metricas import etapa
+
+# Horizonte da projeção do SiloForecaster (datas_projetadas em _eixo_projecao)
+HORAS_PROJECAO = 24 * 30 - 1
+
+def backtest_aviario(df_hourly, tabela_consumo, n_aves, data_alojamento, idade_diluicao_start=19, sobra_inicial_kg=0.0,
+                     limiar_entrega_kg=LIMIAR_PADRAO_KG, peso_vazio_kg=100.0, horizontes=(24, 72), janela=24):
+    """Refaz a projeção de autonomia em cada hora do histórico de um aviário e compara com o que aconteceu.
+
+    `df_hourly` é o histórico horário de uma previsão (colunas peso_silo e
+    idade, ver SiloForecaster.df_hourly). Cada hora com pelo menos `janela`
+    horas de consumo válido antes dela é um ponto de corte: o fator de consumo
+    e a projeção são os que o SiloForecaster calcularia com o histórico até
+    ali (mesmas regras de _projetar), obtidos de somas acumuladas sobre a série
+    inteira em vez de uma projeção por corte.
+
+    O evento observado após cada corte é o esvaziamento (peso <= `peso_vazio_kg`)
+    ou, se vier antes, a última hora antes da próxima entrega. erro_horas é o
+    tempo previsto para a projeção chegar ao peso observado no evento menos o
+    tempo real até ele (positivo = previsão otimista); sem evento até o fim do
+    histórico, ou com a projeção sem chegar a esse peso em 30 dias, fica vazio.
+    erro_kg_<h>h compara o peso projetado e o observado `h` horas depois do
+    corte, quando não houve entrega nesse intervalo.
+    """
+    peso = df_hourly['peso_silo'].to_numpy(dtype=float)
+    idade = df_hourly['idade'].to_numpy()
+    tempos = pd.DatetimeIndex(df_hourly.index)
+    n = len(peso)
+    colunas = ['peso_kg', 'idade', 'fator_consumo', 'horas_esgotamento', 'data_esgotamento', 'evento',
+               'data_evento', 'peso_evento_kg', 'horas_evento', 'horas_evento_previstas', 'erro_horas'] + \
+              [f'erro_kg_{horas}h' for horas in horizontes]
+    if n < 2:
+        return pd.DataFrame(columns=colunas, index=pd.DatetimeIndex([], name=tempos.name))
+
+    # Taxa recente de cada corte: média das últimas `janela` horas de consumo válido até ele (_consumos_recentes)
+    # Diferença no tipo original da série (float32 no esquema compacto), como em _project_autonomy
+    consumo = (-df_hourly['peso_silo'].diff()).to_numpy(dtype=float)
+    valido = (consumo > 0) & (consumo < 500)
+    n_validos = np.cumsum(valido)
+    soma_validos = np.concatenate(([0.0], np.cumsum(consumo[valido])))
+    contagem = np.minimum(n_validos, janela)
+    cortes = np.flatnonzero(n_validos >= janela)
+    taxa = (soma_validos[n_validos[cortes]] - soma_validos[n_validos[cortes] - contagem[cortes]]) / contagem[cortes]
+
+    # Consumo da tabela acumulado em uma grade horária absoluta, do início do histórico até 30 dias após o fim
+    inicio = tempos[0]
+    posicao = ((tempos - inicio) // pd.Timedelta(hours=1)).to_numpy()
+    grade = inicio + pd.to_timedelta(np.arange(posicao[-1] + HORAS_PROJECAO + 1), unit='h')
+    idades_grade = (grade.normalize() - pd.Timestamp(data_alojamento)).days.to_numpy() + 1
+    acumulado = np.cumsum(tabela_consumo.consumo(idades_grade))
+
+    consumo_tabela_atual = tabela_consumo.consumo(idade[cortes])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fator = (taxa * 1000 * 24 / n_aves) / consumo_tabela_atual
+        # Consumo projetado acumulado em k horas = escala * (acumulado[p + k] - acumulado[p])
+        escala = taxa / consumo_tabela_atual
+    p = posicao[cortes]
+
+    # Hora de devolução da sobra (em horas projetadas após o corte), como em _eixo_projecao
+    hora_devolucao = np.full(len(cortes), HORAS_PROJECAO)
+    if sobra_inicial_kg > 0:
+        atingiu = idades_grade >= idade_diluicao_start
+        if atingiu.any():
+            hora_devolucao = np.clip(int(np.argmax(atingiu)) - p - 1, 0, HORAS_PROJECAO)
+
+    def horas_ate(nivel):
+        """Horas projetadas até o peso chegar a `nivel` (NaN se não chegar no horizonte), por corte."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            base = acumulado[p]
+            antes = np.maximum(np.searchsorted(acumulado, base + (peso[cortes] - sobra_inicial_kg - nivel) / escala) - p, 1)
+            depois = np.maximum(np.searchsorted(acumulado, base + (peso[cortes] - nivel) / escala) - p, hora_devolucao + 1)
+        horas = np.where(antes <= hora_devolucao, antes, depois).astype(float)
+        horas[(horas > HORAS_PROJECAO) | ~np.isfinite(escala) | (escala <= 0)] = np.nan
+        return horas
+
+    horas_esgotamento = horas_ate(0.0)
+
+    # Evento observado: esvaziamento ou a última hora antes da próxima entrega, o que vier primeiro
+    entregas = detectar_entregas(df_hourly['peso_silo'], limiar_entrega_kg)
+    proxima_entrega = _proxima_posicao(np.searchsorted(tempos.to_numpy(), pd.DatetimeIndex(entregas['inicio']).to_numpy()), n)
+    proximo_vazio = _proxima_posicao(np.flatnonzero(peso <= peso_vazio_kg), n)
+
+    esvaziou = proximo_vazio[cortes] < proxima_entrega[cortes]
+    evento = np.where(esvaziou, proximo_vazio[cortes], proxima_entrega[cortes] - 1)
+    observado = (evento > cortes) & (esvaziou | (proxima_entrega[cortes] < n))
+    evento = np.where(observado, evento, cortes)
+    horas_evento = np.where(observado, posicao[evento] - p, np.nan)
+    peso_evento = np.where(observado, peso[evento], np.nan)
+    horas_evento_previstas = np.where(observado, horas_ate(np.where(observado, peso_evento, 0.0)), np.nan)
+
+    resultado = pd.DataFrame({
+        'peso_kg': peso[cortes],
+        'idade': idade[cortes],
+        'fator_consumo': fator,
+        'horas_esgotamento': horas_esgotamento,
+        'data_esgotamento': tempos[cortes] + pd.to_timedelta(horas_esgotamento, unit='h'),
+        'evento': np.where(observado, np.where(esvaziou, 'esvaziamento', 'entrega'), None),
+        'data_evento': tempos[evento].where(observado),
+        'peso_evento_kg': peso_evento,
+        'horas_evento': horas_evento,
+        'horas_evento_previstas': horas_evento_previstas,
+        'erro_horas': horas_evento_previstas - horas_evento,
+    }, index=tempos[cortes])
+
+    # Erro do peso projetado a `horas` do corte, só quando não houve entrega nesse intervalo
+    for horas in horizontes:
+        alvo = p + horas
+        destino = np.searchsorted(posicao, alvo)
+        existe = (destino < n) & (posicao[np.minimum(destino, n - 1)] == alvo)
+        destino = np.minimum(destino, n - 1)
+        sem_entrega = existe & (proxima_entrega[cortes] > destino)
+        sobra = np.where(horas <= hora_devolucao, sobra_inicial_kg, 0.0)
+        with np.errstate(invalid='ignore'):
+            projetado = peso[cortes] - sobra - escala * (acumulado[alvo] - acumulado[p])
+        resultado[f'erro_kg_{horas}h'] = np.where(sem_entrega, projetado - peso[destino], np.nan)
+
+    resultado.index.name = tempos.name
+    return resultado[colunas]
+
+def _proxima_posicao(posicoes, n):
+    """Para cada posição 0..n-1, a primeira de `posicoes` (ordenadas) depois dela, ou n se não houver."""
+    posicoes = np.append(np.asarray(posicoes, dtype=np.int64), n)
+    return posicoes[np.searchsorted(posicoes, np.arange(n), side='right')]
+
+def resumir_backtest(df_backtest, por=('aviario_num', 'linhagem')):
+    """Distribuição dos erros do backtest por grupo (um ou mais de `por`), com uma linha por grupo.
+
+    Para erro_horas: cortes avaliados, viés (média), erro absoluto médio e
+    mediano e os percentis 10 e 90; para cada erro_kg_<h>h, o erro absoluto médio.
+    """
+    def resumir(grupo):
+        erros = grupo['erro_horas'].dropna()
+        linha = {
+            'cortes': len(grupo),
+            'cortes_avaliados': len(erros),
+            'vies_horas': erros.mean(),
+            'mae_horas': erros.abs().mean(),
+            'mediana_abs_horas': erros.abs().median(),
+            'p10_horas': erros.quantile(0.1),
+            'p90_horas': erros.quantile(0.9),
+        }
+        for coluna in grupo.columns[grupo.columns.str.startswith('erro_kg_')]:
+            linha[f'mae_{coluna[len("erro_"):]}'] = grupo[coluna].abs().mean()
+        return pd.Series(linha)
+
+    with etapa('resumir_backtest', linhas=len(df_backtest)):
+        resumos = {chave: resumir(grupo) for chave, grupo in df_backtest.groupby(list(por), observed=True)}
+        resumo = pd.DataFrame.from_dict(resumos, orient='index')
+        resumo.index.names = list(por)
+        resumo['cortes'] = resumo['cortes'].astype(int)
+        resumo['cortes_avaliados'] = resumo['cortes_avaliados'].astype(int)
+        return resumo
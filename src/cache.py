@@ -0,0 +1,175 @@
+import pandas as pd
+import glob
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+class CacheLRU:
+    """Cache em memória com limite de itens (LRU) e validade por item (TTL).
+
+    Ao passar de `max_itens`, descarta o item usado há mais tempo; com `ttl_s`,
+    itens guardados há mais de `ttl_s` segundos são tratados como ausentes.
+    Seguro para uso entre threads.
+    """
+
+    def __init__(self, max_itens=256, ttl_s=None, relogio=time.monotonic):
+        self.max_itens = max_itens
+        self.ttl_s = ttl_s
+        self._relogio = relogio
+        self._itens = OrderedDict() # chave -> (instante em que foi guardado, valor)
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.expirados = 0
+        self.descartados = 0
+
+    def obter(self, chave, padrao=None):
+        """Valor guardado em `chave` (marcado como usado agora), ou `padrao` se ausente ou expirado."""
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is not None and self._expirado(item[0]):
+                del self._itens[chave]
+                self.expirados += 1
+                item = None
+            if item is None:
+                self.faltas += 1
+                return padrao
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[1]
+
+    def guardar(self, chave, valor):
+        with self._trava:
+            self._itens[chave] = (self._relogio(), valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.descartados += 1
+
+    def remover(self, chave):
+        with self._trava:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def _expirado(self, instante):
+        return self.ttl_s is not None and self._relogio() - instante > self.ttl_s
+
+    def __contains__(self, chave):
+        with self._trava:
+            item = self._itens.get(chave)
+            return item is not None and not self._expirado(item[0])
+
+    def __len__(self):
+        return len(self._itens)
+
+    def estatisticas(self):
+        """Contadores de uso do cache (para monitoramento)."""
+        consultas = self.acertos + self.faltas
+        return {
+            'itens': len(self._itens),
+            'max_itens': self.max_itens,
+            'ttl_s': self.ttl_s,
+            'acertos': self.acertos,
+            'faltas': self.faltas,
+            'expirados': self.expirados,
+            'descartados': self.descartados,
+            'taxa_acerto': self.acertos / consultas if consultas else None,
+        }
+
+def impressao_digital(*partes):
+    """Hash (hex) do conteúdo de DataFrames/Series e dos demais valores (pela repr), na ordem dada."""
+    resumo = hashlib.sha256()
+    for parte in partes:
+        if isinstance(parte, (pd.DataFrame, pd.Series)):
+            nomes = list(parte.columns) if isinstance(parte, pd.DataFrame) else [parte.name]
+            resumo.update(repr((type(parte).__name__, nomes, parte.shape, str(parte.index.dtype))).encode())
+            resumo.update(pd.util.hash_pandas_object(parte, index=True).to_numpy().tobytes())
+        else:
+            resumo.update(repr(parte).encode())
+        resumo.update(b'\0')
+    return resumo.hexdigest()
+
+class CacheResultados:
+    """Cache de resultados de previsão por impressão digital da entrada, em memória e opcionalmente em disco.
+
+    A memória é um CacheLRU; com `pasta`, cada resultado também é gravado em
+    um arquivo pickle (nome = versão + chave), consultado quando a chave não
+    está na memória, de modo que o cache sobrevive a reinícios do processo. As
+    chaves devem ser strings hexadecimais (ver impressao_digital).
+    """
+
+    # Versão do formato dos resultados gravados: incrementar quando o estado guardado ou o cálculo mudar,
+    # para que arquivos de versões anteriores do código não sejam mais lidos
+    VERSAO = 3
+
+    def __init__(self, max_itens=128, pasta=None, ttl_s=None):
+        self.memoria = CacheLRU(max_itens, ttl_s)
+        self.pasta = pasta
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.faltas = 0
+        self.gravacoes = 0
+        if pasta is not None:
+            os.makedirs(pasta, exist_ok=True)
+
+    def _caminho(self, chave):
+        return os.path.join(self.pasta, f'previsao_v{self.VERSAO}_{chave}.pkl')
+
+    def obter(self, chave):
+        valor = self.memoria.obter(chave)
+        if valor is not None:
+            self.acertos_memoria += 1
+            return valor
+
+        if self.pasta is not None:
+            try:
+                with open(self._caminho(chave), 'rb') as f:
+                    valor = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+                valor = None # Ausente, incompleto ou de uma versão incompatível do código
+            if valor is not None:
+                self.acertos_disco += 1
+                self.memoria.guardar(chave, valor)
+                return valor
+
+        self.faltas += 1
+        return None
+
+    def guardar(self, chave, valor):
+        self.memoria.guardar(chave, valor)
+        self.gravacoes += 1
+        if self.pasta is None:
+            return
+        # Grava em arquivo temporário e renomeia, para nunca deixar um arquivo incompleto
+        caminho = self._caminho(chave)
+        caminho_tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(caminho_tmp, 'wb') as f:
+                pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(caminho_tmp, caminho)
+        except OSError:
+            pass # Sem espaço ou sem permissão: fica só a memória
+
+    def limpar(self, disco=False):
+        self.memoria.limpar()
+        if disco and self.pasta is not None:
+            for arquivo in glob.glob(os.path.join(self.pasta, 'previsao_*.pkl')):
+                os.remove(arquivo)
+
+    def estatisticas(self):
+        """Acertos (memória e disco), faltas e gravações desde a criação do cache."""
+        consultas = self.acertos_memoria + self.acertos_disco + self.faltas
+        return {
+            'acertos_memoria': self.acertos_memoria,
+            'acertos_disco': self.acertos_disco,
+            'faltas': self.faltas,
+            'gravacoes': self.gravacoes,
+            'itens_memoria': len(self.memoria),
+            'taxa_acerto': (self.acertos_memoria + self.acertos_disco) / consultas if consultas else None,
+        }
@@ -1,55 +1,97 @@
 import pandas as pd
+import numpy as np
+import hashlib
+import io
+import json
 import os
+import threading
 
-def importar_sensores(source):
-    """Carrega os dados dos sensores a partir de um arquivo CSV ou objeto de arquivo."""
-    df = pd.read_csv(source, sep=';', encoding='utf-8', skiprows=1, decimal=',', thousands='.')
-    df.columns = df.columns.str.strip().str.lower()
+from .metricas import etapa
 
-    # Check for 'value' or 'valor' column
-    if 'value' in df.columns:
-        pass # Column is already 'value' (lowercase)
-    elif 'valor' in df.columns:
-        df.rename(columns={'valor': 'value'}, inplace=True) # Rename 'valor' to 'value'
-    else:
-        raise KeyError("A coluna 'Value' ou 'Valor' não foi encontrada no Sensores.csv.")
+# Nomes padronizados das colunas do Sensores.csv, com o alias em português e a mensagem de erro
+_COLUNAS_SENSORES = {
+    'value': ('valor', "A coluna 'Value' ou 'Valor' não foi encontrada no Sensores.csv."),
+    'date': ('data', "A coluna 'Date' ou 'Data' não foi encontrada no Sensores.csv."),
+    'hour': ('hora', "As colunas 'Hour' ou 'Hora' não foram encontradas no Sensores.csv."),
+    'collector': ('coletor', "A coluna 'Collector' ou 'Coletor' não foi encontrada no Sensores.csv."),
+    'channel': ('canal', "A coluna 'Channel' ou 'Canal' não foi encontrada no Sensores.csv."),
+}
 
-    df['value'] = pd.to_numeric(df['value'], errors='coerce') # Use lowercase 'value'
-    df.dropna(subset=['value'], inplace=True) # Use lowercase 'value'
+def _mapear_colunas(colunas):
+    """Mapeia os nomes originais das colunas para os nomes padronizados (minúsculas, em inglês)."""
+    mapa = {coluna: str(coluna).strip().lower() for coluna in colunas}
+    encontradas = set(mapa.values())
+    for padrao, (alias, mensagem) in _COLUNAS_SENSORES.items():
+        if padrao in encontradas:
+            continue
+        if alias not in encontradas:
+            raise KeyError(mensagem)
+        mapa = {original: (padrao if nome == alias else nome) for original, nome in mapa.items()}
+    return mapa
 
-    # Check for 'date' or 'data'
-    if 'date' in df.columns:
-        pass # Column is already 'date' (lowercase)
-    elif 'data' in df.columns:
-        df.rename(columns={'data': 'date'}, inplace=True) # Rename 'data' to 'date'
-    else:
-        raise KeyError("A coluna 'Date' ou 'Data' não foi encontrada no Sensores.csv.")
+def _ler_bytes(source):
+    """Lê o conteúdo bruto de um caminho ou objeto de arquivo (ex.: upload do Streamlit)."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read()
+    dados = source.read()
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return dados.encode('utf-8') if isinstance(dados, str) else dados
 
-    # Check for 'hour' or 'hora'
-    if 'hour' in df.columns:
-        pass # Column is already 'hour' (lowercase)
-    elif 'hora' in df.columns:
-        df.rename(columns={'hora': 'hour'}, inplace=True) # Rename 'hora' to 'hour'
-    else:
-        raise KeyError("As colunas 'Hour' ou 'Hora' não foram encontradas no Sensores.csv.")
+def importar_sensores(source, rapido=False, cache_dir=None, armazem=None, compacto=False):
+    """Carrega os dados dos sensores a partir de um arquivo CSV ou objeto de arquivo.
 
-    # --- Add check for 'collector' or 'coletor' ---
-    if 'collector' in df.columns:
-        pass # Column is already 'collector' (lowercase)
-    elif 'coletor' in df.columns:
-        df.rename(columns={'coletor': 'collector'}, inplace=True) # Rename 'coletor' to 'collector'
-    else:
-        raise KeyError("A coluna 'Collector' ou 'Coletor' não foi encontrada no Sensores.csv.")
-    # --- End add check for 'collector' or 'coletor' ---
-
-    # --- Add check for 'channel' or 'canal' ---
-    if 'channel' in df.columns:
-        pass # Column is already 'channel' (lowercase)
-    elif 'canal' in df.columns:
-        df.rename(columns={'canal': 'channel'}, inplace=True) # Rename 'canal' to 'channel'
-    else:
-        raise KeyError("A coluna 'Channel' ou 'Canal' não foi encontrada no Sensores.csv.")
-    # --- End add check for 'channel' or 'canal' ---
+    Com `rapido=True` usa o leitor colunar (ver _importar_sensores_rapido). Com
+    `cache_dir`, o resultado é gravado em Parquet, com nome derivado do hash do
+    conteúdo do arquivo, e reaproveitado quando o mesmo arquivo é reaberto. Com
+    `armazem` (ArmazemSensores), as leituras também são acrescentadas ao
+    histórico persistente, sem duplicar as já armazenadas. Com `compacto=True`,
+    retorna o esquema de compactar_sensores (já com aviario_num).
+    """
+    with etapa('importar_sensores') as medida:
+        df = _importar_sensores(source, rapido, cache_dir)
+        if compacto:
+            with etapa('compactar_sensores', linhas=len(df)):
+                df = compactar_sensores(df)
+        medida.linhas = len(df)
+    if armazem is not None:
+        armazem.adicionar(df)
+    return df
+
+def _importar_sensores(source, rapido, cache_dir):
+    importar = _importar_sensores_rapido if rapido else _importar_sensores_pandas
+    if cache_dir is None:
+        with etapa('ler_csv'):
+            return importar(source)
+
+    dados = _ler_bytes(source)
+    chave = hashlib.sha256(dados).hexdigest()
+    caminho_cache = os.path.join(cache_dir, f"sensores_{chave}{'_rapido' if rapido else ''}.parquet")
+    if os.path.exists(caminho_cache):
+        with etapa('ler_cache_parquet'):
+            return pd.read_parquet(caminho_cache)
+
+    with etapa('ler_csv'):
+        df = importar(io.BytesIO(dados))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Grava em arquivo temporário e renomeia, para nunca deixar um cache incompleto
+        caminho_tmp = f"{caminho_cache}.{os.getpid()}.tmp"
+        with etapa('gravar_cache_parquet'):
+            df.to_parquet(caminho_tmp)
+        os.replace(caminho_tmp, caminho_cache)
+    except ImportError:
+        pass # Sem pyarrow/fastparquet o cache em disco é ignorado
+    return df
+
+def _importar_sensores_pandas(source):
+    """Leitura original do Sensores.csv com o motor padrão do pandas."""
+    df = pd.read_csv(source, sep=';', encoding='utf-8', skiprows=1, decimal=',', thousands='.')
+    df.rename(columns=_mapear_colunas(df.columns), inplace=True)
+
+    df['value'] = pd.to_numeric(df['value'], errors='coerce') # Use lowercase 'value'
+    df.dropna(subset=['value'], inplace=True) # Use lowercase 'value'
 
     # --- Debugging/Robustness additions ---
     if not pd.api.types.is_string_dtype(df['date']):
@@ -70,9 +112,304 @@ def importar_sensores(source):
     df = df.set_index('timedate').sort_index()
     return df
 
+def _importar_sensores_rapido(source):
+    """Leitura colunar do Sensores.csv.
+
+    Usa o leitor CSV do pyarrow quando disponível (motor C do pandas caso
+    contrário), mantém as colunas de texto como categóricas, converte data e
+    hora apenas uma vez por valor distinto e guarda 'value' em float32.
+    """
+    dados = _ler_bytes(source)
+    linhas = dados[:65536].split(b'\n', 2)
+    cabecalho = linhas[1].decode('utf-8-sig').strip('\r').split(';') if len(linhas) > 1 else []
+    mapa = _mapear_colunas(cabecalho)
+    coluna_valor = next(original for original, padrao in mapa.items() if padrao == 'value')
+
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        pa = None
+
+    if pa is not None:
+        categoria = pa.dictionary(pa.int32(), pa.string())
+        tabela = pa_csv.read_csv(
+            pa.BufferReader(dados),
+            read_options=pa_csv.ReadOptions(skip_rows=1),
+            parse_options=pa_csv.ParseOptions(delimiter=';'),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={coluna: (pa.string() if coluna == coluna_valor else categoria) for coluna in cabecalho}
+            ),
+        )
+        # Formato brasileiro: '.' separa milhares e ',' separa decimais
+        texto = pc.replace_substring(pc.replace_substring(tabela[coluna_valor], '.', ''), ',', '.')
+        try:
+            valores = pc.cast(texto, pa.float64()).to_pandas()
+        except pa.ArrowInvalid:
+            valores = pd.to_numeric(texto.to_pandas(), errors='coerce')
+        df = tabela.drop_columns([coluna_valor]).to_pandas()
+        df[coluna_valor] = valores.to_numpy()
+    else:
+        tipos = {coluna: 'category' for coluna in cabecalho if coluna != coluna_valor}
+        df = pd.read_csv(io.BytesIO(dados), sep=';', encoding='utf-8', skiprows=1, decimal=',', thousands='.', dtype=tipos)
+        df[coluna_valor] = pd.to_numeric(df[coluna_valor], errors='coerce')
+
+    df.rename(columns=mapa, inplace=True)
+    df['value'] = df['value'].astype('float32')
+
+    datas = _converter_categorias(df['date'], lambda c: pd.to_datetime(c, format='%d/%m/%Y', errors='coerce'))
+    horas = _converter_categorias(df['hour'], lambda c: pd.to_datetime(c, format='%H:%M:%S', errors='coerce') - pd.Timestamp('1900-01-01'))
+    df['timedate'] = datas + horas
+
+    if df['timedate'].isnull().all():
+        raise ValueError("Não foi possível converter as colunas 'Date' e 'Hour' para formato de data/hora. Verifique o formato dos dados nessas colunas.")
+
+    df.dropna(subset=['value', 'timedate'], inplace=True)
+    df = df.set_index('timedate').sort_index()
+    return df
+
+def _converter_categorias(serie, conversor):
+    """Aplica `conversor` só aos valores distintos de uma coluna e expande o resultado para todas as linhas."""
+    categorias = serie.astype('category').cat
+    convertidos = conversor(categorias.categories.astype(str))
+    return convertidos.take(categorias.codes.to_numpy(), allow_fill=True, fill_value=pd.NaT).to_numpy()
+
+def importar_sensores_horario(source, linhas_por_bloco=500_000):
+    """Lê o Sensores.csv em blocos e retorna apenas as médias horárias por aviário e canal.
+
+    Cada bloco é normalizado e reduzido a somas e contagens por (collector,
+    channel, hora). As somas parciais só são juntadas quando passam do
+    tamanho do total já acumulado, então cada hora é reagrupada poucas vezes e
+    o pico de memória acompanha o tamanho da saída horária, e não o número de
+    leituras. No fim, as somas e contagens dos coletores de um mesmo aviário
+    são juntadas e divididas uma única vez, de modo que a média (em float64)
+    é a de todas as leituras da hora, como na leitura completa. O resultado
+    tem as colunas de compactar_sensores (uma linha por aviário, canal e hora,
+    com a coluna extra 'leituras') e pode substituir a leitura completa no
+    SiloForecaster.
+    """
+    with etapa('importar_sensores_horario') as medida:
+        acumulado, parciais, linhas_parciais = None, [], 0
+        mapa = None
+        for bloco in pd.read_csv(source, sep=';', encoding='utf-8', skiprows=1, decimal=',', thousands='.',
+                                 dtype=str, chunksize=linhas_por_bloco):
+            if mapa is None:
+                mapa = _mapear_colunas(bloco.columns)
+            bloco.rename(columns=mapa, inplace=True)
+
+            datas = _converter_categorias(bloco['date'], lambda c: pd.to_datetime(c, format='%d/%m/%Y', errors='coerce'))
+            horas = _converter_categorias(bloco['hour'], lambda c: pd.to_datetime(c, format='%H:%M:%S', errors='coerce') - pd.Timestamp('1900-01-01'))
+            bloco = pd.DataFrame({
+                'collector': bloco['collector'].to_numpy(),
+                'channel': bloco['channel'].to_numpy(),
+                'timedate': pd.DatetimeIndex(datas + horas).floor('h'),
+                'value': pd.to_numeric(bloco['value'].str.replace('.', '', regex=False).str.replace(',', '.', regex=False), errors='coerce'),
+            }).dropna()
+
+            parcial = bloco.groupby(['collector', 'channel', 'timedate'], sort=False)['value'].agg(['sum', 'count'])
+            parciais.append(parcial)
+            linhas_parciais += len(parcial)
+            if linhas_parciais > max(0 if acumulado is None else len(acumulado), linhas_por_bloco):
+                acumulado = _somar_parciais(parciais if acumulado is None else [acumulado, *parciais])
+                parciais, linhas_parciais = [], 0
+
+        if parciais:
+            acumulado = _somar_parciais(parciais if acumulado is None else [acumulado, *parciais])
+        if acumulado is None or acumulado.empty:
+            raise ValueError("Não foi possível converter as colunas 'Date' e 'Hour' para formato de data/hora. Verifique o formato dos dados nessas colunas.")
+
+        somas = acumulado.reset_index()
+        somas['aviario_num'] = numero_aviario(somas['collector'])
+        # Coletores sem número de aviário são descartados, como em compactar_sensores
+        somas = somas.dropna(subset=['aviario_num']).groupby(['aviario_num', 'channel', 'timedate'], sort=False).agg(
+            collector=('collector', 'min'), soma=('sum', 'sum'), leituras=('count', 'sum')
+        ).reset_index(level=['aviario_num', 'channel'])
+        df = pd.DataFrame({
+            'collector': somas['collector'].astype('category'),
+            'channel': somas['channel'].astype('category'),
+            'value': somas['soma'] / somas['leituras'],
+            'leituras': somas['leituras'].astype('int32'),
+            'aviario_num': pd.to_numeric(somas['aviario_num'], downcast='integer'),
+        }).sort_index(kind='stable')
+        medida.linhas = len(df)
+    return df
+
+def _somar_parciais(parciais):
+    """Junta somas e contagens horárias parciais (índice collector, channel, timedate)."""
+    return pd.concat(parciais).groupby(level=[0, 1, 2], sort=False).sum()
+
+def numero_aviario(collector):
+    """Extrai o número do aviário do nome do coletor (NaN quando não há número).
+
+    A expressão regular é aplicada uma vez por nome distinto de coletor, e não
+    a cada leitura.
+    """
+    categorias = collector.astype('category').cat
+    numeros = pd.to_numeric(categorias.categories.astype(str).str.extract(r'(\d+)', expand=False), errors='coerce')
+    codigos = categorias.codes.to_numpy()
+    valores = np.asarray(numeros, dtype=float)
+    return pd.Series(np.where(codigos >= 0, valores[codigos], np.nan), index=collector.index, name='aviario_num')
+
+def compactar_sensores(df):
+    """DataFrame de sensores no esquema compacto, com o número do aviário.
+
+    Descarta as colunas de texto date e hour (já convertidas no índice
+    timedate), guarda collector e channel como categóricas e value em float32,
+    e acrescenta aviario_num no menor tipo inteiro que comporta os números,
+    calculado uma vez por coletor distinto. Leituras de coletores sem número
+    de aviário são descartadas.
+    """
+    df = df.drop(columns=[coluna for coluna in ('date', 'hour') if coluna in df.columns])
+    for coluna in ('collector', 'channel'):
+        if not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype('category')
+    df['value'] = df['value'].astype('float32')
+
+    aviarios = numero_aviario(df['collector'])
+    if aviarios.isna().any():
+        validos = aviarios.notna().to_numpy()
+        df, aviarios = df[validos], aviarios[validos]
+        df['collector'] = df['collector'].cat.remove_unused_categories()
+    df['aviario_num'] = pd.to_numeric(aviarios, downcast='integer')
+    return df
+
+def mesclar_sensores(historico, novas):
+    """Acrescenta ao histórico as leituras (esquema compacto) que ele ainda não tem.
+
+    Uma leitura é identificada por (timedate, collector, channel); repetidas
+    dentro de `novas` também são descartadas. Retorna o histórico atualizado
+    (ordenado no tempo) e apenas as leituras realmente novas.
+    """
+    def chaves(df):
+        return pd.MultiIndex.from_arrays([df.index, df['collector'].astype(str), df['channel'].astype(str)])
+
+    chaves_novas = chaves(novas)
+    inedita = ~chaves_novas.duplicated()
+    if historico is not None and not historico.empty:
+        inedita &= ~chaves_novas.isin(chaves(historico))
+    novas = novas[inedita]
+    if historico is None:
+        return novas.sort_index(kind='stable'), novas
+    if novas.empty:
+        return historico, novas
+    return compactar_sensores(pd.concat([historico, novas]).sort_index(kind='stable')), novas
+
+def memoria_mb(df):
+    """Memória ocupada pelo DataFrame (com o índice e o conteúdo das strings), em MB."""
+    return df.memory_usage(index=True, deep=True).sum() / 1024 ** 2
+
+# Colunas da configuração de lotes: nome padronizado -> aliases aceitos
+_COLUNAS_LOTES = {
+    'aviario': ('aviario', 'aviário', 'aviario_num'),
+    'data_alojamento': ('data_alojamento', 'alojamento', 'data de alojamento'),
+    'linhagem': ('linhagem',),
+    'n_aves': ('n_aves', 'aves', 'numero de aves', 'número de aves'),
+    'sobra_inicial_kg': ('sobra_inicial_kg', 'sobra', 'sobra inicial (kg)'),
+    'idade_diluicao_start': ('idade_diluicao_start', 'idade_diluicao', 'idade de diluição'),
+}
+_LINHAGENS = ('cobb', 'ross')
+
+def importar_lotes(source, formato=None):
+    """Carrega a configuração dos lotes (CSV ou JSON) no formato de `lotes` do SiloForecaster.run_batch.
+
+    Uma linha (ou objeto JSON) por aviário, com aviario, data_alojamento,
+    linhagem e n_aves e, opcionalmente, sobra_inicial_kg e idade_diluicao_start.
+    O JSON pode ser uma lista de objetos ou um objeto indexado pelo aviário.
+    Datas aceitas: AAAA-MM-DD ou DD/MM/AAAA. `source` é um caminho ou objeto de
+    arquivo; `formato` ('csv' ou 'json') é deduzido da extensão se omitido.
+    """
+    if formato is None:
+        formato = 'json' if str(source).lower().endswith('.json') else 'csv'
+    if formato == 'json':
+        dados = json.loads(_ler_bytes(source))
+        if isinstance(dados, dict):
+            dados = [{'aviario': aviario, **parametros} for aviario, parametros in dados.items()]
+        df = pd.DataFrame(dados)
+    else:
+        # Aceita ',' ou ';' (padrão do Excel em português) como separador
+        df = pd.read_csv(source, sep=None, engine='python', encoding='utf-8-sig', dtype=str)
+
+    aliases = {alias: padrao for padrao, nomes in _COLUNAS_LOTES.items() for alias in nomes}
+    df = df.rename(columns={coluna: aliases.get(str(coluna).strip().lower(), coluna) for coluna in df.columns})
+    faltantes = [coluna for coluna in ('aviario', 'data_alojamento', 'linhagem', 'n_aves') if coluna not in df.columns]
+    if faltantes:
+        raise KeyError(f"Colunas obrigatórias ausentes na configuração de lotes: {', '.join(faltantes)}.")
+
+    lotes = {}
+    for linha, registro in enumerate(df.to_dict('records'), start=1):
+        try:
+            aviario = int(registro['aviario'])
+            texto_data = str(registro['data_alojamento']).strip()
+            data_alojamento = pd.to_datetime(texto_data, format='%d/%m/%Y' if '/' in texto_data else '%Y-%m-%d').date()
+            linhagem = str(registro['linhagem']).strip().lower()
+            if linhagem not in _LINHAGENS:
+                raise ValueError(f"linhagem '{registro['linhagem']}' inválida (use {' ou '.join(_LINHAGENS)})")
+            parametros = dict(data_alojamento=data_alojamento, linhagem=linhagem, n_aves=int(float(registro['n_aves'])))
+            for coluna, conversor in (('sobra_inicial_kg', float), ('idade_diluicao_start', int)):
+                if pd.notna(registro.get(coluna)) and str(registro.get(coluna)).strip() != '':
+                    parametros[coluna] = conversor(float(str(registro[coluna]).replace(',', '.')))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Configuração de lotes inválida na linha {linha}: {e}") from e
+        if aviario in lotes:
+            raise ValueError(f"Configuração de lotes inválida na linha {linha}: aviário {aviario} repetido.")
+        lotes[aviario] = parametros
+    return lotes
+
 def importar_consumo(linhagem, folder_path):
     """Importa a tabela de consumo da linhagem."""
     path = os.path.join(folder_path, f'{linhagem}.xlsx')
     df = pd.read_excel(path)
     df.rename(columns={'dia de vida': 'idade', 'consumo': 'consumo_gr_ave_dia'}, inplace=True)
-    return df
\ No newline at end of file
+    return df
+
+def tabela_consumo_por_idade(df_consumo):
+    """Converte a tabela de consumo em um array denso indexado pela idade das aves.
+
+    A última posição do array guarda o consumo da última linha da tabela, usado
+    para qualquer idade fora da tabela (mesma regra da busca linha a linha).
+    """
+    idades = df_consumo['idade'].to_numpy(dtype=np.int64)
+    consumos = df_consumo['consumo_gr_ave_dia'].to_numpy(dtype=float)
+    validas = idades >= 0
+    tabela = np.full(int(idades[validas].max(initial=-1)) + 2, consumos[-1])
+    # Em idades repetidas prevalece a primeira ocorrência, como no iloc[0]
+    idades_unicas, primeira_ocorrencia = np.unique(idades[validas], return_index=True)
+    tabela[idades_unicas] = consumos[validas][primeira_ocorrencia]
+    tabela[-1] = consumos[-1]
+    return tabela
+
+def consultar_consumo(tabela, idades):
+    """Retorna o consumo da tabela (g/ave/dia) para uma ou mais idades."""
+    idades = np.asarray(idades, dtype=np.int64)
+    posicoes = np.where((idades >= 0) & (idades < len(tabela) - 1), idades, len(tabela) - 1)
+    return tabela[posicoes]
+
+class TabelaConsumo:
+    """Tabela de consumo de uma linhagem com consulta direta pela idade das aves."""
+
+    def __init__(self, df_consumo):
+        self.df_consumo = df_consumo
+        self.por_idade = tabela_consumo_por_idade(df_consumo)
+
+    def consumo(self, idades):
+        """Consumo da tabela (g/ave/dia) para uma ou mais idades."""
+        return consultar_consumo(self.por_idade, idades)
+
+# Tabelas já carregadas neste processo: caminho do Excel -> (mtime, TabelaConsumo)
+_tabelas_carregadas = {}
+_tabelas_lock = threading.Lock()
+
+def obter_tabela_consumo(linhagem, folder_path):
+    """Retorna a TabelaConsumo da linhagem, lendo o Excel uma única vez por processo.
+
+    O arquivo é relido se a sua data de modificação mudar.
+    """
+    path = os.path.join(folder_path, f'{linhagem}.xlsx')
+    mtime = os.path.getmtime(path)
+    with _tabelas_lock:
+        carregada = _tabelas_carregadas.get(path)
+        if carregada is None or carregada[0] != mtime:
+            carregada = (mtime, TabelaConsumo(importar_consumo(linhagem, folder_path)))
+            _tabelas_carregadas[path] = carregada
+    return carregada[1]
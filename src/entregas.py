@@ -0,0 +1,85 @@
+import pandas as pd
+import numpy as np
+
+# Limiar usado pelo relatório (e para aviários sem limiar próprio)
+LIMIAR_PADRAO_KG = 500
+# Colunas da tabela de entregas da granja (uma linha por entrega)
+COLUNAS_ENTREGAS = ['aviario_num', 'data_entrega', 'quantidade_kg', 'horas', 'inicio', 'fim']
+
+def limiar_por_capacidade(capacidade_kg, fracao=0.05, minimo_kg=LIMIAR_PADRAO_KG):
+    """Limiar de detecção proporcional à capacidade dos silos de cada aviário (nunca abaixo de `minimo_kg`).
+
+    `capacidade_kg` é um número ou um mapeamento aviário -> capacidade somada
+    dos silos; o resultado pode ser passado como `limiar_kg` de detectar_entregas.
+    """
+    if np.isscalar(capacidade_kg):
+        return max(capacidade_kg * fracao, minimo_kg)
+    return (pd.Series(capacidade_kg, dtype=float) * fracao).clip(lower=minimo_kg)
+
+def detectar_entregas(peso, limiar_kg=LIMIAR_PADRAO_KG, intervalo_max=pd.Timedelta(hours=1)):
+    """Detecta as entregas de ração de todos os aviários em uma única passada.
+
+    `peso` é o peso horário do silo indexado por (aviario_num, timedate) (ou só
+    por timedate, para um aviário). Uma hora é de entrega quando o peso sobe
+    mais que `limiar_kg` (um valor único ou um mapeamento por aviário) em
+    relação à hora anterior do mesmo aviário; horas de entrega separadas por
+    até `intervalo_max` formam uma só entrega. Retorna uma linha por entrega
+    (colunas COLUNAS_ENTREGAS), sem alterar `peso`. Como no relatório, a data
+    da entrega é a hora de menor subida do grupo e a quantidade é a soma das
+    subidas.
+    """
+    if isinstance(peso.index, pd.MultiIndex):
+        aviarios = peso.index.get_level_values(0).to_numpy()
+        tempos = pd.DatetimeIndex(peso.index.get_level_values(1))
+    else:
+        aviarios = np.zeros(len(peso), dtype=int)
+        tempos = pd.DatetimeIndex(peso.index)
+    valores = peso.to_numpy(dtype=float)
+
+    # Diferença para a hora anterior, sem atravessar de um aviário para outro
+    mudanca = np.full(len(valores), np.nan)
+    mudanca[1:] = valores[1:] - valores[:-1]
+    inicio_aviario = np.ones(len(valores), dtype=bool)
+    inicio_aviario[1:] = aviarios[1:] != aviarios[:-1]
+    mudanca[inicio_aviario] = np.nan
+
+    if np.isscalar(limiar_kg):
+        limiares = limiar_kg
+    else:
+        limiares = pd.Series(limiar_kg, dtype=float).reindex(aviarios).fillna(LIMIAR_PADRAO_KG).to_numpy()
+    posicoes = np.flatnonzero(mudanca > limiares)
+    if len(posicoes) == 0:
+        return pd.DataFrame(columns=COLUNAS_ENTREGAS)
+
+    # Um grupo novo começa a cada troca de aviário ou intervalo maior que intervalo_max
+    tempos_entrega = tempos[posicoes]
+    aviarios_entrega = aviarios[posicoes]
+    novo_grupo = np.ones(len(posicoes), dtype=bool)
+    novo_grupo[1:] = ((aviarios_entrega[1:] != aviarios_entrega[:-1])
+                      | (np.diff(tempos_entrega.to_numpy()) > pd.Timedelta(intervalo_max).to_timedelta64()))
+    horas = pd.DataFrame({
+        'grupo': np.cumsum(novo_grupo),
+        'aviario_num': aviarios_entrega,
+        'hora': tempos_entrega,
+        'mudanca_peso': mudanca[posicoes],
+    })
+    horas.index = horas['hora']
+    entregas = horas.groupby('grupo').agg(
+        aviario_num=('aviario_num', 'first'),
+        data_entrega=('mudanca_peso', 'idxmin'),
+        quantidade_kg=('mudanca_peso', 'sum'),
+        horas=('mudanca_peso', 'size'),
+        inicio=('hora', 'first'),
+        fim=('hora', 'last'),
+    )
+    return entregas.reset_index(drop=True)[COLUNAS_ENTREGAS]
+
+def entregas_do_aviario(entregas, aviario=None):
+    """Entregas de um aviário no formato do relatório (índice 'Data da Entrega', coluna quantidade_kg)."""
+    if aviario is not None:
+        entregas = entregas[entregas['aviario_num'] == aviario]
+    if entregas.empty:
+        return pd.DataFrame(columns=['Quantidade (kg)'], index=pd.Index([], name='Data da Entrega'))
+    tabela = entregas.set_index('data_entrega')[['quantidade_kg']]
+    tabela.index.name = 'Data da Entrega'
+    return tabela
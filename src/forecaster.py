@@ -1,89 +1,715 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from dataclasses import dataclass, replace
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import io
 import os
 
 # Importa as funções dos outros módulos
-from .data_handler import importar_consumo
+from .data_handler import obter_tabela_consumo
+from .metricas import etapa
+from .amostragem import agregar_resolucoes, reduzir_serie
+from .entregas import LIMIAR_PADRAO_KG, detectar_entregas, entregas_do_aviario
+from .cache import impressao_digital
+from .graficos import pyplot
+from .backtest import backtest_aviario, resumir_backtest
+from .planejamento import carga_tipica, planejar_entregas
+
+@dataclass
+class CenariosPrevisao:
+    """Projeção por cenários (Monte Carlo): esgotamento e faixas de peso em cada quantil."""
+    n_cenarios: int
+    quantis: tuple
+    fatores_consumo: np.ndarray
+    horas_esgotamento: np.ndarray # Horas até o esgotamento em cada cenário (inf quando não esgota no horizonte)
+    datas_esgotamento: dict # quantil -> data de esgotamento (None quando além do horizonte)
+    bandas: pd.DataFrame # Peso projetado em cada quantil, uma coluna por quantil (p10, p50, ...)
+
+    @property
+    def fracao_esgotada(self):
+        """Fração dos cenários em que o silo esvazia dentro do horizonte projetado."""
+        return float(np.isfinite(self.horas_esgotamento).mean())
+
+    @property
+    def janela_esgotamento(self):
+        """(mais cedo, mais tarde): datas de esgotamento no menor e no maior quantil."""
+        return self.datas_esgotamento[self.quantis[0]], self.datas_esgotamento[self.quantis[-1]]
+
+    def resumo(self):
+        """Datas de esgotamento por quantil, como colunas extras da tabela de run_batch."""
+        return {f'esgotamento_p{quantil * 100:.0f}': data for quantil, data in self.datas_esgotamento.items()}
+
+@dataclass
+class ResultadoPrevisao:
+    """Resultado numérico de uma previsão de autonomia (sem relatório nem gráfico)."""
+    aviario: int
+    linhagem: str
+    n_aves: int
+    data_alojamento: date
+    peso_atual_kg: float
+    idade_atual: int
+    fator_consumo: float
+    ultima_leitura: pd.Timestamp
+    data_esgotamento: pd.Timestamp
+    idade_esgotamento: int
+    df_entregas: pd.DataFrame
+    forecast_series: pd.Series
+    cenarios: CenariosPrevisao = None
+
+    @property
+    def autonomia(self):
+        """Tempo entre a última leitura e o esgotamento projetado."""
+        return self.data_esgotamento - self.ultima_leitura if self.data_esgotamento else timedelta(days=0)
+
+    @property
+    def autonomia_dias_horas(self):
+        """Autonomia como (dias, horas), no formato do relatório."""
+        return self.autonomia.days, self.autonomia.seconds // 3600
+
+    @property
+    def total_entregue_kg(self):
+        """Soma das entregas de ração detectadas no histórico."""
+        return self.df_entregas['quantidade_kg'].sum() if not self.df_entregas.empty else 0.0
+
+    def resumo(self):
+        """Métricas principais no formato de uma linha da tabela de run_batch."""
+        return {
+            'peso_atual_kg': self.peso_atual_kg,
+            'idade_atual': self.idade_atual,
+            'fator_consumo': self.fator_consumo,
+            'autonomia_horas': self.autonomia / pd.Timedelta(hours=1),
+            'data_esgotamento': self.data_esgotamento,
+            'idade_esgotamento': self.idade_esgotamento,
+        }
 
 class SiloForecaster:
-    def __init__(self, df_sensores, linhagem_folder, reports_folder, idade_diluicao_start=19, sobra_inicial_kg=0.0):
+    # Colunas da tabela retornada por run_batch
+    COLUNAS_RESULTADO = [
+        'aviario_num', 'peso_atual_kg', 'idade_atual', 'fator_consumo', 'autonomia_horas',
+        'data_esgotamento', 'idade_esgotamento', 'erro'
+    ]
+    # Acima disto, o histórico e a projeção são reduzidos com LTTB antes de desenhar o gráfico
+    MAX_PONTOS_GRAFICO = 500
+    # Estado de uma previsão calculada que depende só da entrada: é o que o cache de resultados guarda.
+    # Os cenários ficam em uma entrada própria, que depende também do número de cenários, dos quantis e da semente,
+    # e cada PNG do gráfico em outra, por DPI (ver grafico_png)
+    _ESTADO_PREVISAO = (
+        'aviario_selecionado', 'data_alojamento', 'linhagem', 'n_aves', 'idade_diluicao_start', 'sobra_inicial_kg',
+        '_medias_canais', '_peso_bruto', 'df_hourly', 'fator_consumo', 'forecast_series', 'df_entregas', 'resultado',
+    )
+
+    def __init__(self, df_sensores, linhagem_folder, reports_folder, idade_diluicao_start=19, sobra_inicial_kg=0.0,
+                 tabelas_consumo=None, armazem=None, dias_historico=15, limiar_entrega_kg=LIMIAR_PADRAO_KG,
+                 cache_resultados=None):
         self.df_sensores = df_sensores
+        # Histórico persistente (ArmazemSensores), usado quando df_sensores não é informado: cada previsão
+        # lê só as leituras do(s) aviário(s) nos últimos `dias_historico` dias, como na exportação do eProdutor
+        self.armazem = armazem
+        self.dias_historico = dias_historico
         self.linhagem_folder = linhagem_folder
         self.reports_folder = reports_folder
+        # Tabelas de consumo já carregadas (linhagem -> TabelaConsumo); as ausentes vêm do registro do data_handler
+        self.tabelas_consumo = tabelas_consumo or {}
         self.idade_diluicao_start = idade_diluicao_start
         self.sobra_inicial_kg = sobra_inicial_kg
+        # Subida mínima de peso (kg/hora) tratada como entrega: um valor ou aviário -> limiar (ver entregas.limiar_por_capacidade)
+        self.limiar_entrega_kg = limiar_entrega_kg
+        # Cache de previsões já calculadas (cache.CacheResultados), por impressão digital das médias horárias
+        # do aviário e dos parâmetros do lote; compartilhado com as previsões criadas pelo run_batch
+        self.cache_resultados = cache_resultados
+        self._chave_cache = None
         
         # Atributos que serão preenchidos durante a execução
         self.df_hourly = None
         self.df_consumo = None
+        self.tabela_consumo = None
         self.forecast_series = None
         self.report_string = None
         self.plot_fig = None
+        self.plot_png = None
+        self.plot_png_dpi = None
+        self.fator_consumo = None
+        self.df_entregas = None
+        self.resultado = None
+        self.cenarios = None
+        self._semente_cenarios = None
+        self._agregados = None
+        # Entregas de todos os aviários do último run_batch (ver entregas.detectar_entregas)
+        self.entregas_granja = None
+
+        # Estado usado pela atualização incremental (ver atualizar)
+        self._leituras = None
+        self._medias_canais = None
+        self._peso_bruto = None
 
     def run_forecast(self, aviario_selecionado, data_alojamento, linhagem, n_aves, idade_diluicao_start, sobra_inicial_kg):
         """Executa o pipeline completo de previsão com os dados fornecidos pelo Streamlit."""
         try:
-            self.aviario_selecionado = aviario_selecionado
-            self.data_alojamento = data_alojamento
-            self.linhagem = linhagem
-            self.n_aves = n_aves
-            self.idade_diluicao_start = idade_diluicao_start
-            self.sobra_inicial_kg = sobra_inicial_kg
-
-            # Filtrar dados do aviário selecionado
-            df_filtrado = self.df_sensores[self.df_sensores['aviario_num'] == self.aviario_selecionado].copy()
-            if df_filtrado.empty:
-                raise ValueError(f"Nenhum dado encontrado para o aviário {self.aviario_selecionado}.")
-
-            self.df_consumo = importar_consumo(self.linhagem, self.linhagem_folder)
-
-            # Preparar dados
-            df_filtrado['idade'] = (df_filtrado.index.normalize() - pd.Timestamp(self.data_alojamento)).days + 1
-            
-            df_hourly = pd.DataFrame()
-            resampled = df_filtrado.groupby('channel')['value'].resample('h').mean()
-            df_hourly['peso_silo'] = resampled.unstack(level='channel').sum(axis=1)
-            
-            # Filtro para remover ruído de quedas abruptas para zero
-            # Substitui 0 por NaN para interpolação
-            df_hourly['peso_silo'].replace(0, np.nan, inplace=True)
-            # Interpola os valores NaN, preenchendo no máximo 3 horas consecutivas
-            df_hourly['peso_silo'].interpolate(method='linear', limit_direction='forward', limit=3, inplace=True)
-
-            df_hourly.dropna(inplace=True)
-            
-            # Adicionar a coluna 'idade' ao df_hourly
-            df_hourly['idade'] = (df_hourly.index.normalize() - pd.Timestamp(self.data_alojamento)).days + 1
-
-            self.df_hourly = df_hourly
-
-            # Calcular autonomia
-            self._project_autonomy()
-
-            # Gerar relatório e gráfico
-            report_string, plot_fig, df_entregas = self._generate_report_and_plot()
-            self.df_entregas = df_entregas # Store it for potential future use or direct access
-            
-            self.report_string = report_string
-            self.plot_fig = plot_fig
-            
-            return report_string, plot_fig, df_entregas
+            with etapa('run_forecast'):
+                self.calcular_previsao(aviario_selecionado, data_alojamento, linhagem, n_aves, idade_diluicao_start, sobra_inicial_kg)
+                return self._gerar_saidas()
 
         except Exception as e:
             # Em um app Streamlit, é melhor retornar a exceção para ser exibida pelo st.error
             raise e
 
+    def calcular_previsao(self, aviario_selecionado, data_alojamento, linhagem, n_aves, idade_diluicao_start, sobra_inicial_kg,
+                          medias_canais=None):
+        """Calcula a previsão sem montar relatório nem gráfico e retorna o ResultadoPrevisao.
+
+        O relatório e o gráfico podem ser gerados depois, sob demanda, com
+        relatorio() e grafico(). Com `medias_canais` (de medias_horarias(),
+        guardadas por quem chama), as leituras não são filtradas nem agregadas
+        de novo; nesse caso a previsão não pode ser atualizada com atualizar().
+        """
+        with etapa('calcular_previsao'):
+            if medias_canais is None:
+                df_filtrado = self._leituras_aviario(aviario_selecionado)
+                with etapa('medias_horarias', linhas=len(df_filtrado)):
+                    medias_canais = self._agregar_medias_horarias(df_filtrado)
+                self._leituras = df_filtrado
+            tabela_consumo = self._tabela_consumo(linhagem)
+
+            self._executar_previsao(
+                medias_canais, tabela_consumo, aviario_selecionado, data_alojamento, linhagem, n_aves,
+                idade_diluicao_start, sobra_inicial_kg, gerar_relatorio=False
+            )
+        return self.resultado
+
+    def medias_horarias(self, aviario):
+        """Médias horárias por canal (silo) das leituras de um aviário, como usadas na previsão."""
+        df_filtrado = self._leituras_aviario(aviario)
+        with etapa('medias_horarias', linhas=len(df_filtrado)):
+            return self._agregar_medias_horarias(df_filtrado)
+
+    def _leituras_aviario(self, aviario):
+        with etapa('filtrar_aviario'):
+            df_filtrado = self._leituras_aviarios([aviario])
+        if df_filtrado.empty:
+            raise ValueError(f"Nenhum dado encontrado para o aviário {aviario}.")
+        return df_filtrado
+
+    def run_batch(self, lotes, gerar_relatorios=True, workers=None, n_cenarios=0, seed=None):
+        """Executa a previsão de vários aviários com uma única passada sobre df_sensores.
+
+        `lotes` mapeia o número do aviário para os parâmetros do lote
+        (data_alojamento, linhagem, n_aves e, opcionalmente, idade_diluicao_start
+        e sobra_inicial_kg). Retorna a tabela de resultados (uma linha por aviário,
+        com a coluna 'erro' preenchida quando a previsão falha) e o dicionário de
+        SiloForecaster já executados, usado pelo relatório PDF. As entregas de
+        todos os aviários ficam em entregas_granja.
+
+        Com `workers` > 1 os aviários são distribuídos em um ProcessPoolExecutor;
+        cada processo recebe apenas as médias horárias do seu aviário e devolve o
+        gráfico já convertido em PNG (plot_png) no lugar de plot_fig.
+
+        Com `n_cenarios` > 0, cada aviário também passa por simular_cenarios
+        (semente derivada de `seed` e do número do aviário) e a tabela ganha as
+        colunas esgotamento_p10, esgotamento_p50 e esgotamento_p90.
+
+        Com cache_resultados, aviários cuja entrada (médias horárias e lote) já
+        foi calculada são restaurados do cache; os demais são guardados nele.
+        """
+        with etapa('run_batch', linhas=len(lotes)):
+            return self._run_batch(lotes, gerar_relatorios, workers, n_cenarios, seed)
+
+    def _run_batch(self, lotes, gerar_relatorios, workers, n_cenarios, seed):
+        df_lotes = self._leituras_aviarios(list(lotes))
+        medias_horarias = {}
+        # Sem leituras de nenhum dos aviários, cada um recebe o erro de aviário sem dados abaixo
+        if not df_lotes.empty:
+            with etapa('medias_horarias', linhas=len(df_lotes)):
+                medias_por_aviario = self._agregar_medias_horarias(df_lotes, por_aviario=True)
+            medias_horarias = {
+                aviario: medias.droplevel('aviario_num').dropna(axis=1, how='all')
+                for aviario, medias in medias_por_aviario.groupby(level='aviario_num')
+            }
+
+        tarefas, previsoes, erros = {}, {}, {}
+        for aviario, parametros in sorted(lotes.items()):
+            try:
+                if aviario not in medias_horarias:
+                    raise ValueError(f"Nenhum dado encontrado para o aviário {aviario}.")
+
+                linhagem = parametros['linhagem']
+                tarefas[aviario] = (
+                    medias_horarias[aviario], self._tabela_consumo(linhagem), aviario,
+                    parametros['data_alojamento'], linhagem, parametros['n_aves'],
+                    parametros.get('idade_diluicao_start', self.idade_diluicao_start),
+                    parametros.get('sobra_inicial_kg', self.sobra_inicial_kg)
+                )
+            except Exception as e:
+                erros[aviario] = e
+
+        # Previsões já calculadas para a mesma entrada saem do cache de resultados
+        novas, em_cache = {}, set()
+        for aviario, argumentos in tarefas.items():
+            novas[aviario] = self._nova_previsao()
+            if novas[aviario]._restaurar_do_cache(argumentos):
+                previsoes[aviario] = novas.pop(aviario)
+                em_cache.add(aviario)
+        tarefas = {aviario: argumentos for aviario, argumentos in tarefas.items() if aviario not in em_cache}
+
+        if workers and workers > 1:
+            # Etapas executadas nos outros processos não entram nas métricas; só o tempo total
+            with etapa('previsoes_paralelas', linhas=len(tarefas)), ProcessPoolExecutor(max_workers=workers) as executor:
+                futuros = {
+                    aviario: executor.submit(
+                        _prever_aviario_isolado, self.linhagem_folder, self.reports_folder, argumentos, gerar_relatorios,
+                        self.limiar_entrega_kg, n_cenarios, _semente_aviario(seed, aviario)
+                    )
+                    for aviario, argumentos in tarefas.items()
+                }
+                for aviario, futuro in futuros.items():
+                    try:
+                        previsao = futuro.result()
+                    except Exception as e:
+                        erros[aviario] = e
+                        continue
+                    previsao.cache_resultados = self.cache_resultados
+                    previsao._chave_cache = novas[aviario]._chave_cache
+                    previsao._guardar_no_cache()
+                    previsoes[aviario] = previsao
+            self.entregas_granja = self._detectar_entregas_granja(previsoes)
+        else:
+            for aviario, argumentos in tarefas.items():
+                try:
+                    previsao = novas[aviario]
+                    previsao._executar_previsao(*argumentos, detectar=False, usar_cache=False)
+                    previsoes[aviario] = previsao
+                except Exception as e:
+                    erros[aviario] = e
+
+            # Entregas de todos os aviários em uma única passada sobre o peso horário da granja
+            with etapa('detectar_entregas', linhas=sum(len(previsao.df_hourly) for previsao in previsoes.values())):
+                self.entregas_granja = self._detectar_entregas_granja(previsoes)
+            for aviario, previsao in previsoes.items():
+                if aviario in em_cache:
+                    continue
+                previsao.df_entregas = entregas_do_aviario(self.entregas_granja, aviario)
+                previsao._atualizar_resultado()
+                if n_cenarios:
+                    previsao.simular_cenarios(n_cenarios, seed=_semente_aviario(seed, aviario))
+                if gerar_relatorios:
+                    previsao._gerar_saidas()
+
+        for aviario in em_cache:
+            previsao = previsoes[aviario]
+            if n_cenarios:
+                # A previsão restaurada não traz cenários; simular_cenarios consulta a entrada deles no cache
+                previsao.simular_cenarios(n_cenarios, seed=_semente_aviario(seed, aviario))
+            if gerar_relatorios:
+                previsao._gerar_saidas()
+
+        colunas = list(self.COLUNAS_RESULTADO)
+        resultados = []
+        for aviario in sorted(lotes):
+            resultado = {'aviario_num': aviario}
+            if aviario in previsoes:
+                resultado.update(previsoes[aviario].resultado.resumo())
+                cenarios = previsoes[aviario].resultado.cenarios
+                if n_cenarios and cenarios is not None:
+                    resultado.update(cenarios.resumo())
+                    colunas[-1:-1] = [coluna for coluna in cenarios.resumo() if coluna not in colunas]
+            else:
+                resultado['erro'] = str(erros[aviario])
+            resultados.append(resultado)
+
+        df_resultados = pd.DataFrame(resultados, columns=colunas).set_index('aviario_num')
+        return df_resultados, dict(sorted(previsoes.items()))
+
+    def backtest(self, lotes, previsoes=None, peso_vazio_kg=100.0, horizontes=(24, 72)):
+        """Backtest da previsão em cada hora do histórico dos aviários de `lotes` (ver backtest.backtest_aviario).
+
+        Usa o histórico horário das previsões de run_batch (ou as de
+        `previsoes`, se já calculadas). Retorna a tabela de cortes indexada por
+        (aviario_num, timedate), com a linhagem de cada aviário, e o resumo dos
+        erros por aviário e linhagem (backtest.resumir_backtest).
+        """
+        if previsoes is None:
+            _, previsoes = self.run_batch(lotes, gerar_relatorios=False)
+
+        with etapa('backtest', linhas=len(previsoes)):
+            partes = {}
+            for aviario, previsao in previsoes.items():
+                if aviario not in lotes:
+                    continue
+                partes[aviario] = backtest_aviario(
+                    previsao.df_hourly, previsao.tabela_consumo, previsao.n_aves, previsao.data_alojamento,
+                    previsao.idade_diluicao_start, previsao.sobra_inicial_kg, self._limiar_entrega(aviario),
+                    peso_vazio_kg, horizontes,
+                )
+                partes[aviario].insert(0, 'linhagem', previsao.linhagem)
+            if not partes:
+                raise ValueError("Nenhum aviário com previsão para o backtest.")
+            df_backtest = pd.concat(partes, names=['aviario_num', 'timedate'])
+        return df_backtest, resumir_backtest(df_backtest)
+
+    def planejar_entregas(self, previsoes, capacidade_kg=None, carga_kg=None, margem_kg=None, caminhoes=1,
+                          duracao_viagem_h=4, horizonte_h=7 * 24):
+        """Programação de entregas dos aviários de `previsoes` (ver planejamento.planejar_entregas).
+
+        Sem `capacidade_kg`, usa o maior peso horário observado de cada aviário;
+        sem `carga_kg`, o tamanho típico das entregas detectadas na granja
+        (planejamento.carga_tipica sobre entregas_granja).
+        """
+        if capacidade_kg is None:
+            capacidade_kg = {aviario: float(previsao.df_hourly['peso_silo'].max())
+                             for aviario, previsao in previsoes.items()}
+        if carga_kg is None:
+            entregas = self.entregas_granja
+            if entregas is None:
+                entregas = self._detectar_entregas_granja(previsoes)
+            carga_kg = carga_tipica(entregas, previsoes)
+        projecoes = {aviario: previsao.projecao_horizonte() for aviario, previsao in previsoes.items()}
+        return planejar_entregas(projecoes, capacidade_kg, carga_kg, margem_kg, caminhoes, duracao_viagem_h,
+                                 horizonte_h=horizonte_h)
+
+    def _nova_previsao(self):
+        """SiloForecaster de um aviário do run_batch, com as configurações (e o cache) deste."""
+        return SiloForecaster(self.df_sensores, self.linhagem_folder, self.reports_folder,
+                              tabelas_consumo=self.tabelas_consumo, limiar_entrega_kg=self.limiar_entrega_kg,
+                              cache_resultados=self.cache_resultados)
+
+    def _detectar_entregas_granja(self, previsoes):
+        """Tabela de entregas da granja (entregas.COLUNAS_ENTREGAS) a partir do peso horário de cada previsão."""
+        if not previsoes:
+            return detectar_entregas(pd.Series([], dtype=float))
+        peso = pd.concat({aviario: previsao.df_hourly['peso_silo'] for aviario, previsao in previsoes.items()},
+                         names=['aviario_num', 'timedate'])
+        return detectar_entregas(peso, self.limiar_entrega_kg)
+
+    def _leituras_aviarios(self, aviarios):
+        """Leituras dos aviários: filtradas de df_sensores ou consultadas no armazém pelo índice."""
+        if self.df_sensores is not None or self.armazem is None:
+            return self.df_sensores[self.df_sensores['aviario_num'].isin(aviarios)]
+
+        ultima = self.armazem.ultima_leitura(aviarios)
+        if ultima is None:
+            return self.armazem.consultar(aviarios)
+        return self.armazem.consultar(aviarios, inicio=ultima - timedelta(days=self.dias_historico))
+
+    @staticmethod
+    def _agregar_medias_horarias(df_sensores, por_aviario=False):
+        """Médias horárias de cada canal (silo), uma coluna por canal.
+
+        Com `por_aviario=True` agrega todos os aviários de uma vez e retorna um
+        DataFrame indexado por (aviario_num, timedate).
+        """
+        chaves = ['aviario_num', 'channel'] if por_aviario else ['channel']
+        resampled = df_sensores.groupby(chaves, observed=True)['value'].resample('h').mean()
+        return resampled.unstack(level='channel')
+
+    def _tabela_consumo(self, linhagem):
+        """TabelaConsumo da linhagem: a injetada no construtor ou a do registro do processo."""
+        if linhagem in self.tabelas_consumo:
+            return self.tabelas_consumo[linhagem]
+        return obter_tabela_consumo(linhagem, self.linhagem_folder)
+
+    def _executar_previsao(self, medias_canais, tabela_consumo, aviario_selecionado, data_alojamento, linhagem, n_aves,
+                           idade_diluicao_start, sobra_inicial_kg, gerar_relatorio=True, detectar=True, usar_cache=True):
+        """Projeta a autonomia a partir das médias horárias por canal de um aviário.
+
+        Com `detectar=False` a detecção de entregas fica para quem chamou (o
+        run_batch detecta as de todos os aviários de uma vez). Com um cache de
+        resultados, uma previsão já calculada para a mesma entrada é restaurada
+        em vez de recalculada (`usar_cache=False` quando quem chamou já consultou
+        o cache com _restaurar_do_cache).
+        """
+        argumentos = (medias_canais, tabela_consumo, aviario_selecionado, data_alojamento, linhagem, n_aves,
+                      idade_diluicao_start, sobra_inicial_kg)
+        if usar_cache and self._restaurar_do_cache(argumentos):
+            return self._gerar_saidas() if gerar_relatorio else None
+
+        self.aviario_selecionado = aviario_selecionado
+        self.data_alojamento = data_alojamento
+        self.linhagem = linhagem
+        self.n_aves = n_aves
+        self.idade_diluicao_start = idade_diluicao_start
+        self.sobra_inicial_kg = sobra_inicial_kg
+        self.tabela_consumo = tabela_consumo
+        self.df_consumo = tabela_consumo.df_consumo
+
+        self._medias_canais = medias_canais
+        self._peso_bruto = medias_canais.sum(axis=1)
+        with etapa('preparar_horario', linhas=len(self._peso_bruto)):
+            self.df_hourly = self._preparar_horario(self._peso_bruto)
+
+        # Calcular autonomia
+        with etapa('projetar_autonomia', linhas=len(self.df_hourly)):
+            self._project_autonomy()
+        if not detectar:
+            return None
+        with etapa('detectar_entregas', linhas=len(self.df_hourly)):
+            self.df_entregas = self._detectar_entregas(self.df_hourly)
+        self._atualizar_resultado()
+
+        if not gerar_relatorio:
+            return None
+
+        return self._gerar_saidas()
+
+    def _chave_previsao(self, argumentos):
+        """Chave do cache de resultados para os argumentos de _executar_previsao (None sem cache)."""
+        if self.cache_resultados is None:
+            return None
+        medias_canais, tabela_consumo, aviario, *parametros = argumentos
+        # O conteúdo da tabela entra na chave: editar o Excel da linhagem invalida as previsões feitas com ela
+        return impressao_digital(medias_canais, tabela_consumo.df_consumo, aviario, *parametros,
+                                 self._limiar_entrega(aviario))
+
+    def _chave_cenarios(self, n_cenarios, quantis, seed):
+        """Chave do cache para os cenários da previsão atual (None sem cache ou sem semente reproduzível)."""
+        if self._chave_cache is None or not _semente_reproduzivel(seed):
+            return None
+        return impressao_digital(self._chave_cache, 'cenarios', n_cenarios, tuple(quantis), seed)
+
+    def _chave_grafico(self, dpi):
+        """Chave do cache para o PNG do gráfico atual (com as faixas dos cenários, se houver), ou None."""
+        if self.cenarios is None:
+            chave = self._chave_cache
+        else:
+            chave = self._chave_cenarios(self.cenarios.n_cenarios, self.cenarios.quantis, self._semente_cenarios)
+        return None if chave is None else impressao_digital(chave, 'grafico', dpi)
+
+    def _restaurar_do_cache(self, argumentos):
+        """Restaura a previsão guardada para estes argumentos; retorna False se não houver."""
+        self._chave_cache = self._chave_previsao(argumentos)
+        if self._chave_cache is None:
+            return False
+        estado = self.cache_resultados.obter(self._chave_cache)
+        if estado is None:
+            return False
+
+        for atributo, valor in estado.items():
+            setattr(self, atributo, valor)
+        self.cenarios = None
+        self._semente_cenarios = None
+        self.tabela_consumo = argumentos[1]
+        self.df_consumo = self.tabela_consumo.df_consumo
+        self.report_string = None
+        self.plot_fig = None
+        self.plot_png = None
+        self.plot_png_dpi = None
+        self._agregados = None
+        return True
+
+    def _guardar_no_cache(self, base=True):
+        """Guarda a previsão atual (`base`) e, se houver, os cenários no cache de resultados.
+
+        A entrada da previsão fica sempre sem cenários.
+        """
+        if self._chave_cache is None:
+            return
+        if base:
+            estado = {atributo: getattr(self, atributo) for atributo in self._ESTADO_PREVISAO}
+            if self.cenarios is not None:
+                estado['resultado'] = replace(self.resultado, cenarios=None)
+            self.cache_resultados.guardar(self._chave_cache, estado)
+        if self.cenarios is not None:
+            chave_cenarios = self._chave_cenarios(self.cenarios.n_cenarios, self.cenarios.quantis, self._semente_cenarios)
+            if chave_cenarios is not None:
+                self.cache_resultados.guardar(chave_cenarios, self.cenarios)
+
+    def _preparar_horario(self, peso_bruto):
+        """Monta o df_hourly (peso do silo filtrado e idade do lote) a partir do peso horário somado."""
+        df_hourly = pd.DataFrame()
+        df_hourly['peso_silo'] = peso_bruto
+        
+        # Filtro para remover ruído de quedas abruptas para zero
+        # Substitui 0 por NaN para interpolação
+        df_hourly['peso_silo'] = df_hourly['peso_silo'].replace(0, np.nan)
+        # Interpola os valores NaN, preenchendo no máximo 3 horas consecutivas
+        df_hourly['peso_silo'] = df_hourly['peso_silo'].interpolate(method='linear', limit_direction='forward', limit=3)
+
+        df_hourly.dropna(inplace=True)
+        
+        # Adicionar a coluna 'idade' ao df_hourly
+        df_hourly['idade'] = (df_hourly.index.normalize() - pd.Timestamp(self.data_alojamento)).days + 1
+        return df_hourly
+
+    def _gerar_saidas(self):
+        """Gera (ou reaproveita) relatório e gráfico, no formato de retorno do run_forecast."""
+        return self.relatorio(), self.grafico(), self.df_entregas
+
+    def _atualizar_resultado(self):
+        """Monta o ResultadoPrevisao da projeção atual e descarta relatório e gráfico anteriores."""
+        zero_time = self.forecast_series.index[-1] if not self.forecast_series.empty else None
+        self.resultado = ResultadoPrevisao(
+            aviario=self.aviario_selecionado,
+            linhagem=self.linhagem,
+            n_aves=self.n_aves,
+            data_alojamento=self.data_alojamento,
+            peso_atual_kg=self.df_hourly['peso_silo'].iloc[-1],
+            idade_atual=self.df_hourly['idade'].iloc[-1],
+            fator_consumo=self.fator_consumo,
+            ultima_leitura=self.df_hourly.index[-1],
+            data_esgotamento=zero_time,
+            idade_esgotamento=(zero_time.normalize().date() - self.data_alojamento).days + 1 if zero_time else None,
+            df_entregas=self.df_entregas,
+            forecast_series=self.forecast_series,
+        )
+        self.report_string = None
+        self.plot_fig = None
+        self.plot_png = None
+        self.cenarios = None
+        self._semente_cenarios = None
+        self._agregados = None
+        self._guardar_no_cache()
+
+    def agregados(self, resolucao='horaria'):
+        """Histórico na resolução pedida ('horaria', '6 horas' ou 'diaria'; ver amostragem.RESOLUCOES).
+
+        Os agregados são calculados uma vez por previsão e refeitos quando ela muda.
+        """
+        if self._agregados is None:
+            with etapa('agregados', linhas=len(self.df_hourly)):
+                self._agregados = agregar_resolucoes(self.df_hourly)
+        return self._agregados[resolucao]
+
+    def atualizar(self, novas_leituras, gerar_relatorio=True):
+        """Incorpora novas leituras de sensor a uma previsão já feita com run_forecast.
+
+        Só as horas a partir da primeira leitura nova são reagregadas; a
+        filtragem, o consumo horário e as entregas são refeitos apenas no trecho
+        final afetado, e a projeção é recalculada. Leituras anteriores ao início
+        do histórico provocam a reagregação completa.
+        """
+        with etapa('atualizar', linhas=len(novas_leituras)):
+            return self._atualizar(novas_leituras, gerar_relatorio)
+
+    def _atualizar(self, novas_leituras, gerar_relatorio):
+        if self._leituras is None:
+            raise ValueError("Execute run_forecast antes de atualizar a previsão com novas leituras.")
+
+        if 'aviario_num' in novas_leituras.columns:
+            novas_leituras = novas_leituras[novas_leituras['aviario_num'] == self.aviario_selecionado]
+        if novas_leituras.empty:
+            return self._gerar_saidas() if gerar_relatorio else None
+
+        parametros = (self.aviario_selecionado, self.data_alojamento, self.linhagem, self.n_aves,
+                      self.idade_diluicao_start, self.sobra_inicial_kg)
+        hora_inicial = novas_leituras.index.min().floor('h')
+        novas_leituras = novas_leituras.sort_index(kind='stable')
+        self._leituras = pd.concat([self._leituras, novas_leituras])
+        if novas_leituras.index[0] < self._leituras.index[len(self._leituras) - len(novas_leituras) - 1]:
+            # Leituras fora de ordem: reordena o histórico (no caso comum, só acrescenta ao final)
+            self._leituras = self._leituras.sort_index(kind='stable')
+
+        if hora_inicial < self._medias_canais.index[0]:
+            medias_canais = self._agregar_medias_horarias(self._leituras)
+            return self._executar_previsao(medias_canais, self.tabela_consumo, *parametros, gerar_relatorio=gerar_relatorio)
+
+        # Médias por canal: mantém as horas anteriores e reagrega só as leituras a partir de hora_inicial
+        medias_antigas = self._medias_canais
+        recalculadas = self._agregar_medias_horarias(self._leituras.loc[hora_inicial:])
+        medias_canais = pd.concat([medias_antigas[medias_antigas.index < hora_inicial], recalculadas])
+        medias_canais = medias_canais.reindex(self._horas_cobertas(medias_canais))
+
+        # Primeira hora cujo peso somado muda (inclui horas novas que passaram a ser cobertas por algum canal)
+        horas_novas = medias_canais.index.difference(medias_antigas.index)
+        inicio = min(hora_inicial, horas_novas.min()) if not horas_novas.empty else hora_inicial
+        peso_antigo = self._peso_bruto[self._peso_bruto.index < inicio]
+        peso_bruto = pd.concat([peso_antigo, medias_canais[medias_canais.index >= inicio].sum(axis=1)])
+
+        # A interpolação é refeita a partir do último peso válido antes do trecho alterado
+        validos = peso_antigo[peso_antigo.notna() & (peso_antigo != 0)]
+        ancora = validos.index[-1] if not validos.empty else peso_bruto.index[0]
+        df_base = self.df_hourly[self.df_hourly.index < ancora]
+        trecho = self._preparar_horario(peso_bruto[peso_bruto.index >= ancora])
+
+        # Consumo usando a última hora mantida como referência
+        variacao = pd.concat([df_base['peso_silo'].iloc[-1:], trecho['peso_silo']]).diff().loc[trecho.index]
+        trecho['consumo_real_kg'] = -variacao
+
+        self._medias_canais = medias_canais
+        self._peso_bruto = peso_bruto
+        self.df_hourly = pd.concat([df_base, trecho])
+        # O resultado incremental é igual ao da previsão completa com as mesmas médias horárias
+        self._chave_cache = self._chave_previsao((medias_canais, self.tabela_consumo, *parametros))
+
+        if self.df_entregas is not None:
+            self.df_entregas = self._atualizar_entregas(ancora)
+
+        self._projetar()
+        self._atualizar_resultado()
+
+        if not gerar_relatorio:
+            return None
+
+        return self._gerar_saidas()
+
+    @staticmethod
+    def _horas_cobertas(medias_canais):
+        """Horas entre a primeira e a última média de cada canal (as linhas que o resample produziria)."""
+        indice = None
+        for canal in medias_canais.columns:
+            serie = medias_canais[canal]
+            if serie.notna().any():
+                faixa = pd.date_range(serie.first_valid_index(), serie.last_valid_index(), freq='h', unit=medias_canais.index.unit)
+                indice = faixa if indice is None else indice.union(faixa)
+        return indice.rename(medias_canais.index.name)
+
+    def _atualizar_entregas(self, ancora):
+        """Refaz a detecção de entregas só no final do histórico, a partir de `ancora`.
+
+        Se a última entrega antes de `ancora` pode se juntar às horas novas
+        (intervalo de até 1 hora), o recálculo começa no início desse grupo.
+        """
+        inicio = ancora
+        peso = self.df_hourly['peso_silo']
+        anteriores = peso.index[(peso.index < ancora) & (peso.diff() > self._limiar_entrega()).to_numpy()]
+        if len(anteriores) and anteriores[-1] >= ancora - pd.Timedelta(hours=1):
+            inicio = anteriores[-1]
+            for anterior, atual in zip(anteriores[-2::-1], anteriores[::-1]):
+                if atual - anterior > pd.Timedelta(hours=1):
+                    break
+                inicio = anterior
+
+        # Inclui a hora anterior ao início para que a diferença da primeira hora seja calculada
+        posicao = self.df_hourly.index.searchsorted(inicio)
+        novas_entregas = self._detectar_entregas(self.df_hourly.iloc[max(posicao - 1, 0):])
+        entregas_mantidas = self.df_entregas[self.df_entregas.index < inicio]
+        if entregas_mantidas.empty or novas_entregas.empty:
+            # Sem entregas de um dos lados, evita misturar as colunas da tabela vazia
+            return novas_entregas if entregas_mantidas.empty else entregas_mantidas
+        return pd.concat([entregas_mantidas, novas_entregas])
+
     def _project_autonomy(self):
         """Calcula a taxa de consumo e projeta a autonomia."""
         self.df_hourly['consumo_real_kg'] = -self.df_hourly['peso_silo'].diff()
-        consumos_validos = self.df_hourly['consumo_real_kg'][(self.df_hourly['consumo_real_kg'] > 0) & (self.df_hourly['consumo_real_kg'] < 500)]
-        
+        self._projetar()
+
+    @staticmethod
+    def _taxa_consumo_recente(consumos, janela=24):
+        """Média das últimas `janela` horas de consumo válido (entre 0 e 500 kg/h)."""
+        return SiloForecaster._consumos_recentes(consumos, janela).mean()
+
+    @staticmethod
+    def _consumos_recentes(consumos, janela=24):
+        """Últimas `janela` horas de consumo válido (entre 0 e 500 kg/h).
+
+        Examina apenas o final da série, dobrando o trecho até encontrar horas
+        válidas suficientes.
+        """
+        tamanho = janela * 2
+        while True:
+            trecho = consumos.iloc[-tamanho:]
+            consumos_validos = trecho[(trecho > 0) & (trecho < 500)]
+            if len(consumos_validos) >= janela or tamanho >= len(consumos):
+                break
+            tamanho *= 2
+
         if consumos_validos.empty:
             raise ValueError("Não foi possível calcular uma taxa de consumo válida a partir dos dados. Verifique se há dados suficientes ou se os valores de peso estão corretos.")
 
-        taxa_consumo_real_recente = consumos_validos.tail(24).mean()
+        return consumos_validos.tail(janela)
+
+    def _projetar(self):
+        """Projeta a autonomia a partir da coluna consumo_real_kg do df_hourly."""
+        taxa_consumo_real_recente = self._taxa_consumo_recente(self.df_hourly['consumo_real_kg'])
         
         # Calcular a taxa de consumo real por ave por dia (em gramas/ave/dia)
         # taxa_consumo_real_recente está em kg/hora
@@ -91,17 +717,24 @@ class SiloForecaster:
         taxa_consumo_real_recente_gr_ave_dia = (taxa_consumo_real_recente * 1000 * 24) / self.n_aves
 
         ultimo_peso = self.df_hourly['peso_silo'].iloc[-1]
-        ultima_data = self.df_hourly.index[-1]
         idade_atual = self.df_hourly['idade'].iloc[-1] # Usar idade do df_hourly
 
-        consumo_tabela_atual = self.df_consumo[self.df_consumo['idade'] == idade_atual]['consumo_gr_ave_dia']
-        consumo_tabela_atual = consumo_tabela_atual.iloc[0] if not consumo_tabela_atual.empty else self.df_consumo['consumo_gr_ave_dia'].iloc[-1]
+        consumo_tabela_atual = self.tabela_consumo.consumo(idade_atual)
 
         # Calcular o fator de consumo baseado nas taxas por ave
         # Este fator indica o quanto o consumo real por ave se desvia do consumo por ave da tabela
         fator_consumo = taxa_consumo_real_recente_gr_ave_dia / consumo_tabela_atual
+        self.fator_consumo = fator_consumo
+
+        datas_projetadas, pesos_projetados, hora_devolucao = self._pesos_projetados(ultimo_peso, fator_consumo)
+        n_horas = self._horas_ate_esgotamento(pesos_projetados, hora_devolucao)
+        self.forecast_series = pd.Series(pesos_projetados[:n_horas], index=datas_projetadas[:n_horas])
+
+    def _pesos_projetados(self, ultimo_peso, fator_consumo):
+        """Peso projetado em todo o horizonte (sem parar no esgotamento), com as datas e a hora de devolução da sobra."""
+        datas_projetadas, consumo_tabela_futuro, hora_devolucao = self._eixo_projecao()
+        consumo_projetado_kg_hr = (consumo_tabela_futuro / 1000 / 24) * self.n_aves * fator_consumo
 
-        pesos_projetados, datas_projetadas = [], []
         peso_atual = ultimo_peso
         
         # Apply initial deduction of leftover feed if applicable
@@ -109,111 +742,371 @@ class SiloForecaster:
         if self.sobra_inicial_kg > 0:
             peso_atual -= self.sobra_inicial_kg
 
-        sobra_added_back = False # Flag to ensure leftover is added back only once
-        
-        for hora in range(1, 24 * 30): # Projeta para 30 dias
-            data_futura = ultima_data + timedelta(hours=hora)
-            idade_futura = (data_futura.normalize().date() - self.data_alojamento).days + 1
-            
-            consumo_tabela_futuro = self.df_consumo[self.df_consumo['idade'] == idade_futura]['consumo_gr_ave_dia']
-            consumo_tabela_futuro = consumo_tabela_futuro.iloc[0] if not consumo_tabela_futuro.empty else self.df_consumo['consumo_gr_ave_dia'].iloc[-1]
-
-            consumo_projetado_kg_hr = (consumo_tabela_futuro / 1000 / 24) * self.n_aves * fator_consumo
-
-            # Add back the leftover feed when idade_diluicao_start is reached
-            if not sobra_added_back and self.sobra_inicial_kg > 0 and idade_futura >= self.idade_diluicao_start:
-                peso_atual += self.sobra_inicial_kg
-                sobra_added_back = True
-            
-            peso_atual -= consumo_projetado_kg_hr
-            
-            pesos_projetados.append(peso_atual)
-            datas_projetadas.append(data_futura)
-
-            if peso_atual <= 0: break
-        
-        self.forecast_series = pd.Series(pesos_projetados, index=datas_projetadas)
+        # Soma acumulada sequencial (mesma ordem de operações do cálculo hora a hora):
+        # [peso inicial, -consumo_1, ..., +sobra, -consumo_k, ...]
+        incrementos = np.concatenate((
+            [peso_atual],
+            -consumo_projetado_kg_hr[:hora_devolucao],
+            [self.sobra_inicial_kg] if hora_devolucao < len(consumo_projetado_kg_hr) else [],
+            -consumo_projetado_kg_hr[hora_devolucao:],
+        ))
+        acumulado = np.cumsum(incrementos)
+        if hora_devolucao < len(consumo_projetado_kg_hr):
+            # Remove o passo intermediário da devolução da sobra, que não é uma hora projetada
+            acumulado = np.delete(acumulado, hora_devolucao + 1)
+        return datas_projetadas, acumulado[1:], hora_devolucao
 
-    def _detectar_entregas(self, df_hourly, threshold_kg=500):
-        """Detecta e agrupa entregas de ração consecutivas."""
-        df_hourly['mudanca_peso'] = df_hourly['peso_silo'].diff()
-        entregas_raw = df_hourly[df_hourly['mudanca_peso'] > threshold_kg].copy()
+    def projecao_horizonte(self):
+        """Peso projetado hora a hora nos 30 dias do horizonte, sem entregas e sem parar no esgotamento.
 
-        if entregas_raw.empty:
-            return pd.DataFrame(columns=['Quantidade (kg)'], index=pd.Index([], name='Data da Entrega'))
+        Coincide com forecast_series até o esgotamento e continua abaixo de
+        zero depois dele; usado para simular entregas futuras (ver planejamento).
+        Requer uma previsão já calculada.
+        """
+        if self.resultado is None:
+            raise ValueError("Execute calcular_previsao antes de consultar a projeção.")
+        ultimo_peso = self.df_hourly['peso_silo'].iloc[-1]
+        datas_projetadas, pesos_projetados, _ = self._pesos_projetados(ultimo_peso, self.fator_consumo)
+        return pd.Series(pesos_projetados, index=datas_projetadas, name='peso_projetado')
 
-        group_id = (entregas_raw.index.to_series().diff() > pd.Timedelta('1 hour')).cumsum()
-        
-        entregas_agrupadas = entregas_raw.groupby(group_id).agg(
-            data_entrega=('mudanca_peso', 'idxmin'),
-            quantidade_kg=('mudanca_peso', 'sum')
+    def _eixo_projecao(self):
+        """Eixo horário da projeção (30 dias): datas, consumo da tabela (g/ave/dia) e hora de devolução da sobra."""
+        # Eixo horário completo construído de uma só vez
+        datas_projetadas = self.df_hourly.index[-1] + pd.to_timedelta(np.arange(1, 24 * 30), unit='h')
+        idades_futuras = (datas_projetadas.normalize() - pd.Timestamp(self.data_alojamento)).days.to_numpy() + 1
+        consumo_tabela_futuro = self.tabela_consumo.consumo(idades_futuras)
+
+        # A sobra é devolvida uma única vez, na primeira hora em que a idade atinge idade_diluicao_start
+        hora_devolucao = len(consumo_tabela_futuro)
+        if self.sobra_inicial_kg > 0:
+            atingiu_diluicao = idades_futuras >= self.idade_diluicao_start
+            if atingiu_diluicao.any():
+                hora_devolucao = int(np.argmax(atingiu_diluicao))
+        return datas_projetadas, consumo_tabela_futuro, hora_devolucao
+
+    def simular_cenarios(self, n_cenarios=2000, quantis=(0.1, 0.5, 0.9), seed=None):
+        """Projeta `n_cenarios` trajetórias de consumo de uma vez e guarda os quantis em resultado.cenarios.
+
+        O fator de consumo de cada cenário vem de uma reamostragem (bootstrap)
+        das horas de consumo válido usadas na projeção determinística, e cada
+        hora projetada recebe um ruído multiplicativo com a variação relativa
+        observada nessas horas. Todas as trajetórias são calculadas como uma
+        matriz cenários x horas. Requer uma previsão já calculada. Com cache de
+        resultados e `seed` reproduzível, cenários já simulados são reaproveitados.
+        """
+        if self.resultado is None:
+            raise ValueError("Execute calcular_previsao antes de simular cenários.")
+
+        chave_cenarios = self._chave_cenarios(n_cenarios, quantis, seed)
+        cenarios = self.cache_resultados.obter(chave_cenarios) if chave_cenarios else None
+        if cenarios is not None:
+            return self._aplicar_cenarios(cenarios, seed, guardar=False)
+
+        with etapa('simular_cenarios', linhas=n_cenarios):
+            rng = np.random.default_rng(seed)
+            validos = self._consumos_recentes(self.df_hourly['consumo_real_kg']).to_numpy(dtype=float)
+            consumo_tabela_atual = self.tabela_consumo.consumo(self.df_hourly['idade'].iloc[-1])
+
+            # Fator de consumo por cenário (mesma conversão kg/h -> g/ave/dia da projeção determinística)
+            taxas = validos[rng.integers(0, len(validos), size=(n_cenarios, len(validos)))].mean(axis=1)
+            fatores = (taxas * 1000 * 24) / self.n_aves / consumo_tabela_atual
+
+            datas_projetadas, consumo_tabela_futuro, hora_devolucao = self._eixo_projecao()
+            variacao = validos.std() / validos.mean() if len(validos) > 1 else 0.0
+            ruido = np.clip(1 + variacao * rng.standard_normal((n_cenarios, len(datas_projetadas))), 0, None)
+            consumo = (consumo_tabela_futuro / 1000 / 24 * self.n_aves) * fatores[:, None] * ruido
+
+            pesos = (self.df_hourly['peso_silo'].iloc[-1] - self.sobra_inicial_kg) - np.cumsum(consumo, axis=1)
+            pesos[:, hora_devolucao:] += self.sobra_inicial_kg
+
+            # Primeira hora com peso <= 0 em cada cenário (inf se não esgota no horizonte)
+            esgotou = pesos <= 0
+            horas_esgotamento = np.where(esgotou.any(axis=1), esgotou.argmax(axis=1) + 1.0, np.inf)
+            horas_quantis = np.quantile(horas_esgotamento, quantis, method='inverted_cdf')
+            datas_esgotamento = {
+                quantil: (datas_projetadas[int(horas) - 1] if np.isfinite(horas) else None)
+                for quantil, horas in zip(quantis, horas_quantis)
+            }
+
+            # Faixas de peso até o esgotamento no quantil mais alto (ou até o fim do horizonte)
+            n_horas = int(horas_quantis[-1]) if np.isfinite(horas_quantis[-1]) else len(datas_projetadas)
+            bandas = np.clip(np.quantile(pesos[:, :n_horas], quantis, axis=0), 0, None)
+
+        cenarios = CenariosPrevisao(
+            n_cenarios=n_cenarios,
+            quantis=tuple(quantis),
+            fatores_consumo=fatores,
+            horas_esgotamento=horas_esgotamento,
+            datas_esgotamento=datas_esgotamento,
+            bandas=pd.DataFrame(bandas.T, index=datas_projetadas[:n_horas],
+                                columns=[f'p{quantil * 100:.0f}' for quantil in quantis]),
         )
-        entregas_agrupadas.set_index('data_entrega', inplace=True)
-        entregas_agrupadas.index.name = 'Data da Entrega'
-        return entregas_agrupadas
+        return self._aplicar_cenarios(cenarios, seed)
 
-    def _generate_report_and_plot(self):
-        """Gera a string do relatório e o objeto do gráfico para o Streamlit."""
-        df_entregas = self._detectar_entregas(self.df_hourly)
-        
-        initial_peso = self.df_hourly['peso_silo'].iloc[0] # Adicionado para a legenda
-        zero_time = self.forecast_series.index[-1] if not self.forecast_series.empty else None
-        autonomia_total = zero_time - self.df_hourly.index[-1] if zero_time else timedelta(days=0)
-        dias = autonomia_total.days
-        horas = autonomia_total.seconds // 3600
+    def _aplicar_cenarios(self, cenarios, seed, guardar=True):
+        self.cenarios = cenarios
+        self._semente_cenarios = seed
+        self.resultado = replace(self.resultado, cenarios=cenarios)
+        # Relatório e gráfico passam a incluir a janela de esgotamento
+        self.report_string = None
+        self.plot_fig = None
+        self.plot_png = None
+        if guardar:
+            self._guardar_no_cache(base=False)
+        return cenarios
+
+    def varrer_parametros(self, n_aves=None, sobra_inicial_kg=None, idade_diluicao_start=None, linhagem=None):
+        """Autonomia para cada combinação dos parâmetros do lote (produto cartesiano), sem refazer a previsão.
+
+        Cada argumento é um valor ou uma lista de valores; os omitidos ficam com
+        os da previsão atual. A taxa de consumo recente é a da previsão e o
+        fator de consumo é recalibrado pela tabela de cada linhagem com as aves
+        do lote, de modo que `n_aves` muda só as aves da projeção (ex.: após
+        descarte ou mortalidade). Cada linhagem usa uma soma acumulada da sua
+        tabela no horizonte, e o esgotamento de todas as combinações sai de uma
+        busca binária sobre ela. Retorna uma linha por combinação, com
+        fator_consumo, horas_autonomia e data_esgotamento (vazias se o silo não
+        esgota em 30 dias). Requer uma previsão já calculada.
+        """
+        if self.resultado is None:
+            raise ValueError("Execute calcular_previsao antes de variar os parâmetros.")
+
+        with etapa('varrer_parametros') as medida:
+            def valores(valor, atual):
+                return np.atleast_1d(atual if valor is None else valor)
+
+            grade = pd.MultiIndex.from_product(
+                [valores(n_aves, self.n_aves), valores(sobra_inicial_kg, self.sobra_inicial_kg),
+                 valores(idade_diluicao_start, self.idade_diluicao_start), valores(linhagem, self.linhagem)],
+                names=['n_aves', 'sobra_inicial_kg', 'idade_diluicao_start', 'linhagem'],
+            ).to_frame(index=False)
+            medida.linhas = len(grade)
+
+            taxa_consumo_real_recente = self._taxa_consumo_recente(self.df_hourly['consumo_real_kg'])
+            ultimo_peso = float(self.df_hourly['peso_silo'].iloc[-1])
+            idade_atual = self.df_hourly['idade'].iloc[-1]
+            datas_projetadas = self.df_hourly.index[-1] + pd.to_timedelta(np.arange(1, 24 * 30), unit='h')
+            idades_futuras = (datas_projetadas.normalize() - pd.Timestamp(self.data_alojamento)).days.to_numpy() + 1
+            n_horas = len(datas_projetadas)
+
+            fator = np.empty(len(grade))
+            posicao = np.full(len(grade), n_horas)
+            for linhagem_grade, linhas in grade.groupby('linhagem').indices.items():
+                tabela = self._tabela_consumo(linhagem_grade)
+                fator[linhas] = (taxa_consumo_real_recente * 1000 * 24 / self.n_aves) / tabela.consumo(idade_atual)
+                # Consumo projetado até a hora i (inclusive) = aves * fator / 24000 * acumulado[i]
+                acumulado = np.cumsum(tabela.consumo(idades_futuras))
+                sobra = grade['sobra_inicial_kg'].to_numpy(dtype=float)[linhas]
+                hora_devolucao = np.where(
+                    sobra > 0,
+                    np.searchsorted(idades_futuras, grade['idade_diluicao_start'].to_numpy()[linhas], side='left'),
+                    n_horas,
+                )
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    escala = grade['n_aves'].to_numpy(dtype=float)[linhas] * fator[linhas] / 24000
+                    # Antes da devolução a sobra é descontada do peso; depois, volta ao silo (como em _projetar)
+                    antes = np.searchsorted(acumulado, (ultimo_peso - sobra) / escala, side='left')
+                    depois = np.maximum(np.searchsorted(acumulado, ultimo_peso / escala, side='left'), hora_devolucao)
+                posicao[linhas] = np.where(antes < hora_devolucao, antes, depois)
+
+            esgota = posicao < n_horas
+            grade['fator_consumo'] = fator
+            grade['horas_autonomia'] = np.where(esgota, posicao + 1, np.nan)
+            grade['data_esgotamento'] = pd.Series(datas_projetadas[np.minimum(posicao, n_horas - 1)]).where(esgota)
+            return grade
+
+    @staticmethod
+    def _horas_ate_esgotamento(pesos_projetados, hora_devolucao):
+        """Número de horas projetadas até (e incluindo) a primeira com peso <= 0.
+
+        A curva é não crescente antes e depois da devolução da sobra, então o
+        cruzamento do zero é localizado por busca binária em cada trecho.
+        """
+        for inicio, fim in ((0, hora_devolucao), (hora_devolucao, len(pesos_projetados))):
+            trecho = -pesos_projetados[inicio:fim]
+            posicao = int(np.searchsorted(trecho, 0, side='left'))
+            if posicao < len(trecho):
+                return inicio + posicao + 1
+        return len(pesos_projetados)
+
+    def _limiar_entrega(self, aviario=None):
+        """Limiar de entrega (kg) do aviário desta previsão (ou do aviário informado)."""
+        if np.isscalar(self.limiar_entrega_kg):
+            return self.limiar_entrega_kg
+        return self.limiar_entrega_kg.get(self.aviario_selecionado if aviario is None else aviario, LIMIAR_PADRAO_KG)
+
+    def _detectar_entregas(self, df_hourly):
+        """Detecta e agrupa entregas de ração consecutivas (sem alterar df_hourly)."""
+        return entregas_do_aviario(detectar_entregas(df_hourly['peso_silo'], self._limiar_entrega()))
+
+    def relatorio(self):
+        """Gera (uma vez por previsão) a string do relatório exibida no Streamlit e no PDF."""
+        if self.report_string is not None:
+            return self.report_string
+
+        with etapa('relatorio'):
+            self.report_string = self._montar_relatorio()
+        return self.report_string
+
+    def _montar_relatorio(self):
+        resultado = self.resultado
+        df_entregas = resultado.df_entregas
+        zero_time = resultado.data_esgotamento
+        dias, horas = resultado.autonomia_dias_horas
         
         report_header = f"""
         RELATÓRIO DE AUTONOMIA DE RAÇÃO
         ---------------------------------
         Data do Relatório: {datetime.now().strftime('%d/%m/%Y %H:%M')}
-        Aviário Analisado: {self.aviario_selecionado}
-        Linhagem: {self.linhagem.capitalize()}
-        Número de Aves: {self.n_aves}
+        Aviário Analisado: {resultado.aviario}
+        Linhagem: {resultado.linhagem.capitalize()}
+        Número de Aves: {resultado.n_aves}
         """
         
-        idade_atual = self.df_hourly['idade'].iloc[-1]
-        idade_esgotamento = (zero_time.normalize().date() - self.data_alojamento).days + 1 if zero_time else 'N/A'
+        idade_esgotamento = resultado.idade_esgotamento if resultado.idade_esgotamento is not None else 'N/A'
 
         report_kpis = f"""
         MÉTRICAS PRINCIPAIS
         ---------------------
-        - Peso Atual no Silo: {self.df_hourly['peso_silo'].iloc[-1]:.2f} kg
-        - Idade Atual do Lote: {idade_atual} dias
+        - Peso Atual no Silo: {resultado.peso_atual_kg:.2f} kg
+        - Idade Atual do Lote: {resultado.idade_atual} dias
         - Autonomia Estimada: {dias} dias e {horas} horas
         - Data Estimada de Esgotamento: {zero_time.strftime('%d/%m/%Y %H:%M') if zero_time else 'N/A'}
         - Idade Estimada de Esgotamento: {idade_esgotamento} dias
         """
 
+        if resultado.cenarios is not None:
+            formatar = lambda data: data.strftime('%d/%m/%Y %H:%M') if data is not None else 'além do horizonte'
+            cenarios = resultado.cenarios
+            linhas = [f"- Esgotamento P{quantil * 100:.0f}: {formatar(data)}"
+                      for quantil, data in cenarios.datas_esgotamento.items()]
+            linhas.append(f"  ({cenarios.n_cenarios} cenários de consumo, {cenarios.fracao_esgotada:.0%} esgotam em 30 dias)")
+            report_kpis += "\n        ".join(linhas) + "\n        "
+
         report_entregas = "\nENTREGAS DE RAÇÃO DETECTADAS NO PERÍODO\n-----------------------------------------"
         if df_entregas.empty:
-            report_entregas += "\nNenhuma entrega significativa (>500kg) foi detectada no período analisado."
+            report_entregas += f"\nNenhuma entrega significativa (>{self._limiar_entrega():.0f}kg) foi detectada no período analisado."
         else:
             # Convert index to string for markdown table compatibility
             df_entregas_str = df_entregas.copy()
             df_entregas_str.index = df_entregas_str.index.strftime('%d/%m/%Y %H:%M')
             report_entregas += "\n" + df_entregas_str.to_markdown()
 
-        final_report_string = f"{report_header}\n{report_kpis}\n{report_entregas}"
+        return f"{report_header}\n{report_kpis}\n{report_entregas}"
+
+    def grafico(self):
+        """Desenha (uma vez por previsão) o gráfico de histórico e projeção."""
+        if self.plot_fig is not None:
+            return self.plot_fig
 
-        # Gerar gráfico
-        fig, ax = plt.subplots(figsize=(12, 7))
-        ax.plot(self.df_hourly['peso_silo'], label=f'Histórico - Aviário {self.aviario_selecionado} (Início: {f"{initial_peso:,.0f}".replace(",", ".")} kg)', marker='o')
-        ax.plot(self.forecast_series, label='Projeção de Esvaziamento', linestyle='--', color='red')
+        with etapa('grafico'):
+            df_entregas = self.resultado.df_entregas
+            zero_time = self.resultado.data_esgotamento
+            initial_peso = self.df_hourly['peso_silo'].iloc[0] # Adicionado para a legenda
+
+            # Históricos longos são reduzidos mantendo o degrau de cada entrega
+            historico = reduzir_serie(self.df_hourly['peso_silo'], self.MAX_PONTOS_GRAFICO, manter=df_entregas.index)
+            projecao = reduzir_serie(self.forecast_series, self.MAX_PONTOS_GRAFICO)
+
+            plt = pyplot()
+            fig, ax = plt.subplots(figsize=(12, 7))
+            ax.plot(historico, label=f'Histórico - Aviário {self.aviario_selecionado} (Início: {f"{initial_peso:,.0f}".replace(",", ".")} kg)', marker='o')
+            ax.plot(projecao, label='Projeção de Esvaziamento', linestyle='--', color='red')
         
-        if zero_time:
-            ax.axvline(x=zero_time, color='r', linestyle=':', label=f'Previsão de Esgotamento: {zero_time.strftime("%d/%m %H:%M")}')
-
-        # Adicionar linhas de entrega ao gráfico
-        if not df_entregas.empty:
-            for data_entrega, row in df_entregas.iterrows():
-                idade_entrega = (data_entrega.normalize().date() - self.data_alojamento).days + 1
-                ax.axvline(x=data_entrega, color='green', linestyle='--', label=f'Entrega: {data_entrega.strftime("%d/%m %H:%M")} ({idade_entrega} dias) {row["quantidade_kg"]:.0f} kg')
-
-        ax.set_title(f'Projeção de Autonomia de Ração - Aviário {self.aviario_selecionado}')
-        ax.set_xlabel('Data e Hora')
-        ax.set_ylabel('Peso da Ração (kg)')
-        ax.legend()
-        ax.grid(True)
-        plt.tight_layout()
+            if zero_time:
+                ax.axvline(x=zero_time, color='r', linestyle=':', label=f'Previsão de Esgotamento: {zero_time.strftime("%d/%m %H:%M")}')
+
+            cenarios = self.resultado.cenarios
+            if cenarios is not None:
+                bandas = cenarios.bandas
+                ax.fill_between(bandas.index, bandas.iloc[:, 0], bandas.iloc[:, -1], color='red', alpha=0.15,
+                                label=f'Faixa {bandas.columns[0].upper()}-{bandas.columns[-1].upper()} ({cenarios.n_cenarios} cenários)')
+                mais_cedo, mais_tarde = cenarios.janela_esgotamento
+                if mais_cedo is not None:
+                    ax.axvspan(mais_cedo, mais_tarde if mais_tarde is not None else bandas.index[-1],
+                               color='red', alpha=0.08)
+
+            # Adicionar linhas de entrega ao gráfico
+            if not df_entregas.empty:
+                for data_entrega, row in df_entregas.iterrows():
+                    idade_entrega = (data_entrega.normalize().date() - self.data_alojamento).days + 1
+                    ax.axvline(x=data_entrega, color='green', linestyle='--', label=f'Entrega: {data_entrega.strftime("%d/%m %H:%M")} ({idade_entrega} dias) {row["quantidade_kg"]:.0f} kg')
+
+            ax.set_title(f'Projeção de Autonomia de Ração - Aviário {self.aviario_selecionado}')
+            ax.set_xlabel('Data e Hora')
+            ax.set_ylabel('Peso da Ração (kg)')
+            ax.legend()
+            ax.grid(True)
+            plt.tight_layout()
         
-        return final_report_string, fig, df_entregas
\ No newline at end of file
+        self.plot_fig = fig
+        return fig
+
+    def grafico_png(self, dpi=100):
+        """Gráfico em PNG (bytes), renderizado em memória; a figura é fechada em seguida.
+
+        O PNG fica guardado em plot_png e é reaproveitado enquanto a previsão e o
+        DPI não mudarem. Com cache de resultados, cada PNG tem a sua própria
+        entrada, e a previsão guardada não é regravada a cada gráfico.
+        """
+        if self.plot_png is not None and self.plot_png_dpi == dpi:
+            return self.plot_png
+
+        chave = self._chave_grafico(dpi)
+        png = self.cache_resultados.obter(chave) if chave is not None else None
+        if png is None:
+            with etapa('grafico_png'):
+                fig = self.grafico()
+                buffer = io.BytesIO()
+                fig.savefig(buffer, format='png', dpi=dpi)
+                pyplot().close(fig)
+            self.plot_fig = None
+            png = buffer.getvalue()
+            if chave is not None:
+                self.cache_resultados.guardar(chave, png)
+        self.plot_png = png
+        self.plot_png_dpi = dpi
+        return self.plot_png
+
+    def copia_resultados(self):
+        """Cópia leve da previsão, sem os dados brutos dos sensores nem a figura.
+
+        Própria para enviar a outros processos (ex.: rasterização do PDF).
+        """
+        copia = copy.copy(self)
+        copia.df_sensores = None
+        copia._leituras = None
+        copia.plot_fig = None
+        copia.cache_resultados = None
+        copia._chave_cache = None
+        return copia
+
+
+def _semente_aviario(seed, aviario):
+    """Semente dos cenários de um aviário: reproduzível com `seed` e independente entre aviários."""
+    return None if seed is None else [seed, int(aviario)]
+
+def _semente_reproduzivel(seed):
+    """Se `seed` sempre gera os mesmos cenários (um inteiro ou uma sequência de inteiros, não None nem um Generator)."""
+    if isinstance(seed, (list, tuple)):
+        return bool(seed) and all(isinstance(valor, (int, np.integer)) for valor in seed)
+    return isinstance(seed, (int, np.integer))
+
+def _prever_aviario_isolado(linhagem_folder, reports_folder, argumentos, gerar_relatorio, limiar_entrega_kg,
+                            n_cenarios=0, seed=None):
+    """Executa a previsão de um aviário em um processo do run_batch.
+
+    A figura é convertida em PNG antes de voltar ao processo principal, já que
+    objetos do matplotlib são caros de serializar.
+    """
+    pyplot().switch_backend('Agg')
+    previsao = SiloForecaster(None, linhagem_folder, reports_folder, limiar_entrega_kg=limiar_entrega_kg)
+    previsao._executar_previsao(*argumentos, gerar_relatorio=False)
+    if n_cenarios:
+        previsao.simular_cenarios(n_cenarios, seed=seed)
+    if gerar_relatorio:
+        previsao._gerar_saidas()
+    if previsao.plot_fig is not None:
+        previsao.grafico_png()
+    return previsao
+
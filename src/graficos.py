@@ -0,0 +1,19 @@
+import os
+import sys
+
+def pyplot():
+    """matplotlib.pyplot, importado só quando um gráfico é desenhado.
+
+    Sem display (servidores, cron) e sem MPLBACKEND definido, usa o backend
+    Agg, evitando que o matplotlib procure (e importe) um backend interativo.
+    """
+    if 'matplotlib.pyplot' not in sys.modules and 'MPLBACKEND' not in os.environ and not _tem_display():
+        import matplotlib
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def _tem_display():
+    if sys.platform in ('win32', 'darwin'):
+        return True
+    return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
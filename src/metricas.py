@@ -0,0 +1,180 @@
+import pandas as pd
+import contextlib
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from datetime import datetime
+
+# Variáveis de ambiente que ligam a instrumentação fora do app (ex.: main.py, scripts)
+# FORECAST_METRICAS: "1" liga os tempos; "memoria" e/ou "perfil" (separados por vírgula) ligam também
+#                    as variações de memória (tracemalloc) e o cProfile
+# FORECAST_METRICAS_DIR: pasta onde cada coleta é gravada em JSON (e .prof, com perfil)
+ENV_METRICAS = 'FORECAST_METRICAS'
+ENV_METRICAS_DIR = 'FORECAST_METRICAS_DIR'
+
+# Coleta ativa no contexto atual (cada thread/sessão do Streamlit tem o seu)
+_metricas_atuais = contextvars.ContextVar('metricas_atuais', default=None)
+
+@dataclass
+class EtapaMedida:
+    nome: str
+    nivel: int = 0
+    tempo_s: float = 0.0
+    linhas: int = None
+    memoria_mb: float = None
+    pico_mb: float = None
+
+class MetricasDesempenho:
+    """Tempos, linhas processadas e variação de memória de cada etapa do pipeline."""
+
+    def __init__(self, memoria=False, perfil=False):
+        self.memoria = memoria
+        self.perfil = perfil
+        self.etapas = []
+        self.profiler = None
+        self._nivel = 0
+        self._iniciou_tracemalloc = False
+
+    @classmethod
+    def do_ambiente(cls):
+        """Instância configurada por FORECAST_METRICAS, ou None se a variável não estiver definida."""
+        valor = os.environ.get(ENV_METRICAS, '').strip().lower()
+        if valor in ('', '0', 'false', 'nao', 'não'):
+            return None
+        opcoes = {opcao.strip() for opcao in valor.split(',')}
+        return cls(memoria='memoria' in opcoes, perfil='perfil' in opcoes)
+
+    def iniciar(self):
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._iniciou_tracemalloc = True
+        if self.perfil:
+            # O mesmo profiler acumula as várias coletas feitas com esta instância
+            profiler = self.profiler or cProfile.Profile()
+            try:
+                profiler.enable()
+                self.profiler = profiler
+            except ValueError:
+                pass # Outro profiler já está ativo neste processo
+
+    def finalizar(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self._iniciou_tracemalloc:
+            tracemalloc.stop()
+            self._iniciou_tracemalloc = False
+
+    @contextlib.contextmanager
+    def medir(self, nome, linhas=None):
+        """Mede o bloco como uma etapa; `linhas` pode ser preenchido depois em etapa.linhas."""
+        etapa = EtapaMedida(nome, nivel=self._nivel, linhas=linhas)
+        self.etapas.append(etapa)
+        medir_memoria = tracemalloc.is_tracing()
+        if medir_memoria:
+            memoria_antes, _ = tracemalloc.get_traced_memory()
+        self._nivel += 1
+        inicio = time.perf_counter()
+        try:
+            yield etapa
+        finally:
+            etapa.tempo_s = time.perf_counter() - inicio
+            self._nivel -= 1
+            if medir_memoria:
+                memoria_depois, pico = tracemalloc.get_traced_memory()
+                etapa.memoria_mb = (memoria_depois - memoria_antes) / 1e6
+                etapa.pico_mb = pico / 1e6
+
+    def para_dataframe(self):
+        """Uma linha por etapa medida, na ordem de execução."""
+        return pd.DataFrame([asdict(etapa) for etapa in self.etapas],
+                            columns=['nome', 'nivel', 'tempo_s', 'linhas', 'memoria_mb', 'pico_mb'])
+
+    def resumo(self):
+        """Etapas agregadas por nome (chamadas, tempo total, linhas e memória), na ordem da primeira chamada."""
+        df = self.para_dataframe()
+        if df.empty:
+            return pd.DataFrame(columns=['etapa', 'chamadas', 'tempo_s', 'linhas', 'linhas_por_s', 'memoria_mb', 'pico_mb'])
+
+        resumo = df.groupby('nome', sort=False).agg(
+            nivel=('nivel', 'min'),
+            chamadas=('nome', 'size'),
+            tempo_s=('tempo_s', 'sum'),
+            linhas=('linhas', lambda linhas: linhas.sum(min_count=1)),
+            memoria_mb=('memoria_mb', lambda memoria: memoria.sum(min_count=1)),
+            pico_mb=('pico_mb', 'max'),
+        )
+        resumo['linhas_por_s'] = resumo['linhas'] / resumo['tempo_s']
+        # Etapas internas aparecem recuadas sob a etapa que as chamou
+        resumo.index = ['  ' * nivel + nome for nome, nivel in zip(resumo.index, resumo['nivel'])]
+        resumo.index.name = 'etapa'
+        return resumo.reset_index()[['etapa', 'chamadas', 'tempo_s', 'linhas', 'linhas_por_s', 'memoria_mb', 'pico_mb']]
+
+    def texto_perfil(self, n=25, ordem='cumulative'):
+        """As `n` funções mais caras do cProfile, como texto (vazio se o perfil não foi coletado)."""
+        if self.profiler is None:
+            return ''
+        saida = io.StringIO()
+        pstats.Stats(self.profiler, stream=saida).sort_stats(ordem).print_stats(n)
+        return saida.getvalue()
+
+    def salvar_json(self, caminho):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump({'etapas': [asdict(etapa) for etapa in self.etapas]}, f, indent=2, ensure_ascii=False)
+
+    def salvar_perfil(self, caminho):
+        """Grava o cProfile no formato do pstats (abre com snakeviz, `python -m pstats`, etc.)."""
+        if self.profiler is not None:
+            self.profiler.dump_stats(caminho)
+
+    def salvar(self, pasta):
+        """Grava a coleta em `pasta` (JSON e, se houver, .prof) e retorna o caminho base."""
+        os.makedirs(pasta, exist_ok=True)
+        base = os.path.join(pasta, f"metricas_{datetime.now():%Y%m%d_%H%M%S_%f}")
+        self.salvar_json(f"{base}.json")
+        self.salvar_perfil(f"{base}.prof")
+        return base
+
+@contextlib.contextmanager
+def coletar(metricas=None):
+    """Ativa a coleta de métricas dentro do bloco.
+
+    Sem argumento, usa a configuração de FORECAST_METRICAS; se a variável não
+    estiver definida, o bloco roda sem instrumentação e o valor produzido é None.
+    Com FORECAST_METRICAS_DIR, a coleta é gravada em disco ao final do bloco.
+    """
+    if metricas is None:
+        metricas = MetricasDesempenho.do_ambiente()
+    if metricas is None:
+        yield None
+        return
+
+    token = _metricas_atuais.set(metricas)
+    metricas.iniciar()
+    try:
+        yield metricas
+    finally:
+        metricas.finalizar()
+        _metricas_atuais.reset(token)
+        pasta = os.environ.get(ENV_METRICAS_DIR)
+        if pasta:
+            metricas.salvar(pasta)
+
+@contextlib.contextmanager
+def etapa(nome, linhas=None):
+    """Mede o bloco na coleta ativa; sem coleta ativa, não faz nada."""
+    metricas = _metricas_atuais.get()
+    if metricas is None:
+        yield EtapaMedida(nome, linhas=linhas)
+        return
+    with metricas.medir(nome, linhas) as medida:
+        yield medida
+
+def metricas_ativas():
+    """MetricasDesempenho da coleta ativa no contexto atual, ou None."""
+    return _metricas_atuais.get()
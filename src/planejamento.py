@@ -0,0 +1,146 @@
+import heapq
+import math
+
+import numpy as np
+import pandas as pd
+
+from .metricas import etapa
+
+# Fração da capacidade mantida como margem de segurança quando a margem não é informada
+MARGEM_PADRAO = 0.1
+# Colunas da programação de entregas (uma linha por entrega planejada)
+COLUNAS_PROGRAMACAO = ['aviario_num', 'caminhao', 'data_entrega', 'quantidade_kg', 'peso_antes_kg', 'peso_depois_kg',
+                       'data_limite', 'folga_horas']
+
+def carga_tipica(entregas, aviarios):
+    """Tamanho típico da entrega (kg) de cada aviário: a mediana das quantidades detectadas.
+
+    `entregas` é a tabela de entregas da granja (entregas.COLUNAS_ENTREGAS, como
+    SiloForecaster.entregas_granja). Aviários sem entregas detectadas recebem a
+    mediana da granja.
+    """
+    if entregas.empty:
+        raise ValueError("Nenhuma entrega detectada para calibrar o tamanho da carga; informe carga_kg.")
+    quantidades = entregas['quantidade_kg'].astype(float)
+    por_aviario = quantidades.groupby(entregas['aviario_num']).median()
+    return por_aviario.reindex(list(aviarios)).fillna(quantidades.median())
+
+def planejar_entregas(projecoes, capacidade_kg, carga_kg, margem_kg=None, caminhoes=1, duracao_viagem_h=4,
+                      inicio=None, horizonte_h=7 * 24):
+    """Programação de entregas que mantém cada silo acima da margem de segurança, por simulação de eventos.
+
+    `projecoes` mapeia cada silo (o aviário, ou (granja, aviário) para várias
+    granjas) ao seu peso projetado hora a hora sem entregas
+    (SiloForecaster.projecao_horizonte). `capacidade_kg`, `carga_kg` e
+    `margem_kg` são um valor único ou um mapeamento por silo; sem margem, usa
+    MARGEM_PADRAO da capacidade.
+
+    Uma fila de prioridade (heapq) guarda os silos pela hora em que a projeção,
+    somadas as entregas já planejadas, chega à margem; outra guarda os
+    `caminhoes` pela hora em que ficam livres. A cada evento o silo mais urgente
+    recebe o caminhão livre mais cedo, na primeira hora em que a carga inteira
+    cabe no silo (ou no prazo, se não couber antes), e volta à fila com o novo
+    prazo. Cada viagem ocupa o caminhão por `duracao_viagem_h` horas
+    (arredondadas para cima). A simulação para quando nenhum silo chega à
+    margem em até `horizonte_h` horas após `inicio` (por padrão, a primeira hora
+    projetada) nem até o fim da sua projeção.
+
+    Retorna uma linha por entrega (COLUNAS_PROGRAMACAO), por data de entrega:
+    data_limite é quando o silo chegaria à margem sem essa entrega e
+    folga_horas < 0 indica uma entrega atrasada por falta de caminhão. Silos
+    sem caminhão livre antes do fim da projeção aparecem no final, sem data de
+    entrega nem caminhão.
+    """
+    chaves = list(projecoes)
+    with etapa('planejar_entregas', linhas=len(chaves)):
+        if not chaves:
+            return pd.DataFrame(columns=COLUNAS_PROGRAMACAO)
+        capacidade = _por_silo(capacidade_kg, chaves, 'capacidade_kg')
+        carga = _por_silo(carga_kg, chaves, 'carga_kg')
+        margem = capacidade * MARGEM_PADRAO if margem_kg is None else _por_silo(margem_kg, chaves, 'margem_kg')
+        if (carga <= 0).any() or (margem >= capacidade).any():
+            raise ValueError("A carga deve ser positiva e a margem menor que a capacidade de cada silo.")
+        if caminhoes < 1:
+            raise ValueError("É preciso ao menos um caminhão.")
+
+        # Horas contadas a partir da primeira hora projetada entre todos os silos
+        inicios = np.array([projecoes[chave].index.values[0] for chave in chaves])
+        referencia = inicios.min()
+        deslocamento = ((inicios - referencia) // np.timedelta64(1, 'h')).tolist()
+        # Uma linha por silo, completada com -inf após o fim da projeção (que fica fora do alcance das buscas)
+        tamanhos = [len(projecoes[chave]) for chave in chaves]
+        pesos = np.full((len(chaves), max(tamanhos)), -np.inf)
+        for i, chave in enumerate(chaves):
+            pesos[i, :tamanhos[i]] = projecoes[chave].values
+        fins = [deslocamento[i] + tamanho for i, tamanho in enumerate(tamanhos)]
+        # Menor peso até cada hora, com sinal trocado: a devolução da sobra faz o peso subir,
+        # e a busca precisa de uma série ordenada
+        negativos = -np.minimum.accumulate(pesos, axis=1)
+        primeiros_prazos = (np.array(deslocamento) + (negativos < -margem[:, None]).sum(axis=1)).tolist()
+        capacidade, carga, margem = capacidade.tolist(), carga.tolist(), margem.tolist()
+        entregue = [0.0] * len(chaves)
+
+        def hora_no_nivel(i, nivel):
+            """Primeira hora em que o silo `i`, com as entregas já planejadas, chega a `nivel` kg."""
+            return deslocamento[i] + int(negativos[i].searchsorted(entregue[i] - nivel))
+
+        inicio_h = 0 if inicio is None else math.floor((pd.Timestamp(inicio) - referencia) / pd.Timedelta(hours=1))
+        limite_h = inicio_h + horizonte_h
+        duracao_h = math.ceil(duracao_viagem_h)
+        fila = list(zip(primeiros_prazos, range(len(chaves))))
+        heapq.heapify(fila)
+        livres = [(inicio_h, caminhao) for caminhao in range(1, caminhoes + 1)]
+
+        registros, sem_caminhao = [], []
+        while fila:
+            limite, i = heapq.heappop(fila)
+            if limite >= fins[i] or limite > limite_h:
+                continue
+            livre, caminhao = heapq.heappop(livres)
+            cabe = hora_no_nivel(i, capacidade[i] - carga[i])
+            hora = max(min(cabe, limite), livre)
+            if hora >= fins[i]:
+                # Nenhum caminhão livre antes do fim da projeção do silo
+                sem_caminhao.append((i, limite))
+                heapq.heappush(livres, (livre, caminhao))
+                continue
+            peso_antes = float(pesos[i, hora - deslocamento[i]]) + entregue[i]
+            # Atrasada, o silo já esvaziou: o consumo projetado além do vazio não é descontado da nova carga
+            deficit = max(-peso_antes, 0.0)
+            peso_antes += deficit
+            quantidade = min(carga[i], capacidade[i] - peso_antes)
+            if quantidade <= 0:
+                heapq.heappush(livres, (livre, caminhao))
+                continue
+            entregue[i] += quantidade + deficit
+            registros.append((i, caminhao, hora, quantidade, peso_antes, limite))
+            heapq.heappush(livres, (hora + duracao_h, caminhao))
+            heapq.heappush(fila, (hora_no_nivel(i, margem[i]), i))
+
+        if not registros and not sem_caminhao:
+            return pd.DataFrame(columns=COLUNAS_PROGRAMACAO)
+        registros += [(i, 0, np.nan, np.nan, np.nan, limite) for i, limite in sem_caminhao]
+        silo, caminhao, hora, quantidade, peso_antes, limite = (np.array(coluna) for coluna in zip(*registros))
+        referencia = pd.Timestamp(referencia)
+        programacao = pd.DataFrame({
+            'aviario_num': [chaves[i] for i in silo],
+            'caminhao': pd.array(caminhao, dtype='Int64'),
+            'data_entrega': referencia + pd.to_timedelta(hora, unit='h'),
+            'quantidade_kg': quantidade,
+            'peso_antes_kg': peso_antes,
+            'peso_depois_kg': peso_antes + quantidade,
+            'data_limite': referencia + pd.to_timedelta(limite, unit='h'),
+            'folga_horas': limite - hora,
+        })
+        programacao.loc[programacao['data_entrega'].isna(), 'caminhao'] = pd.NA
+        return programacao.sort_values(['data_entrega', 'caminhao'], kind='stable', ignore_index=True)
+
+def _por_silo(valor, chaves, nome):
+    """Valor de cada silo de `chaves`, a partir de um número ou de um mapeamento silo -> valor."""
+    if np.isscalar(valor):
+        return np.full(len(chaves), float(valor))
+    valores = pd.Series([valor.get(chave, np.nan) for chave in chaves], dtype=float)
+    if valores.isna().any():
+        faltando = [chaves[i] for i in np.flatnonzero(valores.isna())]
+        raise ValueError(f"{nome} não informado para: {', '.join(map(str, faltando))}")
+    return valores.to_numpy()
@@ -1,56 +1,110 @@
-from fpdf import FPDF
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+import functools
 import io
-import tempfile # Import tempfile
-import os       # Import os
-
-class PDFReportGenerator(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 12)
-        self.cell(0, 10, 'Relatório de Autonomia de Ração', 0, 1, 'C')
-        self.ln(10)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Página {self.page_no()}/{{nb}}', 0, 0, 'C')
-
-    def chapter_title(self, title):
-        self.set_font('Arial', 'B', 12)
-        self.cell(0, 10, title, 0, 1, 'L')
-        self.ln(5)
-
-    def chapter_body(self, body):
-        self.set_font('Arial', '', 10)
-        self.multi_cell(0, 10, body)
-        self.ln()
-
-    def add_plot(self, plot_fig):
-        # Save the plot to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmpfile:
-            plot_fig.savefig(tmpfile.name, format='png')
-            tmp_path = tmpfile.name
-
-        # Add the image to the PDF using the temporary file path
-        self.image(tmp_path, x=10, w=self.w - 20) # No need for type='png' if it's a file path
-
-        # Close the plot figure to free memory
-        plt.close(plot_fig) # Ensure plot_fig is closed after saving
-
-        # Delete the temporary file
-        os.remove(tmp_path)
-
-        self.ln(10)
-
-    def add_aviary_report(self, report_string, plot_fig, aviario_num):
-        self.add_page()
-        self.chapter_title(f'Aviário {aviario_num}')
-        self.chapter_body(report_string)
-        self.add_plot(plot_fig)
-
-    def generate_full_report(self, forecaster_instances, output_path):
-        self.alias_nb_pages()
-        for aviario_num, forecaster_instance in sorted(forecaster_instances.items()):
-            self.add_aviary_report(forecaster_instance.report_string, forecaster_instance.plot_fig, aviario_num)
-        
-        self.output(output_path)
\ No newline at end of file
+
+from .metricas import etapa
+from .graficos import pyplot
+
+def _rasterize_plot(forecaster_instance, dpi):
+    # Executado em um processo auxiliar: desenha o gráfico do aviário e retorna os bytes do PNG
+    pyplot().switch_backend('Agg')
+    return forecaster_instance.grafico_png(dpi)
+
+@functools.lru_cache(maxsize=None)
+def _documento_pdf():
+    # Classe do documento criada na primeira geração de PDF, para que o fpdf só seja importado quando usado
+    from fpdf import FPDF
+
+    class DocumentoPDF(FPDF):
+        def __init__(self, dpi=100):
+            super().__init__()
+            # Resolução usada para rasterizar figuras do matplotlib recebidas em add_plot
+            self.dpi = dpi
+
+        def header(self):
+            self.set_font('Arial', 'B', 12)
+            self.cell(0, 10, 'Relatório de Autonomia de Ração', 0, 1, 'C')
+            self.ln(10)
+
+        def footer(self):
+            self.set_y(-15)
+            self.set_font('Arial', 'I', 8)
+            self.cell(0, 10, f'Página {self.page_no()}/{{nb}}', 0, 0, 'C')
+
+        def chapter_title(self, title):
+            self.set_font('Arial', 'B', 12)
+            self.cell(0, 10, title, 0, 1, 'L')
+            self.ln(5)
+
+        def chapter_body(self, body):
+            self.set_font('Arial', '', 10)
+            self.multi_cell(0, 10, body)
+            self.ln()
+
+        def add_plot(self, plot):
+            # Aceita bytes de PNG ou uma figura do matplotlib, que é renderizada em memória e fechada
+            if not isinstance(plot, bytes):
+                buffer = io.BytesIO()
+                plot.savefig(buffer, format='png', dpi=self.dpi)
+                pyplot().close(plot) # Fecha a figura depois de salvá-la
+                plot = buffer.getvalue()
+
+            self.image(io.BytesIO(plot), x=10, w=self.w - 20)
+            self.ln(10)
+
+        def add_aviary_report(self, report_string, plot, aviario_num):
+            self.add_page()
+            self.chapter_title(f'Aviário {aviario_num}')
+            self.chapter_body(report_string)
+            self.add_plot(plot)
+
+    return DocumentoPDF
+
+class PDFReportGenerator:
+    def __init__(self, dpi=100, compress=True, workers=None):
+        # Resolução usada para rasterizar os gráficos e se o conteúdo das páginas é comprimido
+        self.dpi = dpi
+        self.compress = compress
+        # Processos usados para desenhar os gráficos antes de montar o PDF (None/1 = em série)
+        self.workers = workers
+
+    def rasterize_plots(self, forecaster_instances):
+        """Desenha o gráfico de cada aviário em PNG (bytes), em paralelo quando workers > 1."""
+        pngs = {}
+        pending = {}
+        for aviario_num, forecaster_instance in forecaster_instances.items():
+            if forecaster_instance.plot_png is not None and forecaster_instance.plot_png_dpi == self.dpi:
+                pngs[aviario_num] = forecaster_instance.plot_png
+            else:
+                pending[aviario_num] = forecaster_instance
+
+        if self.workers and self.workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                # Só os resultados de cada aviário vão para os processos, nunca as leituras brutas dos sensores
+                futures = {
+                    aviario_num: executor.submit(_rasterize_plot, forecaster_instance.copia_resultados(), self.dpi)
+                    for aviario_num, forecaster_instance in pending.items()
+                }
+                for aviario_num, future in futures.items():
+                    pngs[aviario_num] = future.result()
+        else:
+            for aviario_num, forecaster_instance in pending.items():
+                pngs[aviario_num] = forecaster_instance.grafico_png(self.dpi)
+        return pngs
+
+    def generate_full_report(self, forecaster_instances, output_path=None):
+        """Monta uma página por aviário; retorna o PDF em bytes quando output_path não é informado."""
+        with etapa('pdf', linhas=len(forecaster_instances)):
+            documento = _documento_pdf()(dpi=self.dpi)
+            documento.set_compression(self.compress)
+            documento.alias_nb_pages()
+            with etapa('pdf_rasterizar', linhas=len(forecaster_instances)):
+                pngs = self.rasterize_plots(forecaster_instances)
+            with etapa('pdf_montar_paginas', linhas=len(forecaster_instances)):
+                for aviario_num, forecaster_instance in sorted(forecaster_instances.items()):
+                    documento.add_aviary_report(forecaster_instance.relatorio(), pngs[aviario_num], aviario_num)
+
+            with etapa('pdf_gravar'):
+                if output_path is None:
+                    return bytes(documento.output())
+                documento.output(output_path)
@@ -0,0 +1,81 @@
+import glob
+import os
+import queue
+import threading
+
+class VigiaPasta:
+    """Observa uma pasta por arquivos novos ou alterados e os entrega em uma fila limitada.
+
+    A pasta é varrida a cada `intervalo_s` segundos (sem depender de inotify).
+    Um arquivo só entra na fila quando a data de modificação e o tamanho não
+    mudam entre duas varreduras, para não ler uma exportação ainda sendo
+    copiada. A fila comporta `max_fila` arquivos: cheia, a varredura espera
+    o consumidor, e os arquivos seguintes ficam para as próximas varreduras.
+    """
+
+    def __init__(self, pasta, padrao='*.csv', intervalo_s=5.0, max_fila=16):
+        self.pasta = pasta
+        self.padrao = padrao
+        self.intervalo_s = intervalo_s
+        self.fila = queue.Queue(maxsize=max_fila)
+        self._enfileirados = {} # caminho -> (mtime_ns, tamanho) já colocado na fila
+        self._vistos = {} # caminho -> (mtime_ns, tamanho) da varredura anterior
+        self._parar = threading.Event()
+        self._thread = None
+
+    def varrer(self):
+        """Arquivos novos ou alterados que estão estáveis desde a varredura anterior."""
+        atuais = {}
+        for caminho in sorted(glob.glob(os.path.join(self.pasta, self.padrao))):
+            try:
+                info = os.stat(caminho)
+            except OSError:
+                continue # Removido durante a varredura
+            atuais[caminho] = (info.st_mtime_ns, info.st_size)
+
+        prontos = [
+            caminho for caminho, assinatura in atuais.items()
+            if self._vistos.get(caminho) == assinatura and self._enfileirados.get(caminho) != assinatura
+        ]
+        self._vistos = atuais
+        return prontos
+
+    def _executar(self):
+        while not self._parar.is_set():
+            for caminho in self.varrer():
+                assinatura = self._vistos[caminho]
+                # Fila cheia: a varredura espera aqui (sem acumular trabalho) até o consumidor liberar espaço
+                while not self._parar.is_set():
+                    try:
+                        self.fila.put(caminho, timeout=self.intervalo_s)
+                    except queue.Full:
+                        continue
+                    self._enfileirados[caminho] = assinatura
+                    break
+            self._parar.wait(self.intervalo_s)
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._executar, name='vigia-pasta', daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def proximos(self, timeout=None):
+        """Espera o próximo arquivo e retorna todos os que já estiverem na fila (sem repetição).
+
+        Uma rajada de arquivos vira um único lote de trabalho. Retorna lista
+        vazia se nada chegar em `timeout` segundos.
+        """
+        try:
+            arquivos = [self.fila.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                arquivos.append(self.fila.get_nowait())
+            except queue.Empty:
+                return list(dict.fromkeys(arquivos))
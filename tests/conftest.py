@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_PROJETO)
+
+from src.data_handler import compactar_sensores  # noqa: E402
+
+PASTA_LINHAGEM = os.path.join(PASTA_PROJETO, 'static', 'linhagem')
+
+
+def gerar_leituras(aviarios=(1,), fim='2025-03-10 12:00', horas=72, peso_inicial_kg=8000.0, consumo_kg_h=40.0,
+                   canais=2, intervalo_min=10, entregas=None):
+    """Leituras sintéticas no esquema compacto (como importar_sensores(..., compacto=True)).
+
+    O peso de cada aviário começa em `peso_inicial_kg` e cai `consumo_kg_h` por
+    hora, dividido igualmente entre os `canais`; `entregas` mapeia um instante
+    para os kg somados ao aviário a partir dele.
+    """
+    instantes = pd.date_range(end=pd.Timestamp(fim), periods=horas * 60 // intervalo_min, freq=f'{intervalo_min}min')
+    horas_decorridas = (instantes - instantes[0]) / pd.Timedelta(hours=1)
+    peso = peso_inicial_kg - consumo_kg_h * horas_decorridas.to_numpy()
+    for instante, quantidade in (entregas or {}).items():
+        peso = peso + np.where(instantes >= pd.Timestamp(instante), quantidade, 0.0)
+
+    partes = []
+    for aviario in aviarios:
+        for canal in range(1, canais + 1):
+            partes.append(pd.DataFrame({
+                'value': peso / canais,
+                'collector': f'Aviário {aviario}',
+                'channel': f'Silo {canal}',
+            }, index=pd.Index(instantes, name='timedate')))
+    return compactar_sensores(pd.concat(partes).sort_index(kind='stable'))
+
+
+def gravar_exportacao(leituras, caminho, colunas=('Date', 'Hour', 'Collector', 'Channel', 'Value'), seed=None):
+    """Grava leituras no formato do eProdutor (linha de título, ';' e vírgula decimal), opcionalmente embaralhadas."""
+    data, hora, coletor, canal, valor = colunas
+    df = pd.DataFrame({
+        data: leituras.index.strftime('%d/%m/%Y'),
+        hora: leituras.index.strftime('%H:%M:%S'),
+        coletor: leituras['collector'].astype(str).to_numpy(),
+        canal: leituras['channel'].astype(str).to_numpy(),
+        valor: leituras['value'].astype(float).round(2).to_numpy(),
+    })
+    if seed is not None:
+        df = df.sample(frac=1, random_state=seed)
+    with open(caminho, 'w', encoding='utf-8', newline='') as f:
+        f.write('Monitoramento de Sensores - PESO DO SILO\n')
+        df.to_csv(f, sep=';', index=False, decimal=',')
+
+
+@pytest.fixture
+def pasta_linhagem():
+    return PASTA_LINHAGEM
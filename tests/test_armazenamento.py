@@ -0,0 +1,68 @@
+"""Histórico de leituras em SQLite (ArmazemSensores)."""
+import sqlite3
+from datetime import date
+
+import pandas as pd
+
+from conftest import gerar_leituras, gravar_exportacao
+from src.armazenamento import ArmazemSensores
+from src.data_handler import importar_sensores
+from src.forecaster import SiloForecaster
+
+FIM = pd.Timestamp('2025-03-10 12:00')
+
+
+def comparavel(df):
+    """Leituras com collector e channel em texto, ordenadas, para comparar frames de origens diferentes."""
+    df = df[['collector', 'channel', 'value', 'aviario_num']].astype({'collector': str, 'channel': str, 'aviario_num': 'int64'})
+    return df.reset_index().sort_values(['timedate', 'collector', 'channel'], kind='stable').reset_index(drop=True)
+
+
+def test_reimportacao_nao_duplica_leituras(tmp_path):
+    armazem = ArmazemSensores(str(tmp_path / 'historico.sqlite'))
+    leituras = gerar_leituras(aviarios=(1, 2), fim=FIM, horas=24)
+    primeira = leituras[leituras.index < FIM - pd.Timedelta(hours=6)]
+    # A segunda exportação repete as últimas 12 horas da primeira
+    segunda = leituras[leituras.index >= FIM - pd.Timedelta(hours=18)]
+
+    assert armazem.adicionar(primeira) == len(primeira)
+    assert armazem.adicionar(primeira) == 0
+    assert armazem.adicionar(segunda) == len(leituras) - len(primeira)
+    assert armazem.adicionar(pd.concat([segunda, segunda])) == 0
+
+    with sqlite3.connect(armazem.caminho) as conexao:
+        total, = conexao.execute('SELECT COUNT(*) FROM leituras').fetchone()
+        series, = conexao.execute('SELECT COUNT(*) FROM series').fetchone()
+    assert total == len(leituras) and series == 4
+    pd.testing.assert_frame_equal(comparavel(armazem.consultar()), comparavel(leituras))
+    assert armazem.aviarios() == [1, 2]
+    assert armazem.ultima_leitura([2]) == leituras.index.max()
+
+
+def test_consulta_por_janela_igual_a_leitura_do_csv(tmp_path):
+    caminho = tmp_path / 'Sensores.csv'
+    gravar_exportacao(gerar_leituras(aviarios=(1, 2, 3), fim=FIM), caminho, seed=0)
+    armazem = ArmazemSensores(str(tmp_path / 'historico.sqlite'))
+    df_csv = importar_sensores(caminho, rapido=True, armazem=armazem, compacto=True)
+
+    inicio, fim = FIM - pd.Timedelta(hours=30), FIM - pd.Timedelta(hours=5, minutes=10)
+    esperado = df_csv[df_csv['aviario_num'].isin([1, 3]) & (df_csv.index >= inicio) & (df_csv.index <= fim)]
+    consulta = armazem.consultar([1, 3], inicio=inicio, fim=fim)
+
+    assert consulta.index.dtype == df_csv.index.dtype and consulta['value'].dtype == df_csv['value'].dtype
+    assert consulta.index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(comparavel(consulta), comparavel(esperado))
+    assert armazem.consultar(2, inicio=FIM + pd.Timedelta(hours=1)).empty
+
+
+def test_previsao_pelo_historico_igual_a_previsao_pelo_csv(tmp_path, pasta_linhagem):
+    caminho = tmp_path / 'Sensores.csv'
+    gravar_exportacao(gerar_leituras(aviarios=(1, 2), fim=FIM), caminho)
+    armazem = ArmazemSensores(str(tmp_path / 'historico.sqlite'))
+    df_csv = importar_sensores(caminho, rapido=True, armazem=armazem, compacto=True)
+    lotes = {aviario: dict(data_alojamento=date(2025, 2, 15), linhagem='cobb', n_aves=25000) for aviario in (1, 2)}
+
+    pelo_csv, _ = SiloForecaster(df_csv, pasta_linhagem, str(tmp_path)).run_batch(lotes, gerar_relatorios=False)
+    pelo_historico, _ = SiloForecaster(None, pasta_linhagem, str(tmp_path), armazem=armazem).run_batch(
+        lotes, gerar_relatorios=False)
+    pd.testing.assert_frame_equal(pelo_historico, pelo_csv)
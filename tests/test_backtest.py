@@ -0,0 +1,45 @@
+"""O backtest (backtest.backtest_aviario) reproduz, em cada corte, a previsão feita só com o histórico até ele."""
+import tempfile
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import gerar_leituras
+from src.backtest import backtest_aviario
+from src.forecaster import SiloForecaster
+
+FIM = pd.Timestamp('2025-03-10 12:00')
+
+
+@pytest.mark.parametrize('sobra_inicial_kg, idade_diluicao_start', [(0.0, 19), (1500.0, 26)])
+def test_cortes_iguais_a_previsao_com_historico_truncado(pasta_linhagem, sobra_inicial_kg, idade_diluicao_start):
+    # Leituras com ruído e uma entrega no meio do histórico
+    leituras = gerar_leituras(fim=FIM, horas=96, entregas={FIM - pd.Timedelta(hours=40): 5000.0})
+    rng = np.random.default_rng(7)
+    leituras['value'] = (leituras['value'] * (1 + 0.002 * rng.standard_normal(len(leituras)))).astype('float32')
+    parametros = (1, date(2025, 2, 15), 'cobb', 25000, idade_diluicao_start, sobra_inicial_kg)
+
+    previsao = SiloForecaster(leituras, pasta_linhagem, tempfile.gettempdir())
+    previsao.calcular_previsao(*parametros)
+    df_backtest = backtest_aviario(previsao.df_hourly, previsao.tabela_consumo, previsao.n_aves,
+                                   previsao.data_alojamento, idade_diluicao_start, sobra_inicial_kg)
+    assert len(df_backtest) > 40
+
+    for corte, linha in df_backtest.iterrows():
+        truncada = SiloForecaster(leituras[leituras.index < corte + pd.Timedelta(hours=1)], pasta_linhagem,
+                                  tempfile.gettempdir())
+        resultado = truncada.calcular_previsao(*parametros)
+        assert resultado.ultima_leitura == corte
+        # Somas acumuladas no backtest, média das leituras float32 na previsão: iguais até a precisão do float32
+        assert linha['fator_consumo'] == pytest.approx(resultado.fator_consumo, rel=1e-6)
+        assert linha['peso_kg'] == pytest.approx(resultado.peso_atual_kg)
+
+        horas = (resultado.data_esgotamento - corte) / pd.Timedelta(hours=1)
+        if np.isnan(linha['horas_esgotamento']):
+            # Sem esgotamento nos 30 dias: a projeção termina acima de zero
+            assert truncada.forecast_series.iloc[-1] > 0
+        else:
+            assert linha['horas_esgotamento'] == horas
+            assert linha['data_esgotamento'] == resultado.data_esgotamento
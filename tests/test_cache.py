@@ -0,0 +1,111 @@
+"""Cache de resultados das previsões (CacheResultados) usado pelo SiloForecaster."""
+import os
+import shutil
+import tempfile
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import gerar_leituras
+from src.cache import CacheResultados
+from src.forecaster import SiloForecaster
+
+PARAMETROS = (1, date(2025, 2, 15), 'cobb', 25000, 19, 0.0)
+LOTES = {aviario: dict(data_alojamento=date(2025, 2, 15), linhagem='cobb', n_aves=25000) for aviario in (1, 2)}
+
+
+def prever(cache, pasta_linhagem, leituras=None):
+    previsao = SiloForecaster(gerar_leituras() if leituras is None else leituras, pasta_linhagem,
+                              tempfile.gettempdir(), cache_resultados=cache)
+    previsao.calcular_previsao(*PARAMETROS)
+    return previsao
+
+
+def test_tabela_da_linhagem_editada_invalida_a_previsao(tmp_path):
+    pasta_linhagem = tmp_path / 'linhagem'
+    shutil.copytree(os.path.join(os.path.dirname(__file__), '..', 'static', 'linhagem'), pasta_linhagem)
+    cache = CacheResultados(pasta=str(tmp_path / 'cache'))
+    original = prever(cache, str(pasta_linhagem))
+    assert prever(cache, str(pasta_linhagem)).fator_consumo == original.fator_consumo
+    assert cache.estatisticas()['acertos_memoria'] == 1
+
+    # Consumo da tabela 10% maior: o registro relê o Excel e a chave do cache muda
+    caminho = pasta_linhagem / 'cobb.xlsx'
+    tabela = pd.read_excel(caminho)
+    tabela['consumo'] = tabela['consumo'] * 1.1
+    tabela.to_excel(caminho, index=False)
+    os.utime(caminho, (os.path.getatime(caminho), os.path.getmtime(caminho) + 10))
+
+    editada = prever(cache, str(pasta_linhagem))
+    assert editada.fator_consumo == pytest.approx(original.fator_consumo / 1.1)
+    assert cache.estatisticas()['faltas'] == 2
+
+
+def test_arquivos_do_cache_tem_a_versao_no_nome(tmp_path, pasta_linhagem):
+    cache = CacheResultados(pasta=str(tmp_path))
+    prever(cache, pasta_linhagem)
+    assert [arquivo.name.split('_')[1] for arquivo in tmp_path.iterdir()] == [f'v{CacheResultados.VERSAO}']
+    cache.limpar(disco=True)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cenarios_nao_alteram_a_previsao_guardada(pasta_linhagem):
+    cache = CacheResultados()
+    com_cenarios = prever(cache, pasta_linhagem)
+    com_cenarios.simular_cenarios(200, seed=1)
+    com_cenarios.grafico_png(dpi=50)
+
+    restaurada = prever(cache, pasta_linhagem)
+    assert cache.estatisticas()['acertos_memoria'] == 1
+    assert restaurada.cenarios is None and restaurada.resultado.cenarios is None
+    assert restaurada.plot_png is None
+
+
+def test_cenarios_em_cache_dependem_da_semente(pasta_linhagem):
+    cache = CacheResultados()
+
+    def cenarios(seed):
+        forecaster = SiloForecaster(gerar_leituras(aviarios=(1, 2)), pasta_linhagem, tempfile.gettempdir(),
+                                    cache_resultados=cache)
+        _, previsoes = forecaster.run_batch(LOTES, gerar_relatorios=False, n_cenarios=200, seed=seed)
+        return {aviario: previsao.cenarios.fatores_consumo for aviario, previsao in previsoes.items()}
+
+    primeira = cenarios(1)
+    outra_semente = cenarios(2)
+    assert not any(np.array_equal(primeira[aviario], outra_semente[aviario]) for aviario in LOTES)
+
+    gravacoes = cache.estatisticas()['gravacoes']
+    repetida = cenarios(1)
+    assert all(repetida[aviario] is primeira[aviario] for aviario in LOTES)
+    assert cache.estatisticas()['gravacoes'] == gravacoes
+
+    # Sem semente, os cenários são sorteados de novo e não vão para o cache
+    cenarios(None)
+    assert cache.estatisticas()['gravacoes'] == gravacoes
+
+
+def test_grafico_tem_entrada_propria_no_cache(tmp_path, pasta_linhagem, monkeypatch):
+    cache = CacheResultados(pasta=str(tmp_path))
+    previsao = prever(cache, pasta_linhagem)
+    arquivo_previsao, = tmp_path.iterdir()
+    gravada = arquivo_previsao.stat().st_mtime_ns, arquivo_previsao.read_bytes()
+
+    png = previsao.grafico_png(dpi=50)
+    previsao.plot_png = None
+    assert previsao.grafico_png(dpi=50) == png
+    # Um arquivo a mais (o PNG); a previsão gravada não é regravada a cada gráfico
+    assert len(list(tmp_path.iterdir())) == 2 and cache.estatisticas()['gravacoes'] == 2
+    assert (arquivo_previsao.stat().st_mtime_ns, arquivo_previsao.read_bytes()) == gravada
+
+    # Em outro processo, a previsão restaurada reaproveita o PNG sem desenhar o gráfico
+    monkeypatch.setattr(SiloForecaster, 'grafico', lambda self: pytest.fail('gráfico redesenhado'))
+    restaurada = prever(CacheResultados(pasta=str(tmp_path)), pasta_linhagem)
+    assert restaurada.plot_png is None
+    assert restaurada.grafico_png(dpi=50) == png
+
+    # Com cenários, o gráfico (com as faixas) é outro
+    monkeypatch.undo()
+    restaurada.simular_cenarios(200, seed=1)
+    assert restaurada.grafico_png(dpi=50) != png
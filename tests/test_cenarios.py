@@ -0,0 +1,60 @@
+"""Projeção por cenários (SiloForecaster.simular_cenarios)."""
+import tempfile
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import gerar_leituras
+from src.forecaster import SiloForecaster
+
+
+@pytest.fixture
+def previsao(pasta_linhagem):
+    # Leituras com ruído, para que o consumo horário varie entre as horas
+    leituras = gerar_leituras(fim='2025-03-10 12:00', horas=96)
+    rng = np.random.default_rng(0)
+    leituras['value'] = (leituras['value'] * (1 + 0.003 * rng.standard_normal(len(leituras)))).astype('float32')
+    previsao = SiloForecaster(leituras, pasta_linhagem, tempfile.gettempdir())
+    previsao.calcular_previsao(1, date(2025, 2, 15), 'cobb', 25000, 24, 1500.0)
+    return previsao
+
+
+def horas(data, previsao):
+    """Horas até o esgotamento a partir da última leitura (inf quando além do horizonte)."""
+    return np.inf if data is None else (data - previsao.resultado.ultima_leitura) / pd.Timedelta(hours=1)
+
+
+@pytest.mark.parametrize('quantis', [(0.1, 0.5, 0.9), (0.05, 0.25, 0.5, 0.75, 0.95)])
+def test_quantis_ordenados(previsao, quantis):
+    cenarios = previsao.simular_cenarios(1000, quantis=quantis, seed=3)
+
+    assert cenarios.fatores_consumo.std() > 0
+    esgotamentos = [horas(cenarios.datas_esgotamento[quantil], previsao) for quantil in quantis]
+    assert esgotamentos == sorted(esgotamentos)
+    assert list(cenarios.bandas.columns) == [f'p{quantil * 100:.0f}' for quantil in quantis]
+    # Em cada hora, o peso do quantil menor nunca passa o do maior
+    assert (np.diff(cenarios.bandas.to_numpy(), axis=1) >= 0).all()
+    assert 0 <= cenarios.fracao_esgotada <= 1
+    # A previsão determinística fica dentro da janela dos cenários
+    mais_cedo, mais_tarde = cenarios.janela_esgotamento
+    assert horas(mais_cedo, previsao) <= horas(previsao.resultado.data_esgotamento, previsao) <= horas(mais_tarde, previsao)
+    assert previsao.resultado.cenarios is cenarios
+
+
+def test_mesma_semente_mesmos_cenarios(previsao):
+    primeira = previsao.simular_cenarios(500, seed=11)
+    repetida = previsao.simular_cenarios(500, seed=11)
+    outra = previsao.simular_cenarios(500, seed=12)
+
+    np.testing.assert_array_equal(repetida.fatores_consumo, primeira.fatores_consumo)
+    np.testing.assert_array_equal(repetida.horas_esgotamento, primeira.horas_esgotamento)
+    pd.testing.assert_frame_equal(repetida.bandas, primeira.bandas)
+    assert repetida.datas_esgotamento == primeira.datas_esgotamento
+    assert not np.array_equal(outra.fatores_consumo, primeira.fatores_consumo)
+
+
+def test_cenarios_exigem_previsao(pasta_linhagem):
+    with pytest.raises(ValueError, match='calcular_previsao'):
+        SiloForecaster(gerar_leituras(), pasta_linhagem, tempfile.gettempdir()).simular_cenarios(10, seed=1)
@@ -0,0 +1,102 @@
+"""A detecção de entregas em uma única passada (entregas.detectar_entregas) reproduz o laço original por aviário."""
+import tempfile
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import gerar_leituras
+from src.entregas import detectar_entregas, entregas_do_aviario
+from src.forecaster import SiloForecaster
+
+
+def detectar_entregas_original(df_hourly, threshold_kg=500):
+    """Cópia do SiloForecaster._detectar_entregas original, aplicado a um aviário por vez."""
+    df_hourly['mudanca_peso'] = df_hourly['peso_silo'].diff()
+    entregas_raw = df_hourly[df_hourly['mudanca_peso'] > threshold_kg].copy()
+
+    if entregas_raw.empty:
+        return pd.DataFrame(columns=['Quantidade (kg)'], index=pd.Index([], name='Data da Entrega'))
+
+    group_id = (entregas_raw.index.to_series().diff() > pd.Timedelta('1 hour')).cumsum()
+
+    entregas_agrupadas = entregas_raw.groupby(group_id).agg(
+        data_entrega=('mudanca_peso', 'idxmin'),
+        quantidade_kg=('mudanca_peso', 'sum')
+    )
+    entregas_agrupadas.set_index('data_entrega', inplace=True)
+    entregas_agrupadas.index.name = 'Data da Entrega'
+    return entregas_agrupadas
+
+
+def peso_horario(rng, horas=240, n_entregas=6):
+    """Peso horário de um silo: consumo com ruído, entregas de 1 a 3 horas e algumas horas sem leitura."""
+    instantes = pd.date_range('2025-03-01', periods=horas, freq='h')
+    variacao = -rng.uniform(20, 60, horas)
+    for inicio in rng.choice(np.arange(1, horas - 3), n_entregas, replace=False):
+        duracao = rng.integers(1, 4)
+        variacao[inicio:inicio + duracao] += rng.uniform(1500, 4000, duracao)
+    peso = pd.Series(12000 + np.cumsum(variacao), index=instantes)
+    return peso.drop(instantes[rng.choice(horas, horas // 20, replace=False)])
+
+
+def comparar_com_original(pesos, limiar_kg=500):
+    """Entregas da passada única sobre a granja iguais às do laço original em cada aviário."""
+    peso_granja = pd.concat(pesos, names=['aviario_num', 'timedate'])
+    entregas_granja = detectar_entregas(peso_granja, limiar_kg)
+    for aviario, peso in pesos.items():
+        esperado = detectar_entregas_original(peso.to_frame('peso_silo'), limiar_kg)
+        obtido = entregas_do_aviario(entregas_granja, aviario)
+        pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False, check_index_type=False)
+        pd.testing.assert_frame_equal(entregas_do_aviario(detectar_entregas(peso, limiar_kg)), esperado,
+                                      check_dtype=False, check_index_type=False)
+    return entregas_granja
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_varios_aviarios_iguais_ao_laco_original(seed):
+    rng = np.random.default_rng(seed)
+    entregas = comparar_com_original({aviario: peso_horario(rng) for aviario in (1, 2, 5, 7)})
+    assert entregas['horas'].max() > 1
+
+
+def test_entregas_nas_bordas_das_series():
+    horas = pd.date_range('2025-03-01', periods=12, freq='h')
+    pesos = {
+        # Entrega na última hora do aviário 1; o aviário 2 começa bem acima dele, o que não é uma entrega
+        1: pd.Series([3000, 2960, 2920, 2880, 2840, 2800, 2760, 2720, 2680, 2640, 2600, 6000.0], index=horas),
+        # Entrega na segunda hora (a primeira diferença da série), uma em duas horas seguidas e outra isolada
+        2: pd.Series([9000, 12000, 11960, 11920, 13000, 14000, 13960, 13920, 15500, 15460, 15420, 15380.0],
+                     index=horas),
+        # Sem entregas
+        3: pd.Series(np.linspace(8000, 7500, 12), index=horas),
+    }
+    entregas = comparar_com_original(pesos)
+    assert list(entregas['aviario_num']) == [1, 2, 2, 2]
+    assert list(entregas['horas']) == [1, 1, 2, 1]
+    assert entregas['data_entrega'].iloc[0] == horas[-1]
+
+
+def test_limiar_por_aviario():
+    rng = np.random.default_rng(42)
+    pesos = {aviario: peso_horario(rng) for aviario in (1, 2)}
+    peso_granja = pd.concat(pesos, names=['aviario_num', 'timedate'])
+    entregas = detectar_entregas(peso_granja, {1: 500, 2: 2500})
+    for aviario, limiar in ((1, 500), (2, 2500)):
+        pd.testing.assert_frame_equal(entregas_do_aviario(entregas, aviario),
+                                      detectar_entregas_original(pesos[aviario].to_frame('peso_silo'), limiar),
+                                      check_dtype=False, check_index_type=False)
+
+
+def test_entregas_do_run_batch_iguais_ao_laco_original(pasta_linhagem):
+    fim = pd.Timestamp('2025-03-10 12:00')
+    leituras = gerar_leituras(aviarios=(1, 2, 3), fim=fim, entregas={fim - pd.Timedelta(hours=30): 5000.0,
+                                                                     fim - pd.Timedelta(hours=5): 7000.0})
+    lotes = {aviario: dict(data_alojamento=date(2025, 2, 15), linhagem='cobb', n_aves=25000) for aviario in (1, 2, 3)}
+    _, previsoes = SiloForecaster(leituras, pasta_linhagem, tempfile.gettempdir()).run_batch(lotes, gerar_relatorios=False)
+
+    for previsao in previsoes.values():
+        esperado = detectar_entregas_original(previsao.df_hourly.copy())
+        assert len(esperado) == 2
+        pd.testing.assert_frame_equal(previsao.df_entregas, esperado, check_dtype=False, check_index_type=False)
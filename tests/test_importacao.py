@@ -0,0 +1,83 @@
+"""Leitura do Sensores.csv completa e em blocos (médias horárias)."""
+import tempfile
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import gerar_leituras, gravar_exportacao
+from src.data_handler import importar_sensores, importar_sensores_horario
+from src.forecaster import SiloForecaster
+
+
+@pytest.mark.parametrize('linhas_por_bloco', [37, 500, 1_000_000])
+def test_medias_horarias_iguais_as_da_leitura_completa(tmp_path, linhas_por_bloco):
+    caminho = tmp_path / 'Sensores.csv'
+    gravar_exportacao(gerar_leituras(aviarios=(1, 2, 3), horas=30), caminho, seed=0)
+
+    completo = importar_sensores(caminho, rapido=True, compacto=True)
+    esperado = completo.groupby(['aviario_num', 'channel'], observed=True)['value'].resample('h').agg(['mean', 'count'])
+    horario = importar_sensores_horario(caminho, linhas_por_bloco=linhas_por_bloco)
+    obtido = horario.set_index(['aviario_num', 'channel'], append=True).reorder_levels([1, 2, 0]).sort_index()
+
+    assert obtido.index.equals(esperado.index)
+    np.testing.assert_allclose(obtido['value'], esperado['mean'], rtol=1e-6)
+    np.testing.assert_array_equal(obtido['leituras'], esperado['count'])
+    # Mesmo esquema compacto da leitura completa (o app exige a coluna collector)
+    assert {'collector', 'channel', 'value', 'aviario_num'} <= set(horario.columns)
+    assert horario.index.is_monotonic_increasing
+
+
+def test_coletores_do_mesmo_aviario_ponderados_pelas_leituras(tmp_path):
+    # Duas balanças no aviário 1, com pesos e intervalos de leitura diferentes
+    balanca_a = gerar_leituras(aviarios=(1,), horas=12, intervalo_min=10)
+    balanca_b = gerar_leituras(aviarios=(1,), horas=12, intervalo_min=4, peso_inicial_kg=9100.0)
+    balanca_b['collector'] = 'Aviario 1 - Balança B'
+    leituras = pd.concat([balanca_a, balanca_b])
+    caminho = tmp_path / 'Sensores.csv'
+    gravar_exportacao(leituras, caminho, seed=1)
+
+    # Média de todas as leituras gravadas (com 2 casas) de cada hora, em float64
+    gravadas = leituras.assign(value=leituras['value'].astype(float).round(2), hora=leituras.index.floor('h'))
+    esperado = gravadas.groupby(['channel', 'hora'])['value'].agg(['mean', 'count'])
+    horario = importar_sensores_horario(caminho, linhas_por_bloco=50)
+    obtido = horario.set_index('channel', append=True).reorder_levels([1, 0]).sort_index()
+
+    assert set(horario['aviario_num']) == {1} and horario['value'].dtype == np.float64
+    np.testing.assert_array_equal(obtido['leituras'], esperado['count'])
+    np.testing.assert_allclose(obtido['value'], esperado['mean'], rtol=1e-12)
+
+    # Mesmas médias horárias que a previsão calcula a partir da leitura completa
+    def medias(df_sensores):
+        medias_canais = SiloForecaster(df_sensores, None, None).medias_horarias(1)
+        return medias_canais.rename(columns=str).sort_index(axis=1)
+    completo = medias(importar_sensores(caminho, rapido=True, compacto=True))
+    pd.testing.assert_frame_equal(medias(horario), completo, check_dtype=False, check_freq=False,
+                                  check_column_type=False, rtol=1e-6)
+
+
+def test_aliases_em_portugues_e_coletor_sem_numero(tmp_path):
+    leituras = gerar_leituras(aviarios=(4,), horas=6)
+    leituras['collector'] = leituras['collector'].cat.add_categories(['Central'])
+    leituras.iloc[::5, leituras.columns.get_loc('collector')] = 'Central'
+    caminho = tmp_path / 'Sensores.csv'
+    gravar_exportacao(leituras, caminho, colunas=('Data', 'Hora', 'Coletor', 'Canal', 'Valor'))
+
+    horario = importar_sensores_horario(caminho, linhas_por_bloco=10)
+    assert set(horario['aviario_num']) == {4}
+    assert horario['leituras'].sum() == (leituras['collector'] != 'Central').sum()
+
+
+def test_previsao_com_medias_horarias(tmp_path, pasta_linhagem):
+    caminho = tmp_path / 'Sensores.csv'
+    gravar_exportacao(gerar_leituras(aviarios=(1, 2), horas=48), caminho)
+    lotes = {aviario: dict(data_alojamento=date(2025, 2, 15), linhagem='cobb', n_aves=25000) for aviario in (1, 2)}
+
+    completo, _ = SiloForecaster(importar_sensores(caminho, rapido=True, compacto=True), pasta_linhagem,
+                                 tempfile.gettempdir()).run_batch(lotes, gerar_relatorios=False)
+    horario, _ = SiloForecaster(importar_sensores_horario(caminho, linhas_por_bloco=100), pasta_linhagem,
+                                tempfile.gettempdir()).run_batch(lotes, gerar_relatorios=False)
+
+    pd.testing.assert_series_equal(horario['data_esgotamento'], completo['data_esgotamento'])
+    np.testing.assert_allclose(horario['fator_consumo'], completo['fator_consumo'], rtol=1e-5)
@@ -0,0 +1,94 @@
+"""SiloForecaster.atualizar chega ao mesmo resultado da previsão completa com todas as leituras."""
+import tempfile
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import gerar_leituras
+from src.forecaster import SiloForecaster
+
+PARAMETROS = (1, date(2025, 2, 15), 'cobb', 25000, 19, 0.0)
+FIM = pd.Timestamp('2025-03-10 12:00')
+
+
+def prever(leituras, pasta_linhagem):
+    previsao = SiloForecaster(leituras, pasta_linhagem, tempfile.gettempdir())
+    previsao.calcular_previsao(*PARAMETROS)
+    return previsao
+
+
+def comparar(incremental, completa):
+    pd.testing.assert_frame_equal(incremental._medias_canais, completa._medias_canais, check_freq=False)
+    pd.testing.assert_frame_equal(incremental.df_hourly, completa.df_hourly, check_freq=False)
+    pd.testing.assert_frame_equal(incremental.df_entregas, completa.df_entregas, check_freq=False, check_index_type=False)
+    assert incremental.fator_consumo == pytest.approx(completa.fator_consumo, rel=1e-12)
+    pd.testing.assert_index_equal(incremental.forecast_series.index, completa.forecast_series.index, exact=False)
+    np.testing.assert_allclose(incremental.forecast_series.to_numpy(), completa.forecast_series.to_numpy(), rtol=1e-9)
+    assert incremental.resultado.data_esgotamento == completa.resultado.data_esgotamento
+
+
+def atualizar_em_partes(leituras, partes, pasta_linhagem):
+    """Previsão com `leituras` seguida de atualizar() com cada parte, comparada à previsão com tudo junto."""
+    previsao = prever(leituras, pasta_linhagem)
+    for parte in partes:
+        previsao.atualizar(parte, gerar_relatorio=False)
+    comparar(previsao, prever(pd.concat([leituras, *partes]).sort_index(kind='stable'), pasta_linhagem))
+    return previsao
+
+
+def dividir(leituras, *cortes):
+    """Divide as leituras nos instantes `cortes` (cada parte começa no corte, inclusive)."""
+    limites = [None, *map(pd.Timestamp, cortes), None]
+    return [leituras[(leituras.index >= inicio if inicio is not None else True)
+                     & (leituras.index < fim if fim is not None else True)]
+            for inicio, fim in zip(limites, limites[1:])]
+
+
+def test_blocos_acrescentados_ao_final(pasta_linhagem):
+    leituras = gerar_leituras(fim=FIM, entregas={FIM - pd.Timedelta(hours=10): 6000.0})
+    primeiro, *blocos = dividir(leituras, *pd.date_range(FIM - pd.Timedelta(hours=24), FIM, freq='4h'))
+    atualizar_em_partes(primeiro, blocos, pasta_linhagem)
+
+
+def test_corte_no_meio_da_hora(pasta_linhagem):
+    leituras = gerar_leituras(fim=FIM)
+    primeiro, *resto = dividir(leituras, FIM - pd.Timedelta(hours=5, minutes=35), FIM - pd.Timedelta(minutes=15))
+    atualizar_em_partes(primeiro, resto, pasta_linhagem)
+
+
+@pytest.mark.parametrize('horas_zeradas', [2, 6])
+def test_sequencia_de_zeros_atravessando_o_corte(pasta_linhagem, horas_zeradas):
+    # Até 3 horas zeradas são interpoladas; sequências maiores deixam um buraco no histórico
+    leituras = gerar_leituras(fim=FIM)
+    inicio_zeros = FIM - pd.Timedelta(hours=12)
+    zeradas = (leituras.index >= inicio_zeros) & (leituras.index < inicio_zeros + pd.Timedelta(hours=horas_zeradas))
+    leituras.loc[zeradas, 'value'] = 0
+    primeiro, resto = dividir(leituras, inicio_zeros + pd.Timedelta(hours=1, minutes=20))
+    atualizar_em_partes(primeiro, [resto], pasta_linhagem)
+
+
+def test_canal_deixa_de_enviar_leituras(pasta_linhagem):
+    leituras = gerar_leituras(fim=FIM, canais=3)
+    corte = FIM - pd.Timedelta(hours=8)
+    leituras = leituras[~((leituras['channel'] == 'Silo 3') & (leituras.index >= corte + pd.Timedelta(hours=2)))]
+    primeiro, resto = dividir(leituras, corte)
+    atualizar_em_partes(primeiro, [resto], pasta_linhagem)
+
+
+def test_leituras_atrasadas_de_horas_ja_agregadas(pasta_linhagem):
+    leituras = gerar_leituras(fim=FIM)
+    corte = FIM - pd.Timedelta(hours=6)
+    # O canal 1 manda com atraso as leituras de 30 horas antes do corte
+    atrasadas = ((leituras['channel'] == 'Silo 1') & (leituras.index >= corte - pd.Timedelta(hours=30))
+                 & (leituras.index < corte - pd.Timedelta(hours=28)))
+    primeiro, resto = dividir(leituras[~atrasadas], corte)
+    atualizar_em_partes(primeiro, [pd.concat([resto, leituras[atrasadas]])], pasta_linhagem)
+
+
+def test_leituras_anteriores_ao_inicio_do_historico(pasta_linhagem):
+    leituras = gerar_leituras(fim=FIM)
+    inicio = leituras.index[0] + pd.Timedelta(hours=3)
+    antigas, primeiro, novas = dividir(leituras, inicio, FIM - pd.Timedelta(hours=2))
+    atualizar_em_partes(primeiro, [pd.concat([novas, antigas])], pasta_linhagem)
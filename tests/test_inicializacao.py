@@ -0,0 +1,19 @@
+"""Os pontos de entrada só de cálculo não importam os módulos pesados (gráficos, PDF, diálogos, tabelas em texto)."""
+import subprocess
+import sys
+
+import pytest
+
+from conftest import PASTA_PROJETO
+
+MODULOS_PESADOS = ('matplotlib', 'fpdf', 'tkinter', 'tabulate', 'PIL')
+
+
+@pytest.mark.parametrize('modulo', ['src.forecaster', 'src.report_generator', 'main', 'servico'])
+def test_importacao_sem_modulos_pesados(modulo):
+    # Processo novo, para que os módulos já carregados por outros testes não contem
+    codigo = (f'import sys, {modulo}\n'
+              f'print(",".join(sorted({{nome.split(".")[0] for nome in sys.modules}} & set({MODULOS_PESADOS!r}))))')
+    processo = subprocess.run([sys.executable, '-c', codigo], cwd=PASTA_PROJETO, capture_output=True, text=True,
+                              check=True)
+    assert processo.stdout.strip() == ''
@@ -0,0 +1,43 @@
+"""A varredura de parâmetros do lote (SiloForecaster.varrer_parametros) reproduz uma previsão nova por combinação."""
+import tempfile
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import gerar_leituras
+from src.forecaster import SiloForecaster
+
+N_AVES = 25000
+
+
+def test_cada_combinacao_igual_a_uma_previsao_nova(pasta_linhagem):
+    leituras = gerar_leituras(fim='2025-03-10 12:00', horas=96)
+    rng = np.random.default_rng(5)
+    leituras['value'] = (leituras['value'] * (1 + 0.002 * rng.standard_normal(len(leituras)))).astype('float32')
+    previsao = SiloForecaster(leituras, pasta_linhagem, tempfile.gettempdir())
+    previsao.calcular_previsao(1, date(2025, 2, 15), 'cobb', N_AVES, 26, 1500.0)
+
+    # 2000 aves: o silo não esgota nos 30 dias
+    grade = previsao.varrer_parametros(n_aves=[2000, 15000, N_AVES, 40000], sobra_inicial_kg=[0.0, 1500.0, 4000.0],
+                                       idade_diluicao_start=[20, 26], linhagem=['cobb', 'ross'])
+    assert len(grade) == 48 and grade['horas_autonomia'].isna().any() and grade['horas_autonomia'].notna().any()
+
+    for linha in grade.itertuples():
+        # O fator é calibrado com as aves do lote; n_aves muda só as aves da projeção
+        nova = SiloForecaster(leituras, pasta_linhagem, tempfile.gettempdir())
+        resultado = nova.calcular_previsao(1, date(2025, 2, 15), linha.linhagem, N_AVES, linha.idade_diluicao_start,
+                                           linha.sobra_inicial_kg)
+        assert linha.fator_consumo == pytest.approx(resultado.fator_consumo, rel=1e-12)
+
+        nova.n_aves = linha.n_aves
+        projecao = nova.projecao_horizonte()
+        esgotou = (projecao <= 0).to_numpy()
+        if not esgotou.any():
+            assert np.isnan(linha.horas_autonomia) and pd.isna(linha.data_esgotamento)
+            continue
+        assert linha.horas_autonomia == np.argmax(esgotou) + 1
+        assert linha.data_esgotamento == projecao.index[np.argmax(esgotou)]
+        if linha.n_aves == N_AVES:
+            assert linha.data_esgotamento == resultado.data_esgotamento
@@ -0,0 +1,75 @@
+"""Invariantes da programação de entregas (planejamento.planejar_entregas via SiloForecaster.planejar_entregas)."""
+import math
+import tempfile
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import PASTA_LINHAGEM, gerar_leituras
+from src.forecaster import SiloForecaster
+
+CAPACIDADE_KG = 12000.0
+# Nos aviários 2 e 4 a carga inteira só caberia com o silo abaixo da margem: a entrega é parcial, no prazo
+CARGA_KG = {1: 6000.0, 2: 11500.0, 3: 6000.0, 4: 11500.0, 5: 6000.0}
+MARGEM_KG = 1000.0
+DURACAO_VIAGEM_H = 10
+HORIZONTE_H = 7 * 24
+LOTE = dict(data_alojamento=date(2025, 2, 15), linhagem='cobb', n_aves=25000)
+
+
+@pytest.fixture(scope='module')
+def granja():
+    """Cinco aviários com pesos e consumos diferentes, consumindo rápido o bastante para disputar os caminhões."""
+    leituras = gerar_leituras(aviarios=(1, 2, 3, 4, 5), peso_inicial_kg=11000.0, consumo_kg_h=100.0)
+    for aviario, escala in ((2, 0.6), (3, 0.8), (4, 1.2), (5, 1.4)):
+        leituras.loc[leituras['aviario_num'] == aviario, 'value'] *= escala
+    forecaster = SiloForecaster(leituras, PASTA_LINHAGEM, tempfile.gettempdir())
+    _, previsoes = forecaster.run_batch({aviario: LOTE for aviario in range(1, 6)}, gerar_relatorios=False)
+    return forecaster, previsoes
+
+
+def trajetoria(projecao, entregas):
+    """Peso do silo hora a hora com as entregas programadas (o silo vazio não fica abaixo de zero)."""
+    peso = projecao.to_numpy(dtype=float).copy()
+    for entrega in entregas.itertuples():
+        hora = projecao.index.get_loc(entrega.data_entrega)
+        antes = max(peso[hora], 0.0)
+        assert antes == pytest.approx(entrega.peso_antes_kg)
+        peso[hora:] += antes + entrega.quantidade_kg - peso[hora]
+    return pd.Series(peso, index=projecao.index)
+
+
+@pytest.mark.parametrize('caminhoes', [1, 3])
+def test_programacao_respeita_margem_capacidade_e_caminhoes(granja, caminhoes):
+    forecaster, previsoes = granja
+    programacao = forecaster.planejar_entregas(previsoes, capacidade_kg=CAPACIDADE_KG, carga_kg=CARGA_KG,
+                                               margem_kg=MARGEM_KG, caminhoes=caminhoes,
+                                               duracao_viagem_h=DURACAO_VIAGEM_H, horizonte_h=HORIZONTE_H)
+    assert not programacao.empty
+    atrasados = set(programacao.loc[~(programacao['folga_horas'] >= 0), 'aviario_num'])
+    if caminhoes == 1:
+        assert atrasados, 'com um caminhão a programação deveria ter entregas atrasadas'
+    else:
+        assert not atrasados
+
+    # Nenhuma entrega passa da capacidade do silo
+    entregues = programacao.dropna(subset=['data_entrega'])
+    assert (entregues['quantidade_kg'] > 0).all()
+    assert (entregues['peso_depois_kg'] <= CAPACIDADE_KG + 1e-6).all()
+
+    for aviario, previsao in previsoes.items():
+        projecao = previsao.projecao_horizonte()
+        peso = trajetoria(projecao, entregues[entregues['aviario_num'] == aviario])
+        dentro_do_horizonte = peso.iloc[:HORIZONTE_H + 1]
+        assert dentro_do_horizonte.max() <= CAPACIDADE_KG + 1e-6
+        # Abaixo da margem só os silos com entrega atrasada (folga negativa)
+        if aviario not in atrasados:
+            assert dentro_do_horizonte.min() > MARGEM_KG - 1e-6, f'aviário {aviario} abaixo da margem'
+
+    # Cada caminhão faz uma viagem por vez
+    for _, viagens in entregues.groupby('caminhao'):
+        intervalos = np.diff(np.sort(viagens['data_entrega'].to_numpy())) / np.timedelta64(1, 'h')
+        assert (intervalos >= math.ceil(DURACAO_VIAGEM_H)).all()
+    assert set(entregues['caminhao']) <= set(range(1, caminhoes + 1))
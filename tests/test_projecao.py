@@ -0,0 +1,85 @@
+"""A projeção vetorizada de _project_autonomy reproduz o cálculo hora a hora original."""
+import tempfile
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import gerar_leituras
+from src.forecaster import SiloForecaster
+
+
+def projecao_hora_a_hora(df_hourly, df_consumo, data_alojamento, n_aves, idade_diluicao_start, sobra_inicial_kg):
+    """Cópia do laço original de _project_autonomy; retorna o fator de consumo e forecast_series."""
+    df_hourly = df_hourly.copy()
+    df_hourly['consumo_real_kg'] = -df_hourly['peso_silo'].diff()
+    consumos_validos = df_hourly['consumo_real_kg'][(df_hourly['consumo_real_kg'] > 0) & (df_hourly['consumo_real_kg'] < 500)]
+    taxa_consumo_real_recente = consumos_validos.tail(24).mean()
+    taxa_consumo_real_recente_gr_ave_dia = (taxa_consumo_real_recente * 1000 * 24) / n_aves
+
+    ultimo_peso = df_hourly['peso_silo'].iloc[-1]
+    ultima_data = df_hourly.index[-1]
+    idade_atual = df_hourly['idade'].iloc[-1]
+
+    consumo_tabela_atual = df_consumo[df_consumo['idade'] == idade_atual]['consumo_gr_ave_dia']
+    consumo_tabela_atual = consumo_tabela_atual.iloc[0] if not consumo_tabela_atual.empty else df_consumo['consumo_gr_ave_dia'].iloc[-1]
+    fator_consumo = taxa_consumo_real_recente_gr_ave_dia / consumo_tabela_atual
+
+    pesos_projetados, datas_projetadas = [], []
+    peso_atual = ultimo_peso
+    if sobra_inicial_kg > 0:
+        peso_atual -= sobra_inicial_kg
+    sobra_added_back = False
+
+    for hora in range(1, 24 * 30):
+        data_futura = ultima_data + timedelta(hours=hora)
+        idade_futura = (data_futura.normalize().date() - data_alojamento).days + 1
+
+        consumo_tabela_futuro = df_consumo[df_consumo['idade'] == idade_futura]['consumo_gr_ave_dia']
+        consumo_tabela_futuro = consumo_tabela_futuro.iloc[0] if not consumo_tabela_futuro.empty else df_consumo['consumo_gr_ave_dia'].iloc[-1]
+        consumo_projetado_kg_hr = (consumo_tabela_futuro / 1000 / 24) * n_aves * fator_consumo
+
+        if not sobra_added_back and sobra_inicial_kg > 0 and idade_futura >= idade_diluicao_start:
+            peso_atual += sobra_inicial_kg
+            sobra_added_back = True
+
+        peso_atual -= consumo_projetado_kg_hr
+        pesos_projetados.append(peso_atual)
+        datas_projetadas.append(data_futura)
+        if peso_atual <= 0:
+            break
+
+    return fator_consumo, pd.Series(pesos_projetados, index=datas_projetadas)
+
+
+FIM = pd.Timestamp('2025-03-10 12:00')
+
+# (dias desde o alojamento, idade_diluicao_start, sobra_inicial_kg, consumo kg/h, linhagem, esgota em 30 dias)
+CASOS = {
+    'sem_sobra': (25, 19, 0.0, 40.0, 'cobb', True),
+    'sobra_devolvida_no_horizonte': (20, 24, 2000.0, 40.0, 'cobb', True),
+    'diluicao_ja_atingida': (30, 19, 2000.0, 40.0, 'ross', True),
+    'diluicao_nunca_atingida': (20, 90, 2000.0, 40.0, 'cobb', True),
+    'idades_alem_da_tabela': (60, 19, 0.0, 40.0, 'ross', True),
+    'sem_esgotamento_em_30_dias': (60, 19, 0.0, 5.0, 'cobb', False),
+}
+
+
+@pytest.mark.parametrize('caso', list(CASOS))
+def test_forecast_series_igual_ao_laco_original(caso, pasta_linhagem):
+    dias, idade_diluicao_start, sobra_inicial_kg, consumo_kg_h, linhagem, esgota = CASOS[caso]
+    data_alojamento = (FIM - pd.Timedelta(days=dias)).date()
+    leituras = gerar_leituras(fim=FIM, consumo_kg_h=consumo_kg_h)
+    previsao = SiloForecaster(leituras, pasta_linhagem, tempfile.gettempdir())
+    previsao.calcular_previsao(1, data_alojamento, linhagem, 25000, idade_diluicao_start, sobra_inicial_kg)
+
+    fator, esperado = projecao_hora_a_hora(previsao.df_hourly, previsao.df_consumo, data_alojamento, 25000,
+                                           idade_diluicao_start, sobra_inicial_kg)
+    assert previsao.fator_consumo == fator
+    pd.testing.assert_index_equal(previsao.forecast_series.index, pd.DatetimeIndex(esperado.index), exact=False)
+    np.testing.assert_array_equal(previsao.forecast_series.to_numpy(), esperado.to_numpy())
+    # O caso é o descrito: esgota dentro do horizonte ou chega ao fim dos 30 dias com ração
+    assert (previsao.forecast_series.iloc[-1] <= 0) == esgota
+    assert esgota or len(previsao.forecast_series) == 24 * 30 - 1
+
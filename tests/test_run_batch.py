@@ -0,0 +1,77 @@
+"""Previsão da granja inteira com SiloForecaster.run_batch."""
+import tempfile
+from datetime import date
+
+import pandas as pd
+
+from conftest import gerar_leituras
+from src.forecaster import SiloForecaster
+
+LOTE = dict(data_alojamento=date(2025, 2, 15), linhagem='cobb', n_aves=25000)
+LOTES = {1: LOTE, 2: dict(LOTE, linhagem='ross', n_aves=20000, sobra_inicial_kg=1500.0),
+         3: dict(LOTE, idade_diluicao_start=24)}
+
+
+def test_aviarios_sem_leituras_viram_erro_por_aviario(pasta_linhagem):
+    forecaster = SiloForecaster(gerar_leituras(aviarios=(1, 2)), pasta_linhagem, tempfile.gettempdir())
+    df_resultados, previsoes = forecaster.run_batch({77: LOTE, 78: LOTE}, gerar_relatorios=False)
+
+    assert previsoes == {}
+    assert list(df_resultados.index) == [77, 78]
+    assert df_resultados['erro'].str.contains('Nenhum dado encontrado').all()
+    assert forecaster.entregas_granja.empty
+
+
+def test_aviario_sem_leituras_nao_afeta_os_demais(pasta_linhagem):
+    forecaster = SiloForecaster(gerar_leituras(aviarios=(1, 2)), pasta_linhagem, tempfile.gettempdir())
+    df_resultados, previsoes = forecaster.run_batch({1: LOTE, 77: LOTE}, gerar_relatorios=False)
+
+    assert list(previsoes) == [1]
+    assert df_resultados['erro'].isna()[1]
+    assert 'Nenhum dado encontrado' in df_resultados.loc[77, 'erro']
+
+
+def leituras_granja():
+    """Três aviários com consumos diferentes e uma entrega no meio do histórico."""
+    leituras = gerar_leituras(aviarios=(1, 2, 3), entregas={'2025-03-09 04:00': 6000.0})
+    leituras.loc[leituras['aviario_num'] == 2, 'value'] *= 0.7
+    leituras.loc[leituras['aviario_num'] == 3, 'value'] *= 1.2
+    return leituras
+
+
+
+def test_run_batch_igual_a_run_forecast_por_aviario(pasta_linhagem, tmp_path):
+    leituras = leituras_granja()
+    df_resultados, previsoes = SiloForecaster(leituras, pasta_linhagem, str(tmp_path)).run_batch(
+        LOTES, gerar_relatorios=False)
+
+    for aviario, parametros in LOTES.items():
+        isolada = SiloForecaster(leituras, pasta_linhagem, str(tmp_path))
+        isolada.run_forecast(aviario, parametros['data_alojamento'], parametros['linhagem'], parametros['n_aves'],
+                             parametros.get('idade_diluicao_start', 19), parametros.get('sobra_inicial_kg', 0.0))
+        esperado, obtido = isolada.resultado, previsoes[aviario].resultado
+
+        assert obtido.resumo() == esperado.resumo()
+        assert df_resultados.loc[aviario, list(esperado.resumo())].to_dict() == esperado.resumo()
+        for campo in ('aviario', 'linhagem', 'n_aves', 'data_alojamento', 'ultima_leitura'):
+            assert getattr(obtido, campo) == getattr(esperado, campo)
+        pd.testing.assert_series_equal(obtido.forecast_series, esperado.forecast_series)
+        pd.testing.assert_frame_equal(obtido.df_entregas, esperado.df_entregas)
+        pd.testing.assert_frame_equal(previsoes[aviario].df_hourly, isolada.df_hourly)
+    assert not previsoes[1].resultado.df_entregas.empty
+
+
+
+def test_run_batch_em_processos_igual_ao_serial(pasta_linhagem, tmp_path):
+    leituras = leituras_granja()
+    serial, previsoes_serial = SiloForecaster(leituras, pasta_linhagem, str(tmp_path)).run_batch(
+        LOTES, gerar_relatorios=False, n_cenarios=100, seed=7)
+    paralelo, previsoes_paralelas = SiloForecaster(leituras, pasta_linhagem, str(tmp_path)).run_batch(
+        LOTES, gerar_relatorios=False, workers=2, n_cenarios=100, seed=7)
+
+    assert 'esgotamento_p50' in serial.columns
+    pd.testing.assert_frame_equal(paralelo, serial)
+    for aviario in LOTES:
+        pd.testing.assert_series_equal(previsoes_paralelas[aviario].forecast_series,
+                                       previsoes_serial[aviario].forecast_series)
+        pd.testing.assert_frame_equal(previsoes_paralelas[aviario].df_entregas, previsoes_serial[aviario].df_entregas)
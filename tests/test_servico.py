@@ -0,0 +1,136 @@
+"""Serviço HTTP (servico.py) exercitado com o cliente de teste do aiohttp."""
+import asyncio
+import json
+import tempfile
+
+import pandas as pd
+import pytest
+from aiohttp import FormData
+from aiohttp.test_utils import TestClient, TestServer
+
+from conftest import gerar_leituras, gravar_exportacao
+from servico import ServicoPrevisao, criar_app
+from src.data_handler import importar_sensores
+from src.forecaster import SiloForecaster
+
+LOTES = {'1': dict(data_alojamento='2025-02-15', linhagem='cobb', n_aves=25000),
+         '2': dict(data_alojamento='15/02/2025', linhagem='ross', n_aves=22000, sobra_inicial_kg=500)}
+LOTES_CSV = 'aviario;data_alojamento;linhagem;n_aves\n1;2025-02-15;cobb;25000\n2;15/02/2025;ross;22000\n'
+
+
+@pytest.fixture
+def sensores(tmp_path):
+    """Sensores.csv exportado com dois aviários, com uma entrega em cada um."""
+    caminho = tmp_path / 'Sensores.csv'
+    fim = pd.Timestamp('2025-03-10 12:00')
+    gravar_exportacao(gerar_leituras(aviarios=(1, 2), fim=fim, entregas={fim - pd.Timedelta(hours=10): 6000.0}), caminho)
+    return caminho
+
+
+def executar(pasta_linhagem, teste):
+    """Roda `teste(cliente, servico)` com um servidor de teste do serviço."""
+    async def principal():
+        servico = ServicoPrevisao(pasta_linhagem)
+        async with TestClient(TestServer(criar_app(servico))) as cliente:
+            await teste(cliente, servico)
+    asyncio.run(principal())
+
+
+def contar_chamadas(servico, nome):
+    """Substitui o método `nome` do serviço por um que conta as chamadas."""
+    chamadas = []
+    original = getattr(servico, nome)
+
+    def contado(*args):
+        chamadas.append(args)
+        return original(*args)
+    setattr(servico, nome, contado)
+    return chamadas
+
+
+def test_envio_de_arquivos_e_consultas(pasta_linhagem, sensores):
+    df_sensores = importar_sensores(sensores, rapido=True, compacto=True)
+    esperado, _ = SiloForecaster(df_sensores, pasta_linhagem, tempfile.gettempdir()).run_batch(
+        {1: dict(data_alojamento=pd.Timestamp('2025-02-15').date(), linhagem='cobb', n_aves=25000)},
+        gerar_relatorios=False)
+
+    async def teste(cliente, servico):
+        formulario = FormData()
+        formulario.add_field('arquivo', sensores.read_bytes(), filename='Sensores.csv', content_type='text/csv')
+        resposta = await cliente.post('/sensores', data=formulario)
+        assert resposta.status == 201
+        assert (await resposta.json())['aviarios_com_dados'] == [1, 2]
+
+        resposta = await cliente.put('/lotes', data=LOTES_CSV, headers={'Content-Type': 'text/csv'})
+        assert (await resposta.json()) == {'lotes': [1, 2]}
+        resposta = await cliente.put('/lotes', json=LOTES)
+        assert (await resposta.json()) == {'lotes': [1, 2]}
+
+        resposta = await cliente.get('/previsoes')
+        assert resposta.status == 200
+        tabela = await resposta.json()
+        assert [registro['aviario_num'] for registro in tabela] == [1, 2]
+        assert all(registro['erro'] is None for registro in tabela)
+
+        previsao = await (await cliente.get('/previsoes/1')).json()
+        assert previsao['aviario_num'] == 1
+        assert pd.Timestamp(previsao['data_esgotamento']) == esperado.loc[1, 'data_esgotamento']
+        assert len(previsao['entregas']) == 1 and previsao['entregas'][0]['quantidade_kg'] > 5000
+
+        entregas = await (await cliente.get('/entregas')).json()
+        assert sorted(entrega['aviario_num'] for entrega in entregas) == [1, 2]
+
+        resposta = await cliente.get('/previsoes/1/grafico.png', params={'dpi': '50'})
+        assert resposta.status == 200 and resposta.content_type == 'image/png'
+        assert (await resposta.read()).startswith(b'\x89PNG')
+
+        estado = await (await cliente.get('/estado')).json()
+        assert estado['lotes'] == [1, 2] and estado['calculos_em_andamento'] == 0
+
+    executar(pasta_linhagem, teste)
+
+
+def test_erros_de_entrada(pasta_linhagem, sensores):
+    async def teste(cliente, servico):
+        assert (await cliente.get('/previsoes')).status == 409
+        assert (await cliente.post('/sensores', data=b'')).status == 400
+        assert (await cliente.put('/lotes', json=[{'aviario': 1, 'data_alojamento': '2025-02-15',
+                                                   'linhagem': 'hubbard', 'n_aves': 1000}])).status == 422
+
+        assert (await cliente.post('/sensores', data=sensores.read_bytes())).status == 201
+        assert (await cliente.get('/previsoes/abc')).status == 400
+        assert (await cliente.get('/previsoes/1')).status == 404
+        assert (await cliente.get('/previsoes/1', params={'n_aves': 'muitas', 'data_alojamento': '2025-02-15',
+                                                          'linhagem': 'cobb'})).status == 400
+        resposta = await cliente.get('/previsoes/77', params={'n_aves': '1000', 'data_alojamento': '2025-02-15',
+                                                              'linhagem': 'cobb'})
+        assert resposta.status == 422 and 'Nenhum dado encontrado' in await resposta.text()
+
+    executar(pasta_linhagem, teste)
+
+
+def test_requisicoes_simultaneas_aguardam_um_unico_calculo(pasta_linhagem, sensores):
+    async def teste(cliente, servico):
+        calculos = contar_chamadas(servico, '_prever')
+        await cliente.put('/lotes', json=LOTES)
+        await cliente.post('/sensores', data=sensores.read_bytes())
+
+        # O envio agenda o cálculo da granja; as consultas simultâneas esperam por ele em vez de recalcular
+        consultas = [cliente.get('/previsoes') for _ in range(5)]
+        consultas += [cliente.get('/previsoes/1', params={'n_aves': '20000'}) for _ in range(5)]
+        respostas = await asyncio.gather(*consultas)
+        corpos = [json.loads(await resposta.text()) for resposta in respostas]
+
+        assert all(resposta.status == 200 for resposta in respostas)
+        assert all(corpo == corpos[0] for corpo in corpos[:5])
+        assert all(corpo == corpos[5] for corpo in corpos[5:])
+        # Menos aves consumindo a mesma ração: fator de consumo maior que o do lote configurado
+        assert corpos[5]['fator_consumo'] == pytest.approx(corpos[0][0]['fator_consumo'] * 25000 / 20000)
+        # Um cálculo da granja e um do aviário com o lote alterado
+        assert len(calculos) == 2
+
+        await cliente.get('/previsoes/1', params={'n_aves': '20000'})
+        assert len(calculos) == 2
+        assert servico.resultados.estatisticas()['acertos'] > 0
+
+    executar(pasta_linhagem, teste)
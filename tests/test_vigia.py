@@ -0,0 +1,123 @@
+"""Observação da pasta de sensores (VigiaPasta) e códigos de saída do modo contínuo (main.py --vigiar)."""
+import os
+import queue
+
+import pandas as pd
+import pytest
+
+import main
+from conftest import gerar_leituras, gravar_exportacao
+from src.vigia import VigiaPasta
+
+LOTES_CSV = 'aviario;data_alojamento;linhagem;n_aves\n1;2025-02-15;cobb;25000\n'
+
+
+def regravar(caminho, texto):
+    """Regrava o arquivo com outro conteúdo e outra data de modificação."""
+    caminho.write_text(texto)
+    info = os.stat(caminho)
+    os.utime(caminho, ns=(info.st_atime_ns, info.st_mtime_ns + 10**9))
+
+
+def test_arquivo_so_entra_quando_estavel(tmp_path):
+    vigia = VigiaPasta(str(tmp_path))
+    (tmp_path / 'a.csv').write_text('1')
+    (tmp_path / 'ignorado.txt').write_text('1')
+
+    # Primeira varredura só registra o arquivo; na segunda, sem mudança, ele está pronto
+    assert vigia.varrer() == []
+    assert vigia.varrer() == [str(tmp_path / 'a.csv')]
+
+    # Ainda sendo gravado entre as varreduras: espera estabilizar
+    regravar(tmp_path / 'a.csv', '12')
+    assert vigia.varrer() == []
+    assert vigia.varrer() == [str(tmp_path / 'a.csv')]
+
+
+def test_fila_nao_repete_arquivos_inalterados(tmp_path):
+    vigia = VigiaPasta(str(tmp_path), intervalo_s=0.01).iniciar()
+    try:
+        for nome in ('a.csv', 'b.csv'):
+            (tmp_path / nome).write_text(nome)
+        arquivos = set()
+        while len(arquivos) < 2:
+            arquivos |= set(vigia.proximos(timeout=5))
+        assert arquivos == {str(tmp_path / 'a.csv'), str(tmp_path / 'b.csv')}
+
+        # Várias varreduras depois, nada é enfileirado de novo
+        assert vigia.proximos(timeout=0.2) == []
+
+        regravar(tmp_path / 'b.csv', 'alterado')
+        assert vigia.proximos(timeout=5) == [str(tmp_path / 'b.csv')]
+        assert vigia.proximos(timeout=0.2) == []
+    finally:
+        vigia.parar()
+
+
+def test_proximos_agrupa_a_fila_sem_repeticao(tmp_path):
+    vigia = VigiaPasta(str(tmp_path), max_fila=4)
+    assert vigia.proximos(timeout=0.01) == []
+    for caminho in ('a.csv', 'b.csv', 'a.csv'):
+        vigia.fila.put(caminho)
+    assert vigia.proximos(timeout=0.01) == ['a.csv', 'b.csv']
+    assert vigia.fila.empty()
+
+
+def test_fila_cheia_segura_a_varredura(tmp_path):
+    for indice in range(5):
+        (tmp_path / f'{indice}.csv').write_text(str(indice))
+    vigia = VigiaPasta(str(tmp_path), intervalo_s=0.01, max_fila=2).iniciar()
+    try:
+        # A fila nunca passa de max_fila; os arquivos seguintes chegam conforme ela é consumida
+        recebidos = []
+        while len(recebidos) < 5:
+            assert vigia.fila.qsize() <= 2
+            recebidos += vigia.proximos(timeout=5)
+        assert sorted(recebidos) == sorted(str(tmp_path / f'{indice}.csv') for indice in range(5))
+    finally:
+        vigia.parar()
+    with pytest.raises(queue.Empty):
+        vigia.fila.get_nowait()
+
+
+@pytest.fixture
+def pasta_vigiada(tmp_path):
+    entrada = tmp_path / 'entrada'
+    entrada.mkdir()
+    (tmp_path / 'lotes.csv').write_text(LOTES_CSV)
+    return entrada
+
+
+def vigiar(tmp_path, pasta_linhagem, monkeypatch, *lotes_de_arquivos):
+    """Roda main.py --vigiar entregando `lotes_de_arquivos` em ciclos seguidos e encerra com Ctrl+C."""
+    ciclos = iter(lotes_de_arquivos)
+
+    def proximos(self, timeout=None):
+        try:
+            return [str(arquivo) for arquivo in next(ciclos)]
+        except StopIteration:
+            raise KeyboardInterrupt
+    monkeypatch.setattr(VigiaPasta, 'proximos', proximos)
+    return main.main(['--vigiar', '--sensores', str(tmp_path / 'entrada'), '--lotes', str(tmp_path / 'lotes.csv'),
+                      '--saida', str(tmp_path / 'saida'), '--linhagem-folder', pasta_linhagem, '--workers', '1',
+                      '--sem-graficos', '--sem-pdf', '--intervalo', '0.01'])
+
+
+def test_codigos_de_saida_do_modo_continuo(tmp_path, pasta_linhagem, pasta_vigiada, monkeypatch):
+    fim = pd.Timestamp('2025-03-10 12:00')
+    sensores = pasta_vigiada / 'Sensores.csv'
+    gravar_exportacao(gerar_leituras(aviarios=(1,), fim=fim), sensores)
+    invalido = pasta_vigiada / 'invalido.csv'
+    invalido.write_text('nada;aqui\n1;2\n')
+
+    assert vigiar(tmp_path, pasta_linhagem, monkeypatch, [sensores]) == main.SAIDA_OK
+    assert (tmp_path / 'saida' / 'resultados_atual.csv').exists()
+    # Um arquivo rejeitado no caminho é erro de entrada, mesmo com as previsões em dia
+    assert vigiar(tmp_path, pasta_linhagem, monkeypatch, [sensores], [invalido]) == main.SAIDA_ERRO_ENTRADA
+    assert vigiar(tmp_path, pasta_linhagem, monkeypatch, [invalido]) == main.SAIDA_ERRO_ENTRADA
+
+    # Aviário do lote sem leituras: parte falhou; sem nenhum aviário processado, falha total
+    (tmp_path / 'lotes.csv').write_text(LOTES_CSV + '7;2025-02-15;cobb;25000\n')
+    assert vigiar(tmp_path, pasta_linhagem, monkeypatch, [sensores]) == main.SAIDA_PARCIAL
+    (tmp_path / 'lotes.csv').write_text(LOTES_CSV.replace('\n1;', '\n7;'))
+    assert vigiar(tmp_path, pasta_linhagem, monkeypatch, [sensores]) == main.SAIDA_FALHA